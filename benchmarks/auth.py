@@ -0,0 +1,50 @@
+"""Per request authentication cost as the number of accounts grows, session cookie vs legacy token cookie.
+
+$ python -m benchmarks.auth
+"""
+
+import asyncio
+import time
+
+from insync.app.auth_middleware import SESSION_COOKIE, TOKEN_COOKIE, TokenUsers, authenticate, hash_token
+from insync.app.sessions import SessionStore
+
+REQUESTS = 20_000
+
+
+def scope_with_cookie(name: str, value: str) -> dict:
+    return {
+        "type": "http",
+        "path": "/checklist",
+        "headers": [
+            (b"host", b"insync.example"),
+            (b"accept", b"text/html"),
+            (b"cookie", f"theme=dark; {name}={value}; other=1".encode()),
+        ],
+    }
+
+
+async def per_request_us(scope: dict, token_users: TokenUsers, sessions: SessionStore) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        login = await authenticate(scope, token_users, sessions)
+        assert login is not None and login.user == 'user0'
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def main() -> None:
+    for accounts in (2, 100, 10_000):
+        token_users = TokenUsers([(f'user{i}', f'password{i}') for i in range(accounts)])
+        sessions = SessionStore(':memory:')
+        sessions.ensure_tables_created()
+        session_scope = scope_with_cookie(SESSION_COOKIE, sessions.create('user0'))
+        token_scope = scope_with_cookie(TOKEN_COOKIE, hash_token('password0'))
+
+        session_us = asyncio.run(per_request_us(session_scope, token_users, sessions))
+        token_us = asyncio.run(per_request_us(token_scope, token_users, sessions))
+        print(f'{accounts:>6} accounts: session {session_us:.2f}us/request, token {token_us:.2f}us/request')
+        sessions.close()
+
+
+if __name__ == '__main__':
+    main()
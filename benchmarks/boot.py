@@ -0,0 +1,86 @@
+"""Registry boot time: `ListDB.load` against the row by row loader it replaced and decoding the binary snapshot.
+
+$ python -m benchmarks.boot
+$ python -m benchmarks.boot --sizes 1000 10000 100000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.synthetic import make_registry
+from insync.db import ListDB
+from insync.listitem import ListItem, ListItemProject
+from insync.listregistry import ListRegistry
+
+
+def row_by_row(db_path: Path) -> ListRegistry:
+    """ListDB.load before the bulk loader, every column through its sqlite converter and one `add` per item."""
+    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+    reg = ListRegistry()
+    rows = conn.execute("""
+        SELECT uuid, description, completion_datetime, project_name, project_type, archival_datetime, creation_datetime, priority, recurring
+        FROM list
+        """)
+    for row in rows:
+        reg.add(
+            ListItem(
+                uuid=row[0],
+                creation_datetime=row[6],
+                description=row[1],
+                completion_datetime=row[2],
+                archival_datetime=row[5],
+                project=ListItemProject(row[3], row[4]),
+                priority=row[7],
+                recurring=row[8],
+            ),
+        )
+    conn.close()
+    return reg
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def boot(size: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ListDB(Path(tmp) / 'insync.db')
+        db.ensure_tables_created()
+        reg = make_registry(size)
+        db.patch(reg)
+        snapshot = Path(tmp) / 'insync.db.snapshot'
+        size_bytes = db.save_snapshot(reg, snapshot)
+        assert db.load_snapshot(snapshot) == db.load() == row_by_row(db.db_path)
+
+        previous = best_of(repeat, lambda: row_by_row(db.db_path))
+        load = best_of(repeat, db.load)
+        decode = best_of(repeat, lambda: db.load_snapshot(snapshot))
+        save = best_of(repeat, lambda: db.save_snapshot(reg, snapshot))
+        db.close()
+
+    print(f'{size:>7} items:')
+    print(f'  row by row    {previous * 1000:7.0f}ms {size / previous:9,.0f} rows/s')
+    print(f'  ListDB.load   {load * 1000:7.0f}ms {size / load:9,.0f} rows/s ({previous / load:.1f}x)')
+    print(f'  snapshot      {decode * 1000:7.0f}ms {size / decode:9,.0f} items/s ({previous / decode:.1f}x), saving it {save * 1000:.0f}ms, {size_bytes / 1e6:.1f}MB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        boot(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Full render of a 5k item checklist after one item changes, with and without the per-item fragment cache.
+
+$ python -m benchmarks.checklist_render
+"""
+
+import time
+
+from insync.app.checklist import ChecklistRenderer
+from insync.listitem import ListItem, ListItemProject, ListItemProjectType
+from insync.listregistry import CompletionCommand, ListRegistry
+
+ITEMS = 5_000
+REPEATS = 10
+
+
+def make_registry(project: ListItemProject) -> ListRegistry:
+    reg = ListRegistry()
+    for i in range(ITEMS):
+        sub = ListItemProject(f'{project.name}.section{i % 20}', project.project_type)
+        reg.add(ListItem(f'item number {i} with a realistic length description', project=sub))
+    return reg
+
+
+def render(reg: ListRegistry, project: ListItemProject) -> str:
+    return ChecklistRenderer.render(reg.search(project), reg.undoview())
+
+
+def main() -> None:
+    project = ListItemProject('grocery', ListItemProjectType.checklist)
+    reg = make_registry(project)
+    items = list(reg)
+
+    render(reg, project)  # warm the cache
+    uncached = cached = 0.0
+    for i in range(REPEATS):
+        reg.do(CompletionCommand(items[i].uuid, True))
+
+        ChecklistRenderer.cache.hits = ChecklistRenderer.cache.misses = 0
+        start = time.perf_counter()
+        warm_html = render(reg, project)
+        cached += time.perf_counter() - start
+        hits, misses = ChecklistRenderer.cache.hits, ChecklistRenderer.cache.misses
+
+        ChecklistRenderer.cache.clear()
+        start = time.perf_counter()
+        cold_html = render(reg, project)
+        uncached += time.perf_counter() - start
+        assert warm_html == cold_html, "cached render must match a cold one"
+
+    print(f'{ITEMS} items, one changed per render')
+    print(f'   uncached: {uncached / REPEATS * 1000:.1f}ms')
+    print(f'     cached: {cached / REPEATS * 1000:.1f}ms (last render: {hits} hits, {misses} misses)')
+
+
+if __name__ == '__main__':
+    main()
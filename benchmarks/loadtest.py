@@ -0,0 +1,283 @@
+"""Many open tabs and phones against the real app, in one process with a throwaway database.
+
+Boots `insync.app:app` through its lifespan, connects simulated subscribers to `/ws/checklist/{name}` (answering
+heartbeat pings like the browser does) and fires mutations at the checklist endpoints at a fixed rate. Everything
+shares one event loop, as it would under uvicorn, so the event loop lag is what real clients would feel.
+
+    $ python -m benchmarks.loadtest --subscribers 200 --projects 4 --rate 20 --duration 10
+    $ python -m benchmarks.loadtest --frames binary --out loadtest.json
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# config is read when insync is imported, so the throwaway database and limits have to be in place first
+DB_DIR = Path(tempfile.mkdtemp(prefix='insync-loadtest-'))
+os.environ.update(
+    {
+        'HOT_RELOAD_ENABLED': 'false',
+        'INSYNC_DB_STR': str(DB_DIR / 'list.db'),
+        'INSYNC_XXX_DB_STR': str(DB_DIR / 'xxx.db'),
+        'INSYNC_JINJA_BYTECODE_CACHE_DIR': str(DB_DIR / 'jinja'),
+        # every simulated client logs in as the same user
+        'INSYNC_WS_MAX_CONNECTIONS': '100000',
+        'INSYNC_WS_MAX_CONNECTIONS_PER_USER': '100000',
+    }
+)
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from bisect import bisect_right  # noqa: E402
+from dataclasses import dataclass, field  # noqa: E402
+from typing import Any  # noqa: E402
+
+import httpx  # noqa: E402
+
+from benchmarks.synthetic import make_registry  # noqa: E402
+from insync import AUTHS, DB_STR  # noqa: E402
+from insync.app import app  # noqa: E402
+from insync.app.auth_middleware import SESSION_COOKIE  # noqa: E402
+from insync.app.ws_connections import PING, PONG  # noqa: E402
+from insync.db import ListDB  # noqa: E402
+from insync.githash import githash  # noqa: E402
+from insync.listitem import ListItemProject, ListItemProjectType  # noqa: E402
+from insync.listregistry import ListRegistry  # noqa: E402
+
+# share of each mutation, picked at random per request
+MUTATIONS = {'complete': 0.85, 'new': 0.1, 'reset': 0.05}
+LAG_INTERVAL = 0.01
+
+
+class Subscriber:
+    """An ASGI websocket client driving the app directly, recording when each update frame arrives and its size."""
+
+    def __init__(self, project: ListItemProject, frames: str, cookie: str):
+        self.project = project
+        self.frames = frames
+        self.cookie = cookie
+        self.inbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.arrivals: list[float] = []
+        self.bytes_received = 0
+        self.close_code: int | None = None
+        self.task: asyncio.Task | None = None
+
+    def scope(self) -> dict[str, Any]:
+        path = f'/ws/checklist/{self.project.name}'
+        return {
+            'type': 'websocket',
+            'asgi': {'version': '3.0'},
+            'scheme': 'wss',
+            'server': ('testserver', 443),
+            'client': ('127.0.0.1', 50000),
+            'root_path': '',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': f'renderer_name=checklist&frames={self.frames}'.encode(),
+            'headers': [(b'host', b'testserver'), (b'cookie', self.cookie.encode())],
+            'subprotocols': [],
+            'state': {},
+        }
+
+    async def connect(self) -> None:
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+        self.task = asyncio.create_task(app(self.scope(), self.inbox.get, self.send))
+        await self.accepted.wait()
+
+    async def disconnect(self) -> None:
+        self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        if self.task is not None:
+            await self.task
+
+    async def send(self, message: dict[str, Any]) -> None:
+        match message['type']:
+            case 'websocket.accept':
+                self.accepted.set()
+            case 'websocket.send' if message.get('text') == PING:
+                self.inbox.put_nowait({'type': 'websocket.receive', 'text': PONG})
+            case 'websocket.send':
+                self.arrivals.append(time.perf_counter())
+                data = message.get('bytes')
+                self.bytes_received += len(data) if data is not None else len(message['text'].encode())
+            case 'websocket.close':
+                self.close_code = message.get('code', 1000)
+                self.accepted.set()
+
+
+@dataclass
+class Mutation:
+    kind: str
+    project: ListItemProject
+    started: float
+    seconds: float = 0.0
+    status: int = 0
+
+
+@dataclass
+class Storm:
+    """The items being mutated, with the completion state the harness expects them to be in."""
+
+    items: dict[ListItemProject, list[str]]
+    completed: dict[str, bool] = field(default_factory=dict)
+    rng: random.Random = field(default_factory=lambda: random.Random(0))
+
+    async def mutate(self, client: httpx.AsyncClient, project: ListItemProject) -> Mutation:
+        kind = self.rng.choices(list(MUTATIONS), list(MUTATIONS.values()))[0]
+        mutation = Mutation(kind, project, time.perf_counter())
+        match kind:
+            case 'complete':
+                uuid = self.rng.choice(self.items[project])
+                self.completed[uuid] = not self.completed.get(uuid, False)
+                response = await client.patch(f'/checklist/{uuid}/completed', data={'completed': str(self.completed[uuid]).lower()})
+            case 'new':
+                response = await client.post(f'/checklist/{project.name}/new', data={'description': f'load test item {self.rng.random():.6f}'})
+            case 'reset':
+                response = await client.post(f'/checklist/{project.name}/reset')
+        mutation.seconds = time.perf_counter() - mutation.started
+        mutation.status = response.status_code
+        return mutation
+
+
+def busiest_checklists(reg: ListRegistry, count: int) -> list[ListItemProject]:
+    """The `count` checklist sections (one or two levels deep) with the most active items."""
+    counts: dict[ListItemProject, int] = {}
+    for item in reg:
+        if item.project.project_type != ListItemProjectType.checklist or item.archived:
+            continue
+        for depth in (1, 2):
+            if len(item.project) >= depth:
+                section = item.project.truncate(depth)
+                counts[section] = counts.get(section, 0) + 1
+    return sorted(counts, key=lambda project: counts[project], reverse=True)[:count]
+
+
+async def measure_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(time.perf_counter() - start - LAG_INTERVAL)
+
+
+def fanout_latencies(mutations: list[Mutation], subscribers: list[Subscriber]) -> list[float]:
+    """For every mutation and every subscriber of its project, seconds until that subscriber's next frame."""
+    latencies = []
+    for mutation in mutations:
+        for sub in subscribers:
+            # subscribers of a subsection may not be sent anything for a change elsewhere in the checklist
+            if mutation.project not in sub.project:
+                continue
+            i = bisect_right(sub.arrivals, mutation.started)
+            if i < len(sub.arrivals):
+                latencies.append(sub.arrivals[i] - mutation.started)
+    return latencies
+
+
+def percentiles(values: list[float], scale: float = 1000) -> dict[str, float]:
+    if len(values) == 0:
+        return {}
+    values = sorted(values)
+    return {
+        'p50': values[len(values) // 2] * scale,
+        'p95': values[int(len(values) * 0.95)] * scale,
+        'p99': values[int(len(values) * 0.99)] * scale,
+        'max': values[-1] * scale,
+    }
+
+
+async def login(transport: httpx.ASGITransport, token: str) -> str:
+    """The session cookie of one login, shared by every simulated client like tabs of one browser."""
+    async with httpx.AsyncClient(transport=transport, base_url='https://testserver') as client:
+        response = await client.post('/login', data={'token': token})
+    return f'{SESSION_COOKIE}={response.cookies[SESSION_COOKIE]}'
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    reg = make_registry(args.items)
+    db = ListDB(DB_STR)
+    db.ensure_tables_created()
+    db.patch(reg)
+    db.close()
+    projects = busiest_checklists(reg, args.projects)
+    storm = Storm({p: [str(i.uuid) for i in reg.search(p).active] for p in projects})
+
+    _, password = AUTHS[0]
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        cookie = await login(transport, password)
+        subscribers = [Subscriber(projects[n % len(projects)], args.frames, cookie) for n in range(args.subscribers)]
+        start = time.perf_counter()
+        for sub in subscribers:
+            await sub.connect()
+        connect_seconds = time.perf_counter() - start
+        refused = sum(sub.close_code is not None for sub in subscribers)
+        for sub in subscribers:
+            sub.bytes_received = 0
+
+        lags: list[float] = []
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_lag(lags, stop))
+        mutations: list[asyncio.Task[Mutation]] = []
+        async with httpx.AsyncClient(transport=transport, base_url='https://testserver', headers={'cookie': cookie}) as client:
+            cpu_start = time.process_time()
+            storm_start = time.perf_counter()
+            for n in range(int(args.rate * args.duration)):
+                # fire on schedule whether or not earlier requests have finished, as independent clients would
+                await asyncio.sleep(max(0.0, storm_start + n / args.rate - time.perf_counter()))
+                mutations.append(asyncio.create_task(storm.mutate(client, projects[n % len(projects)])))
+            done = await asyncio.gather(*mutations)
+            # let the last broadcasts land
+            await asyncio.sleep(0.1)
+            storm_seconds = time.perf_counter() - storm_start
+            cpu_seconds = time.process_time() - cpu_start
+        stop.set()
+        await lag_task
+
+        for sub in subscribers:
+            await sub.disconnect()
+
+    return {
+        'commit': githash(),
+        'config': {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        'connect_ms_per_subscriber': connect_seconds / len(subscribers) * 1000,
+        'refused': refused,
+        'mutations': len(done),
+        'failed': sum(m.status >= 400 for m in done),
+        'achieved_rate': len(done) / storm_seconds,
+        'cpu_ms_per_mutation': cpu_seconds / len(done) * 1000,
+        'response_ms': percentiles([m.seconds for m in done]),
+        'fanout_ms': percentiles(fanout_latencies(done, subscribers)),
+        'bytes_per_client': statistics.fmean(sub.bytes_received for sub in subscribers),
+        'bytes_per_client_per_mutation': statistics.fmean(sub.bytes_received for sub in subscribers) / len(done),
+        'event_loop_lag_ms': percentiles(lags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=100)
+    parser.add_argument('--projects', type=int, default=4, help='checklists the subscribers and mutations are spread over')
+    parser.add_argument('--items', type=int, default=5_000, help='size of the generated registry')
+    parser.add_argument('--rate', type=float, default=20, help='mutations per second')
+    parser.add_argument('--duration', type=float, default=5, help='seconds of mutations')
+    parser.add_argument('--frames', choices=['text', 'binary'], default='text')
+    parser.add_argument('--out', type=Path, help='also write the report here as JSON')
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(DB_DIR, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out is not None:
+        args.out.write_text(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Moves within one list, tracking how crowded the sort keys get and what rebalancing costs.
+
+Moves go through the same key_between/respace as the xxx move endpoint, with a background sweep
+(as rebalance_crowded does) every SWEEP_EVERY moves. `random` drops items anywhere, `hotspot`
+always drops them in the same spot, the worst case for gap exhaustion.
+
+    $ python -m benchmarks.sortkey_moves
+"""
+
+import random
+import time
+from bisect import insort
+from collections.abc import Callable
+from itertools import pairwise
+
+from insync.sortkey import END_GAP, crowded, key_between, neighbours, respace
+
+ITEMS = 1_000
+MOVES = 100_000
+SWEEP_EVERY = 1_000
+REPORT_EVERY = 25_000
+
+
+def run(name: str, pick_index: Callable[[random.Random, int], int]) -> None:
+    rng = random.Random(0)
+    keys = [END_GAP * (i + 1) for i in range(ITEMS)]
+
+    foreground_respaces = foreground_rows = largest_window = 0
+    sweep_rows = 0
+    print(name)
+    start = time.perf_counter()
+    for move in range(1, MOVES + 1):
+        keys.pop(rng.randrange(len(keys)))
+        index = pick_index(rng, len(keys))
+
+        key = key_between(*neighbours(keys, index))
+        if key is None:
+            window_start, new_keys = respace(keys, index)
+            keys[window_start : window_start + len(new_keys)] = new_keys
+            foreground_respaces += 1
+            foreground_rows += len(new_keys)
+            largest_window = max(largest_window, len(new_keys))
+            key = key_between(*neighbours(keys, index))
+            assert key is not None
+        insort(keys, key)
+
+        if move % SWEEP_EVERY == 0:
+            while crowded_at := crowded(keys):
+                window_start, new_keys = respace(keys, crowded_at[0])
+                keys[window_start : window_start + len(new_keys)] = new_keys
+                sweep_rows += len(new_keys)
+
+        if move % REPORT_EVERY == 0:
+            smallest_gap = min(b - a for a, b in pairwise(keys))
+            print(
+                f'  {move:>7} moves: smallest gap 2^{smallest_gap.bit_length() - 1}, largest key 2^{keys[-1].bit_length() - 1}, '
+                f'{foreground_respaces} foreground respaces ({foreground_rows} rows, largest window {largest_window}), {sweep_rows} rows rewritten by sweeps',
+            )
+    elapsed = time.perf_counter() - start
+    print(f'  {MOVES} moves over {ITEMS} items in {elapsed:.2f}s, {(MOVES + foreground_rows) / MOVES:.3f} rows written per move in the foreground')
+
+
+def main() -> None:
+    run('random', lambda rng, length: rng.randrange(length + 1))
+    run('hotspot', lambda rng, length: 10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Times the core list operations on synthetic registries of several sizes and writes the results as JSON.
+
+Run it on two commits and compare, a ratio above 1 is slower than the baseline:
+
+    $ python -m benchmarks.suite --sizes 1000 10000 100000 --out before.json
+    $ python -m benchmarks.suite --sizes 1000 10000 100000 --out after.json --compare before.json
+
+1M items works too, it needs a couple of GB of memory and a few minutes.
+"""
+
+import argparse
+import datetime as dt
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from benchmarks.synthetic import busiest_project, make_registry
+from insync.app.checklist import ChecklistRenderer
+from insync.app.todotxt import TodoTxtRenderer
+from insync.db import ListDB
+from insync.githash import githash
+from insync.listitem import ListItemProjectType, NullListItemProject
+from insync.listregistry import ChecklistResetCommand, ListRegistry
+
+LISTVIEW_PROPERTIES = ['incomplete', 'complete', 'active', 'archived', 'onetime', 'recurring', 'currentproject']
+# each case repeats until it has run this long, at least MIN_REPEATS and at most MAX_REPEATS times
+TIME_BUDGET = 1.0
+MIN_REPEATS = 3
+MAX_REPEATS = 50
+# ratio of fastest runs past which --compare flags a case, the minimum is the least noisy statistic
+REGRESSION = 1.10
+
+Case = tuple[str, Callable[[], object], Callable[[], object] | None]
+
+
+def measure(run: Callable[[], object], setup: Callable[[], object] | None = None) -> list[float]:
+    """Seconds per run, `setup` runs untimed before each one."""
+    times: list[float] = []
+    while len(times) < MAX_REPEATS and (len(times) < MIN_REPEATS or sum(times) < TIME_BUDGET):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def cases(reg: ListRegistry, db: ListDB) -> Iterator[Case]:
+    checklist = busiest_project(reg, ListItemProjectType.checklist)
+    view = reg.search(checklist)
+    everything = reg.search(NullListItemProject())
+    undoview = reg.undoview()
+
+    yield 'ListDB.patch', lambda: db.patch(reg), None
+    yield 'ListDB.load', db.load, None
+    yield 'ListRegistry.search', lambda: len(reg.search(checklist)), None
+    for name in LISTVIEW_PROPERTIES:
+        yield f'ListView.{name}', lambda name=name: getattr(view, name), None
+    yield 'ListView.subproject_views', lambda: list(view.subproject_views()), None
+    yield 'ChecklistRenderer.render', lambda: ChecklistRenderer.render(view, undoview), ChecklistRenderer.cache.clear
+    yield 'ChecklistRenderer.render (cached)', lambda: ChecklistRenderer.render(view, undoview), None
+    yield 'TodoTxtRenderer.render', lambda: TodoTxtRenderer.render(everything, undoview), None
+
+    reset: list[ChecklistResetCommand] = []
+
+    def new_reset() -> None:
+        # undo the previous run so every reset has the same completed items to work on
+        if reset:
+            reg.undo()
+        reset[:] = [ChecklistResetCommand(checklist)]
+
+    yield 'ChecklistResetCommand', lambda: reg.do(reset[0]), new_reset
+
+
+def run_size(size: int, db_dir: Path) -> list[dict]:
+    reg = make_registry(size)
+    db = ListDB(db_dir / f'{size}.db')
+    db.ensure_tables_created()
+    db.patch(reg)  # later patches are updates, as they are in the app
+    results = []
+    for name, run, setup in cases(reg, db):
+        times = measure(run, setup)
+        result = {
+            'size': size,
+            'name': name,
+            'repeats': len(times),
+            'min_ms': min(times) * 1000,
+            'median_ms': statistics.median(times) * 1000,
+            'mean_ms': statistics.fmean(times) * 1000,
+        }
+        print(f"{size:>9,} {name:<36} {result['median_ms']:>10.2f}ms median of {len(times)}", file=sys.stderr)
+        results.append(result)
+    db.close()
+    return results
+
+
+def compare(results: list[dict], baseline: dict) -> int:
+    """Report ratios of the fastest runs against a baseline results file, returns how many cases regressed."""
+    before = {(r['size'], r['name']): r['min_ms'] for r in baseline['results']}
+    print(f"\ncompared to {baseline['commit']} ({baseline['created']})", file=sys.stderr)
+    regressions = 0
+    for r in results:
+        old = before.get((r['size'], r['name']))
+        if old is None:
+            continue
+        ratio = r['min_ms'] / old
+        flag = ' <- slower' if ratio > REGRESSION else ''
+        regressions += ratio > REGRESSION
+        print(f"{r['size']:>9,} {r['name']:<36} {old:>10.2f}ms -> {r['min_ms']:>10.2f}ms  x{ratio:.2f}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--out', type=Path, help='write results here as JSON, default stdout')
+    parser.add_argument('--compare', type=Path, help='a previous results file to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        results = [result for size in args.sizes for result in run_size(size, Path(db_dir))]
+    report = {
+        'commit': githash(),
+        'created': dt.datetime.now(dt.timezone.utc).isoformat(),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.out is None:
+        print(json.dumps(report, indent=2))
+    else:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.compare is not None:
+        regressions = compare(results, json.loads(args.compare.read_text()))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Deterministic registries shaped like real usage, for benchmarks at any size.
+
+Items are spread over a few deep project trees per type. Checklists are mostly recurring, and most
+items are long archived, as a list accumulates history over the years.
+"""
+
+import datetime as dt
+import random
+
+from uuid6 import UUID
+
+from insync.listitem import ListItem, ListItemPriority, ListItemProject, ListItemProjectType
+from insync.listregistry import ListRegistry
+
+ROOTS = {
+    ListItemProjectType.checklist: ['grocery', 'travel', 'packing', 'chores', 'hardware'],
+    ListItemProjectType.todo: ['house', 'garage', 'car', 'work', 'garden', 'baby', 'finance'],
+    ListItemProjectType.ref: ['restaurants', 'vacations', 'books', 'recipes'],
+}
+SECTIONS = ['produce', 'dairy', 'frozen', 'bakery', 'international', 'upstairs', 'basement', 'kitchen', 'bath', 'yard', 'misc']
+WORDS = [
+    'buy', 'fix', 'call', 'check', 'order', 'clean', 'replace', 'paint',
+    'milk', 'eggs', 'bread', 'tape', 'screws', 'filter', 'oil', 'tires', 'passport', 'charger', 'socks', 'book', 'table',
+]  # fmt: skip
+
+# fractions of all items
+ARCHIVED = 0.6
+COMPLETED_ACTIVE = 0.1
+# fraction of checklist items
+RECURRING = 0.7
+# how far back the archive goes
+HISTORY = dt.timedelta(days=3 * 365)
+NOW = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def make_projects(rng: random.Random, count: int, max_depth: int = 4) -> list[ListItemProject]:
+    """`count` distinct projects, each a branch of up to `max_depth` parts under one of the ROOTS."""
+    projects: dict[tuple[str, ListItemProjectType], ListItemProject] = {}
+    for project_type, roots in ROOTS.items():
+        for root in roots:
+            projects[root, project_type] = ListItemProject(root, project_type)
+    while len(projects) < count:
+        parent = rng.choice(list(projects.values()))
+        if len(parent) >= max_depth:
+            continue
+        name = f'{parent.name}.{rng.choice(SECTIONS)}{rng.randrange(10)}'
+        projects[name, parent.project_type] = ListItemProject(name, parent.project_type)
+    return list(projects.values())
+
+
+def make_item(rng: random.Random, project: ListItemProject) -> ListItem:
+    created = NOW - HISTORY * rng.random()
+    item = ListItem(
+        ' '.join(rng.choices(WORDS, k=rng.randint(2, 8))),
+        # uuid7 reads the clock, a seeded uuid keeps runs identical
+        uuid=UUID(int=rng.getrandbits(128), version=7),
+        creation_datetime=created,
+        project=project,
+        recurring=project.project_type == ListItemProjectType.checklist and rng.random() < RECURRING,
+        priority=rng.choice(list(ListItemPriority)[:5]) if project.project_type == ListItemProjectType.todo and rng.random() < 0.3 else None,
+    )
+    roll = rng.random()
+    if roll < ARCHIVED:
+        item.completion_datetime = created + (NOW - created) * rng.random()
+        item.archival_datetime = item.completion_datetime + (NOW - item.completion_datetime) * rng.random()
+    elif roll < ARCHIVED + COMPLETED_ACTIVE:
+        item.completion_datetime = created + (NOW - created) * rng.random()
+    return item
+
+
+def make_registry(items: int, seed: int = 0) -> ListRegistry:
+    """A registry of `items` items over roughly one project per 25 items, identical for the same seed."""
+    rng = random.Random(seed)
+    projects = make_projects(rng, max(sum(len(roots) for roots in ROOTS.values()), items // 25))
+    # a few lists get most of the items, as grocery does in practice
+    weights = [1 / (rank + 1) for rank in range(len(projects))]
+    reg = ListRegistry()
+    for project in rng.choices(projects, weights, k=items):
+        reg.add(make_item(rng, project))
+    return reg
+
+
+def busiest_project(reg: ListRegistry, project_type: ListItemProjectType) -> ListItemProject:
+    """The root project of `project_type` holding the most items."""
+    counts: dict[ListItemProject, int] = {}
+    for item in reg:
+        if item.project.project_type == project_type:
+            root = item.project.truncate(1)
+            counts[root] = counts.get(root, 0) + 1
+    return max(counts, key=lambda project: counts[project])
@@ -0,0 +1,86 @@
+"""Broadcast fan-out to many subscribers of one channel, text frames vs shared binary frames.
+
+Text subscribers pay a utf-8 encode and (like permessage-deflate would) a compression per socket,
+binary subscribers all receive the one frame encoded per render.
+
+    $ python -m benchmarks.ws_broadcast
+"""
+
+import asyncio
+import time
+import zlib
+
+from fastapi.websockets import WebSocketState
+
+from insync.app.checklist import ChecklistRenderer
+from insync.app.ws_list_updater import WebSocketListUpdater
+from insync.listitem import ListItem, ListItemProject, ListItemProjectType
+from insync.listregistry import ListRegistry
+
+SUBSCRIBERS = 200
+ITEMS = 300
+BROADCASTS = 20
+
+
+class CountingWebSocket:
+    """Stand-in for a starlette websocket that does the per-socket work a real server would."""
+
+    client_state = WebSocketState.CONNECTED
+
+    def __init__(self):
+        self.bytes_received = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        # permessage-deflate compresses every message per socket
+        self.bytes_received += len(zlib.compress(message.encode(), 6))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.bytes_received += len(data)
+
+
+def make_registry(project: ListItemProject) -> ListRegistry:
+    reg = ListRegistry()
+    for i in range(ITEMS):
+        sub = ListItemProject(f'{project.name}.section{i % 10}', project.project_type)
+        reg.add(ListItem(f'item number {i} with a realistic length description', project=sub))
+    return reg
+
+
+async def run(binary: bool, compress: bool) -> dict[str, float]:
+    project = ListItemProject('grocery', ListItemProjectType.checklist)
+    updater = WebSocketListUpdater(make_registry(project), compress_frames=compress)
+    renderer = ChecklistRenderer()
+    sockets = [CountingWebSocket() for _ in range(SUBSCRIBERS)]
+    for ws in sockets:
+        await updater.subscribe(ws, project, renderer, binary=binary)  # type: ignore
+
+    start = time.perf_counter()
+    for _ in range(BROADCASTS):
+        await updater.broadcast_update(project)
+    elapsed = time.perf_counter() - start
+
+    stats = updater.payload_stats
+    return {
+        'ms_per_broadcast': elapsed / BROADCASTS * 1000,
+        'bytes_per_client': sum(ws.bytes_received for ws in sockets) / SUBSCRIBERS / BROADCASTS,
+        'frames_encoded': stats.frames_encoded,
+        'compression_ratio': stats.compression_ratio,
+        'bytes_saved': stats.bytes_saved,
+    }
+
+
+def main() -> None:
+    for name, binary, compress in [
+        ('text (per socket deflate)', False, False),
+        ('binary shared utf-8', True, False),
+        ('binary shared deflate', True, True),
+    ]:
+        result = asyncio.run(run(binary, compress))
+        print(f'{name:>28}: ' + ', '.join(f'{k}={v:.2f}' if isinstance(v, float) else f'{k}={v}' for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Request time of an xxx list page holding 10k items across a handful of sections.
+
+$ python -m benchmarks.xxx_list
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+ITEMS = 10_000
+SECTIONS = 20
+REQUESTS = 20
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['INSYNC_DB_STR'] = str(Path(tmp) / "insync.db")
+        os.environ['INSYNC_XXX_DB_STR'] = str(Path(tmp) / "xxx.db")
+        os.environ['HOT_RELOAD_ENABLED'] = 'false'
+
+        from fastapi.testclient import TestClient
+
+        from insync import AUTHS
+        from insync.app import app
+        from insync.app.auth_middleware import TOKEN_COOKIE, hash_token
+        from insync.app.xxx.xxx import List, ListItem, ListSection, ListType
+        from insync.sortkey import key_between
+
+        with TestClient(app, base_url='https://testserver') as client:
+            client.cookies.set(TOKEN_COOKIE, hash_token(AUTHS[0][1]))
+            with app.state.xxx_engines.borrow() as engine:
+                mylist = engine.save(List(None, "Big", ListType(None, "shopping")))
+                sections = [engine.insert_shallow(ListSection(None, f"section {i}", mylist)) for i in range(SECTIONS)]
+                last_keys: list[int | None] = [None] * SECTIONS
+                for i in range(ITEMS):
+                    last_keys[i % SECTIONS] = sort_key = key_between(last_keys[i % SECTIONS], None)
+                    engine.insert_shallow(ListItem(None, f"item number {i}", sections[i % SECTIONS], sort_key))
+
+            assert client.get("/xxx/list/Big").status_code == 200
+            start = time.perf_counter()
+            for _ in range(REQUESTS):
+                client.get("/xxx/list/Big")
+            elapsed = (time.perf_counter() - start) / REQUESTS
+            print(f'GET /xxx/list/Big with {ITEMS} items in {SECTIONS} sections: {elapsed * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
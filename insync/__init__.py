@@ -1,9 +1,34 @@
 import os
 
-from insync.githash import githash
-
 HOT_RELOAD_ENABLED = os.getenv("HOT_RELOAD_ENABLED", "True").lower() == "true"
 AUTHS = [tuple(a.split(':')) for a in os.getenv("INSYNC_AUTHS", "zak:kaz;admin:skunk").split(";")]
+# users allowed to switch on profiling from /admin
+ADMIN_USERS = set(os.getenv("INSYNC_ADMIN_USERS", "admin").split(";"))
 DB_STR = os.environ.get('INSYNC_DB_STR', 'test.db')
-
-__githash__ = githash()
+XXX_DB_STR = os.environ.get('INSYNC_XXX_DB_STR', 'xxx.db')
+# a file of its own, a login written next to the lists would move the change counter that keeps the snapshot current
+SESSIONS_DB_STR = os.environ.get('INSYNC_SESSIONS_DB_STR', ':memory:' if DB_STR == ':memory:' else f'{DB_STR}.sessions')
+# binary copy of the registry loaded at startup instead of the database while still current, empty turns it off
+SNAPSHOT_PATH = os.environ.get('INSYNC_SNAPSHOT_PATH', '' if DB_STR == ':memory:' else f'{DB_STR}.snapshot')
+SNAPSHOT_INTERVAL = float(os.getenv("INSYNC_SNAPSHOT_INTERVAL", "300"))
+XXX_POOL_SIZE = int(os.getenv("INSYNC_XXX_POOL_SIZE", "4"))
+XXX_POOL_TIMEOUT = float(os.getenv("INSYNC_XXX_POOL_TIMEOUT", "5"))
+XXX_REBALANCE_INTERVAL = float(os.getenv("INSYNC_XXX_REBALANCE_INTERVAL", "60"))
+XXX_AUTOSAVE_IDLE_DELAY = float(os.getenv("INSYNC_XXX_AUTOSAVE_IDLE_DELAY", "0.5"))
+XXX_AUTOSAVE_MAX_DELAY = float(os.getenv("INSYNC_XXX_AUTOSAVE_MAX_DELAY", "2"))
+SQLADMIN_TIMEOUT = float(os.getenv("INSYNC_SQLADMIN_TIMEOUT", "2"))
+SQLADMIN_PAGE_SIZE = int(os.getenv("INSYNC_SQLADMIN_PAGE_SIZE", "200"))
+SQL_SLOW_THRESHOLD = float(os.getenv("INSYNC_SQL_SLOW_THRESHOLD", "0.05"))
+SQL_SLOW_LOG_SIZE = int(os.getenv("INSYNC_SQL_SLOW_LOG_SIZE", "100"))
+JINJA_BYTECODE_CACHE_DIR = os.environ.get('INSYNC_JINJA_BYTECODE_CACHE_DIR', '.jinja_cache')
+WS_COMPRESS_FRAMES = os.getenv("INSYNC_WS_COMPRESS_FRAMES", "True").lower() == "true"
+WS_MAX_CONNECTIONS = int(os.getenv("INSYNC_WS_MAX_CONNECTIONS", "500"))
+WS_MAX_CONNECTIONS_PER_USER = int(os.getenv("INSYNC_WS_MAX_CONNECTIONS_PER_USER", "20"))
+WS_HEARTBEAT_INTERVAL = float(os.getenv("INSYNC_WS_HEARTBEAT_INTERVAL", "25"))
+WS_IDLE_TIMEOUT = float(os.getenv("INSYNC_WS_IDLE_TIMEOUT", "60"))
+# traceback depth for the /admin/memory report when tracing from startup, 0 leaves tracemalloc off
+TRACEMALLOC_FRAMES = int(os.getenv("INSYNC_TRACEMALLOC_FRAMES", "0"))
+GC_FREEZE = os.getenv("INSYNC_GC_FREEZE", "False").lower() == "true"
+GC_THRESHOLDS = [int(t) for t in os.getenv("INSYNC_GC_THRESHOLDS", "").split(",") if t]
+# seconds from the start of the lifespan until the app is ready to serve, a warning is logged when it takes longer
+STARTUP_BUDGET = float(os.getenv("INSYNC_STARTUP_BUDGET", "2"))
@@ -1,46 +1,168 @@
+import asyncio
+import gc
+import time
+import tracemalloc
 from contextlib import asynccontextmanager
+from functools import partial
 from logging import getLogger
+from pathlib import Path
 
 from fastapi import FastAPI
 from starlette.middleware import Middleware
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 
-from insync import DB_STR, HOT_RELOAD_ENABLED
-from insync.app.auth_middleware import AuthMiddleware
-from insync.app.jinja_templates import templates_for_package
+from insync import (
+    AUTHS,
+    DB_STR,
+    GC_FREEZE,
+    GC_THRESHOLDS,
+    HOT_RELOAD_ENABLED,
+    SESSIONS_DB_STR,
+    SNAPSHOT_INTERVAL,
+    SNAPSHOT_PATH,
+    SQL_SLOW_LOG_SIZE,
+    SQL_SLOW_THRESHOLD,
+    SQLADMIN_PAGE_SIZE,
+    SQLADMIN_TIMEOUT,
+    STARTUP_BUDGET,
+    TRACEMALLOC_FRAMES,
+    WS_COMPRESS_FRAMES,
+    WS_HEARTBEAT_INTERVAL,
+    WS_IDLE_TIMEOUT,
+    WS_MAX_CONNECTIONS,
+    WS_MAX_CONNECTIONS_PER_USER,
+    XXX_AUTOSAVE_IDLE_DELAY,
+    XXX_AUTOSAVE_MAX_DELAY,
+    XXX_DB_STR,
+    XXX_POOL_SIZE,
+    XXX_POOL_TIMEOUT,
+    XXX_REBALANCE_INTERVAL,
+)
+from insync.app.auth_middleware import AuthMiddleware, TokenUsers
+from insync.app.jinja_filters import asset_version
+from insync.app.jinja_templates import precompile_all_templates, templates_for_package
+from insync.app.metrics_middleware import MetricsMiddleware
+from insync.app.profiling_middleware import ProfilingMiddleware
+from insync.app.sessions import SessionStore
+from insync.app.snapshotter import Snapshotter
+from insync.app.sqlconsole import SqlConsole
 from insync.app.staticfilewhitelist import StaticFilesWithWhitelist
+from insync.app.ws_connections import ConnectionLimits, ConnectionManager
 from insync.app.ws_list_updater import WebSocketListUpdater
+from insync.app.xxx import PoolExhaustedError, create_engine_pool, pool_exhausted, rebalance_periodically, save_item_texts
 from insync.app.xxx import router as xxx_router
+from insync.app.xxx.autosave import EditBuffer
 from insync.db import ListDB
 from insync.listregistry import ListRegistry
+from insync.memory import GcPauses, freeze_heap
+from insync.sqltrace import StatementTracer
 
 logger = getLogger(__name__)
 
 templates = templates_for_package("insync.app")
 
+# relative to the code rather than the working directory
+APP_ROOT = Path(__file__).parent
+PACKAGE_ROOT = APP_ROOT.parent
+
+
+def _add_hot_reload(app: FastAPI) -> None:
+    # only needed in development, so arel and watchfiles are not even imported otherwise
+    import arel
+
+    logger.warning("Arel Hot reload enabled")
+    app.state.hot_reload = arel.HotReload(paths=[arel.Path(str(PACKAGE_ROOT))])
+    app.add_websocket_route("/hot-reload", route=app.state.hot_reload, name="hot-reload")  # type: ignore
+
 
 @asynccontextmanager
 async def _lifespan(app: FastAPI):
-    global hot_reload
-    app.state.db = ListDB(DB_STR)
+    # importing the app has no side effects, every file, database and watcher is opened from here
+    start = time.perf_counter()
+    if TRACEMALLOC_FRAMES:
+        # before anything is loaded, so the registry shows up in the memory report
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    app.state.gc_pauses = GcPauses()
+    app.state.gc_pauses.install()
+
+    if not HOT_RELOAD_ENABLED:
+        static_files.version = asset_version()
+        logger.info(f"Precompiled {precompile_all_templates()} templates")
+        logger.info(f"Indexed {static_files.index()} static assets")
+
+    # one tracer for every connection the app's own queries run on, shown on /sqladmin
+    app.state.sql_tracer = StatementTracer(SQL_SLOW_THRESHOLD, SQL_SLOW_LOG_SIZE)
+    app.state.db = ListDB(DB_STR, app.state.sql_tracer)
     app.state.db.ensure_tables_created()
 
-    app.state.registry = app.state.db.load()
-
-    app.state.ws_list_updater = WebSocketListUpdater(app.state.registry)
+    app.state.registry = app.state.db.load_snapshot(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+    if app.state.registry is None:
+        app.state.registry = app.state.db.load()
+        loaded_from = "database"
+    else:
+        loaded_from = "snapshot"
+    logger.info(f"Loaded {len(app.state.registry)} items from the {loaded_from}")
+    app.state.snapshotter = None
+    if SNAPSHOT_PATH:
+        app.state.snapshotter = Snapshotter(app.state.db, app.state.registry, SNAPSHOT_PATH, SNAPSHOT_INTERVAL)
+        if loaded_from == "snapshot":
+            app.state.snapshotter.mark_current()
+        app.state.snapshot_saver = asyncio.create_task(app.state.snapshotter.run())
+    app.state.sqlconsole = SqlConsole(DB_STR, SQLADMIN_TIMEOUT, SQLADMIN_PAGE_SIZE, live=app.state.db.connection)
+
+    app.state.xxx_engines = create_engine_pool(XXX_DB_STR, XXX_POOL_SIZE, app.state.sql_tracer, XXX_POOL_TIMEOUT)
+    app.state.xxx_rebalancer = asyncio.create_task(rebalance_periodically(app.state.xxx_engines, XXX_REBALANCE_INTERVAL))
+    app.state.xxx_edits = EditBuffer(partial(save_item_texts, app.state.xxx_engines), XXX_AUTOSAVE_IDLE_DELAY, XXX_AUTOSAVE_MAX_DELAY)
+    app.state.xxx_autosaver = asyncio.create_task(app.state.xxx_edits.run())
+
+    app.state.token_users = TokenUsers(AUTHS)
+    app.state.sessions = SessionStore(SESSIONS_DB_STR)
+    app.state.sessions.ensure_tables_created()
+
+    app.state.ws_list_updater = WebSocketListUpdater(app.state.registry, compress_frames=WS_COMPRESS_FRAMES)
+    app.state.ws_connections = ConnectionManager(
+        app.state.ws_list_updater,
+        ConnectionLimits(
+            max_per_user=WS_MAX_CONNECTIONS_PER_USER,
+            max_total=WS_MAX_CONNECTIONS,
+            heartbeat_interval=WS_HEARTBEAT_INTERVAL,
+            idle_timeout=WS_IDLE_TIMEOUT,
+        ),
+    )
 
     if HOT_RELOAD_ENABLED:
-        assert app.state.hot_reload is not None
+        if getattr(app.state, 'hot_reload', None) is None:
+            _add_hot_reload(app)
         await app.state.hot_reload.startup()
 
+    if GC_FREEZE:
+        # the registry and everything set up above live as long as the app, no point in the collector rescanning them
+        logger.info(f"Froze {freeze_heap(GC_THRESHOLDS)} objects, gc thresholds {gc.get_threshold()}")
+
+    app.state.startup_seconds = time.perf_counter() - start
+    if app.state.startup_seconds > STARTUP_BUDGET:
+        logger.warning(f"Startup took {app.state.startup_seconds:.2f}s, over the {STARTUP_BUDGET:g}s budget")
+    else:
+        logger.info(f"Started in {app.state.startup_seconds:.2f}s")
+
     yield
 
     if HOT_RELOAD_ENABLED:
-        assert app.state.hot_reload is not None
         await app.state.hot_reload.shutdown()
 
     app.state.db.patch(app.state.registry)
+    if app.state.snapshotter is not None:
+        app.state.snapshot_saver.cancel()
+        app.state.snapshotter.save()
     app.state.db.close()
+    app.state.sessions.close()
+    app.state.xxx_rebalancer.cancel()
+    app.state.xxx_autosaver.cancel()
+    app.state.xxx_edits.flush()
+    app.state.xxx_engines.close()
+    app.state.gc_pauses.uninstall()
+    if TRACEMALLOC_FRAMES:
+        tracemalloc.stop()
 
 
 def get_registry() -> ListRegistry:
@@ -51,15 +173,36 @@ def get_db() -> ListDB:
     return app.state.db
 
 
+def get_sqlconsole() -> SqlConsole:
+    return app.state.sqlconsole
+
+
+def get_sql_tracer() -> StatementTracer:
+    return app.state.sql_tracer
+
+
+def get_token_users() -> TokenUsers:
+    return app.state.token_users
+
+
+def get_sessions() -> SessionStore:
+    return app.state.sessions
+
+
 def get_ws_list_updater() -> WebSocketListUpdater:
     return app.state.ws_list_updater
 
 
-middleware = []
+def get_ws_connections() -> ConnectionManager:
+    return app.state.ws_connections
+
+
+middleware = [Middleware(MetricsMiddleware)]
 if not HOT_RELOAD_ENABLED:
     middleware.append(Middleware(HTTPSRedirectMiddleware))
 
 middleware.append(Middleware(AuthMiddleware))
+middleware.append(Middleware(ProfilingMiddleware))
 
 app = FastAPI(
     lifespan=_lifespan,
@@ -70,17 +213,10 @@ app = FastAPI(
     middleware=middleware,
 )
 
-if HOT_RELOAD_ENABLED:
-    import arel
-
-    logger.warning("Arel Hot reload enabled")
-
-    app.state.hot_reload = arel.HotReload(paths=[arel.Path("insync")])
-    app.add_websocket_route("/hot-reload", route=app.state.hot_reload, name="hot-reload")  # type: ignore
-
-
-app.mount("/static", lol := StaticFilesWithWhitelist("insync/app/", ['css', 'js', 'svg', 'png', 'ico', 'css.map', 'webmanifest']), name='static')
+static_files = StaticFilesWithWhitelist(str(APP_ROOT), ['css', 'js', 'svg', 'png', 'ico', 'css.map', 'webmanifest'])
+app.mount("/static", static_files, name='static')
 
 app.include_router(xxx_router)
+app.add_exception_handler(PoolExhaustedError, pool_exhausted)
 
-from . import index, sqladmin, ws, checklist, todotxt, login, xxx  # noqa endpoint imports
+from . import index, sqladmin, admin, ws, checklist, todotxt, login, xxx, metrics  # noqa endpoint imports
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).parents[2]
+
+# generous, both are well under half of this on a laptop, fastapi and pydantic alone are most of the import
+IMPORT_BUDGET_SECONDS = 1.5
+FIRST_REQUEST_BUDGET_SECONDS = 3.0
+
+# records what importing the app touches in the repo or cwd besides code (libraries read their own metadata),
+# an empty cwd makes anything it creates visible too
+AUDIT_IMPORT = """
+import os
+import sys
+
+touched = []
+ours = (os.getcwd(), sys.argv[1])
+
+def audit(event, args):
+    path = os.path.abspath(args[0]) if event == 'open' and isinstance(args[0], str) else ''
+    if path.startswith(ours) and not path.endswith(('.py', '.pyc')):
+        touched.append(f'open {path}')
+    elif event in ('sqlite3.connect', 'os.mkdir', 'subprocess.Popen'):
+        touched.append(f'{event} {args[0]}')
+
+sys.addaudithook(audit)
+import insync.app
+print('\\n'.join(touched))
+"""
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from insync.app import app
+with TestClient(app, base_url='https://testserver') as client:
+    assert client.get('/login').status_code == 200
+print(time.perf_counter() - start)
+"""
+
+LOGIN_KEEPS_SNAPSHOT = """
+from fastapi.testclient import TestClient
+from insync.app import app
+with TestClient(app, base_url='https://testserver', follow_redirects=False) as client:
+    app.state.snapshotter.save()
+    assert 'insyncsession=' in client.post('/login', data={'token': 'kaz'}).headers['set-cookie']
+    print(app.state.snapshotter.due())
+"""
+
+
+def run_python(cwd: Path, *args: str, hot_reload: str = 'false') -> subprocess.CompletedProcess[str]:
+    env = os.environ | {
+        'PYTHONPATH': os.pathsep.join([str(REPO_ROOT), *filter(None, [os.environ.get('PYTHONPATH')])]),
+        'HOT_RELOAD_ENABLED': hot_reload,
+        'INSYNC_DB_STR': str(cwd / 'insync.db'),
+        'INSYNC_XXX_DB_STR': str(cwd / 'xxx.db'),
+        'INSYNC_JINJA_BYTECODE_CACHE_DIR': str(cwd / 'jinja_cache'),
+    }
+    result = subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def cumulative_import_seconds(importtime: str, module: str) -> float:
+    # lines look like `import time:  self [us] | cumulative | imported package`
+    for line in importtime.splitlines():
+        _, _, columns = line.partition('import time:')
+        fields = [f.strip() for f in columns.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise AssertionError(f'{module} not in -X importtime output')
+
+
+def test_import_has_no_side_effects(tmp_path: Path) -> None:
+    result = run_python(tmp_path, '-c', AUDIT_IMPORT, str(REPO_ROOT))
+
+    assert result.stdout.split() == []
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('hot_reload', ['true', 'false'])
+def test_import_is_within_budget(tmp_path: Path, hot_reload: str) -> None:
+    importtime = run_python(tmp_path, '-X', 'importtime', '-c', 'import insync.app', hot_reload=hot_reload).stderr
+
+    seconds = cumulative_import_seconds(importtime, 'insync.app')
+    assert seconds < IMPORT_BUDGET_SECONDS, f'import insync.app took {seconds * 1000:.0f}ms'
+    # development only, loaded by the lifespan
+    assert 'arel' not in importtime
+
+
+def test_first_request_is_within_budget(tmp_path: Path) -> None:
+    seconds = float(run_python(tmp_path, '-c', FIRST_REQUEST).stdout)
+    assert seconds < FIRST_REQUEST_BUDGET_SECONDS, f'import, startup and first request took {seconds * 1000:.0f}ms'
+
+
+def test_login_leaves_the_snapshot_current(tmp_path: Path) -> None:
+    assert run_python(tmp_path, '-c', LOGIN_KEEPS_SNAPSHOT).stdout.split() == ['False']
+    assert (tmp_path / 'insync.db.sessions').exists()
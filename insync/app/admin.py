@@ -0,0 +1,115 @@
+import gc
+import tracemalloc
+from pathlib import Path
+from typing import Annotated
+
+from fastapi import Depends, Form, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse
+
+from insync import DB_STR
+from insync.app.auth_middleware import require_admin
+from insync.app.checklist import ChecklistRenderer
+from insync.app.ws_connections import ConnectionManager
+from insync.app.ws_list_updater import WebSocketListUpdater
+from insync.listregistry import ListRegistry
+from insync.memory import memory_report
+from insync.profiling import CAPTURES
+
+from . import app, get_registry, get_ws_connections, get_ws_list_updater, templates
+
+HISTORY_LIMIT = 10
+TRACEMALLOC_FRAMES = 25
+
+
+def file_size(path: str) -> int | None:
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return None
+
+
+@app.get("/admin", response_class=HTMLResponse)
+def get_admin(
+    request: Request,
+    registry: Annotated[ListRegistry, Depends(get_registry)],
+    ws_list_updater: Annotated[WebSocketListUpdater, Depends(get_ws_list_updater)],
+    ws_connections: Annotated[ConnectionManager, Depends(get_ws_connections)],
+) -> HTMLResponse:
+    """Everything here is a counter kept up to date as things change, rendering never walks the registry."""
+    return templates.TemplateResponse(
+        request,
+        "admin.html",
+        {
+            "stats": registry.stats,
+            "undo_depth": registry.undo_depth,
+            "redo_depth": registry.redo_depth,
+            "history": [type(command).__name__ for command in registry.undoview().history(HISTORY_LIMIT)],
+            "connections": ws_connections.counters,
+            "subscribers": ws_list_updater.subscriber_count,
+            "channels": ws_list_updater.channel_count,
+            "db_bytes": file_size(DB_STR),
+            "captures": CAPTURES,
+        },
+    )
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+def post_admin_profile(
+    kind: Annotated[str, Form(pattern="^(request|render)$")],
+    target: Annotated[str, Form()],
+    count: Annotated[int, Form(ge=1, le=100)] = 1,
+) -> RedirectResponse:
+    """Profile the next `count` requests under a path, or websocket renders of a project."""
+    CAPTURES.arm(kind, target, count)
+    return RedirectResponse("/admin", status_code=303)
+
+
+@app.post("/admin/profile/disarm", dependencies=[Depends(require_admin)])
+def post_admin_profile_disarm() -> RedirectResponse:
+    CAPTURES.disarm()
+    return RedirectResponse("/admin", status_code=303)
+
+
+@app.get("/admin/profile/{artifact_id}", dependencies=[Depends(require_admin)])
+def get_admin_profile(artifact_id: int) -> Response:
+    artifact = CAPTURES.get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Profile not found, only the most recent are kept")
+    return Response(artifact.data, media_type="application/octet-stream", headers={"Content-Disposition": f'attachment; filename="{artifact.filename}"'})
+
+
+@app.get("/admin/memory", response_class=HTMLResponse)
+def get_admin_memory(
+    request: Request,
+    registry: Annotated[ListRegistry, Depends(get_registry)],
+    ws_connections: Annotated[ConnectionManager, Depends(get_ws_connections)],
+) -> HTMLResponse:
+    """Unlike /admin this walks every traced allocation, it takes a while on a big registry."""
+    # what each subsystem's memory is divided by for a per unit cost
+    units = {
+        "registry loaded from db": ("item", len(registry)),
+        "commands and their changes": ("command", registry.undo_depth + registry.redo_depth),
+        "cached renders": ("entry", len(ChecklistRenderer.cache)),
+        "websockets": ("connection", ws_connections.counters.live),
+    }
+    return templates.TemplateResponse(
+        request,
+        "admin_memory.html",
+        {
+            "report": memory_report() if tracemalloc.is_tracing() else None,
+            "units": units,
+            "gc_counts": gc.get_count(),
+            "gc_thresholds": gc.get_threshold(),
+            "gc_frozen": gc.get_freeze_count(),
+        },
+    )
+
+
+@app.post("/admin/memory/tracing", dependencies=[Depends(require_admin)])
+def post_admin_memory_tracing(enabled: Annotated[bool, Form()]) -> RedirectResponse:
+    """Only allocations made after tracing starts are reported, set INSYNC_TRACEMALLOC_FRAMES to include startup."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    elif not enabled:
+        tracemalloc.stop()
+    return RedirectResponse("/admin/memory", status_code=303)
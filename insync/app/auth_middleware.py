@@ -1,77 +1,163 @@
 import hashlib
+import hmac
+from collections.abc import Iterable
 from logging import getLogger
+from typing import NamedTuple
 
+import anyio
+from fastapi import HTTPException, Request
 from fastapi.responses import RedirectResponse
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from insync import AUTHS
+from insync import ADMIN_USERS
+from insync.app.sessions import SESSION_MAX_AGE, SessionStore
 
 logger = getLogger(__name__)
 
+SESSION_COOKIE = "insyncsession"
+# pre session cookie holding hash_token(password), honoured once more to swap it for a session cookie
+TOKEN_COOKIE = "insyncauthn"
+
 
 def hash_token(password: str) -> str:
     return hashlib.sha256((password).encode()).hexdigest()
 
 
+def set_session_cookie(response: Response, session_id: str) -> None:
+    response.set_cookie(
+        key=SESSION_COOKIE,
+        value=session_id,
+        max_age=int(SESSION_MAX_AGE.total_seconds()),
+        path="/",
+        secure=True,
+        httponly=True,
+        samesite="none",  # Safe as long as CORS is not enabled
+    )
+    response.delete_cookie(key=TOKEN_COOKIE)
+
+
+class TokenUsers:
+    """hash_token(password) -> user, hashed once up front instead of per request."""
+
+    def __init__(self, auths: Iterable[tuple[str, ...]]):
+        self._hashes = [(hash_token(tok).encode(), u) for u, tok in auths]
+        self._users = {u for _, u in self._hashes}
+
+    def __contains__(self, user: str) -> bool:
+        return user in self._users
+
+    def user_for(self, token_hash: str) -> str | None:
+        # compared against every account in constant time, so the time taken says nothing about how close a guess was
+        candidate = token_hash.encode()
+        found = None
+        for stored, user in self._hashes:
+            if hmac.compare_digest(stored, candidate) and found is None:
+                found = user
+        return found
+
+
+def _get_cookies(scope: Scope, *names: str) -> dict[str, str]:
+    """Only the named cookies from the raw Cookie header(s)."""
+    cookies = {}
+    for key, value in scope.get("headers", []):
+        if key != b"cookie":
+            continue
+        for rcookie in value.split(b";"):
+            name, sep, val = rcookie.decode("utf-8").strip().partition("=")
+            if sep and name in names:
+                cookies[name] = val
+    return cookies
+
+
+class Login(NamedTuple):
+    user: str
+    legacy: bool  # by the token cookie, which should be swapped for a session
+
+
+async def authenticate(scope: Scope, token_users: TokenUsers, sessions: SessionStore) -> Login | None:
+    cookies = _get_cookies(scope, SESSION_COOKIE, TOKEN_COOKIE)
+    session_id = cookies.get(SESSION_COOKIE)
+    if session_id is not None:
+        if sessions.cached(session_id):
+            user = sessions.user_for(session_id)
+        else:
+            # keep the event loop free while sqlite looks it up
+            user = await anyio.to_thread.run_sync(sessions.user_for, session_id)
+        # sessions outlive config changes, drop users that no longer have an account
+        if user is not None and user in token_users:
+            return Login(user, legacy=False)
+    token_hash = cookies.get(TOKEN_COOKIE)
+    if token_hash is not None:
+        user = token_users.user_for(token_hash)
+        if user is not None:
+            return Login(user, legacy=True)
+    return None
+
+
+def _with_session_cookie(send: Send, session_id: str) -> Send:
+    """Have the response set a session cookie and delete the token cookie."""
+    cookies = Response()
+    set_session_cookie(cookies, session_id)
+    headers = [(key, value) for key, value in cookies.raw_headers if key == b"set-cookie"]
+
+    async def send_with_cookies(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), *headers]}
+        await send(message)
+
+    return send_with_cookies
+
+
+def require_admin(request: Request) -> str:
+    """Dependency for endpoints only ADMIN_USERS may use, 403 for every other logged in user."""
+    user = request.scope.get("user")
+    if user not in ADMIN_USERS:
+        raise HTTPException(status_code=403, detail="Only admins can do this")
+    return user
+
+
 class AuthMiddleware:
     def __init__(self, app: ASGIApp):
         self.app = app
 
-    @staticmethod
-    def _get_cookies_from_scope(scope: Scope) -> dict[str, str]:
-        headers = dict(scope.get("headers", []))
-        cookie_header = headers.get(b"cookie", b"")
-        cookies = {}
-        for rcookie in cookie_header.split(b";"):
-            cookie: str = rcookie.decode("utf-8")
-            cookie = cookie.strip()
-            if not cookie:
-                continue
-            key, value = cookie.split("=", 1)
-            cookies[key] = value
-        return cookies
-
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         calltype = scope.get("type")
         if calltype != "http" and calltype != "websocket":
             await self.app(scope, receive, send)
             return
 
-        path = scope.get("path")
-
-        # try to get token and authenticate user
-        cookies = self._get_cookies_from_scope(scope)
-        insyncauthn = cookies.get("insyncauthn")
-        user = None
-        if insyncauthn is not None:
-            for u, tok in AUTHS:
-                if insyncauthn == hash_token(tok):
-                    user = u
-                    break
-
-        logger.debug(f"{path=}, {insyncauthn=}, {user=}")
-        match (path, insyncauthn, user):
-            case ("/login", _, None):
+        path = scope.get("path", "")
+
+        # try to get a session or token and authenticate user
+        state = scope["app"].state
+        login = await authenticate(scope, state.token_users, state.sessions)
+        user = None if login is None else login.user
+        if login is not None and login.legacy and calltype == "http":
+            # the token cookie is the unsalted hash of the password and never expires, swap it for a session on first use
+            session_id = await anyio.to_thread.run_sync(state.sessions.create, login.user)
+            send = _with_session_cookie(send, session_id)
+
+        logger.debug(f"{path=}, {user=}")
+        match (path, user):
+            case ("/login", None):
                 logger.warning("Hitting login page, and not logged in")
                 # login page is the only page that can be accessed without a token
                 asgi_next = self.app
-            case ("/login", _, user):
+            case ("/login", user):
                 # hitting login page, but already logged in
                 logger.warning(f"hitting login page but already logged in {user}")
                 asgi_next = RedirectResponse(url='/', status_code=302)
-            case (_, None, None):
-                logger.warning("No insyncauthn cookie")
-                asgi_next = RedirectResponse(url="/login", status_code=302)
-            case (_, _, None):
-                logger.warning(f"insyncauthn doesn't match an account {user}")
+            case (_, None):
+                logger.warning("No valid session or insyncauthn cookie")
                 asgi_next = RedirectResponse(url="/login", status_code=302)
-            case (_, _, user):
+            case (_, user):
                 logger.debug(f"user is authenticated {user}")
                 # user is authenticated
                 assert user is not None, "User should not be None here, just in case a mistaken code change in the future might break this guarentee."
                 scope["user"] = user
                 asgi_next = self.app
             case _:
-                raise NotImplementedError(f"Unhandled case {path=}, {insyncauthn=}, {user=}")
+                raise NotImplementedError(f"Unhandled case {path=}, {user=}")
 
         await asgi_next(scope, receive, send)
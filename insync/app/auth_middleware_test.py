@@ -0,0 +1,139 @@
+import tracemalloc
+from collections.abc import Iterable
+
+import pytest
+from fastapi import Depends, FastAPI
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from insync.app import app as insync_app
+from insync.app.auth_middleware import SESSION_COOKIE, TOKEN_COOKIE, AuthMiddleware, TokenUsers, hash_token, require_admin
+from insync.app.sessions import SessionStore
+
+
+def test_token_users() -> None:
+    token_users = TokenUsers([('zak', 'kaz'), ('admin', 'skunk')])
+    assert token_users.user_for(hash_token('kaz')) == 'zak'
+    assert token_users.user_for(hash_token('skunk')) == 'admin'
+    assert token_users.user_for(hash_token('wrong')) is None
+    assert token_users.user_for('') is None
+    assert 'zak' in token_users
+    assert 'bob' not in token_users
+
+
+@pytest.fixture
+def sessions() -> Iterable[SessionStore]:
+    store = SessionStore(':memory:')
+    store.ensure_tables_created()
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def client(sessions: SessionStore) -> TestClient:
+    def whoami(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(request.scope.get("user", "anonymous"))
+
+    app = Starlette(
+        routes=[Route("/login", whoami), Route("/whoami", whoami), Route("/static/common/layout.css", whoami)],
+        middleware=[Middleware(AuthMiddleware)],
+    )
+    app.state.token_users = TokenUsers([('zak', 'kaz')])
+    app.state.sessions = sessions
+    return TestClient(app, follow_redirects=False)
+
+
+def test_redirects_without_cookie(client: TestClient) -> None:
+    response = client.get("/whoami")
+    assert response.status_code == 302
+    assert response.headers["location"] == "/login"
+
+
+def test_login_page_is_public(client: TestClient) -> None:
+    assert client.get("/login").text == "anonymous"
+
+
+def test_static_requires_login(client: TestClient) -> None:
+    assert client.get("/static/common/layout.css").status_code == 302
+
+
+def test_session_cookie(client: TestClient, sessions: SessionStore) -> None:
+    client.cookies.set(SESSION_COOKIE, sessions.create('zak'))
+    assert client.get("/whoami").text == "zak"
+
+
+def test_unknown_session_cookie(client: TestClient) -> None:
+    client.cookies.set(SESSION_COOKIE, 'forged')
+    assert client.get("/whoami").status_code == 302
+
+
+def test_session_of_removed_account(client: TestClient, sessions: SessionStore) -> None:
+    client.cookies.set(SESSION_COOKIE, sessions.create('bob'))
+    assert client.get("/whoami").status_code == 302
+
+
+def test_legacy_token_cookie_is_swapped_for_a_session(client: TestClient, sessions: SessionStore) -> None:
+    client.cookies.set(TOKEN_COOKIE, hash_token('kaz'))
+    response = client.get("/whoami")
+    assert response.text == "zak"
+
+    assert any(header.startswith(f'{TOKEN_COOKIE}=""; expires=') for header in response.headers.get_list('set-cookie'))
+    session_id = response.cookies[SESSION_COOKIE]
+    assert sessions.user_for(session_id) == 'zak'
+
+    client.cookies.clear()
+    client.cookies.set(SESSION_COOKIE, session_id)
+    assert client.get("/whoami").text == "zak"
+
+
+def test_wrong_token_cookie(client: TestClient) -> None:
+    client.cookies.set(TOKEN_COOKIE, hash_token('wrong'))
+    assert client.get("/whoami").status_code == 302
+
+
+def test_logged_in_login_redirects_home(client: TestClient, sessions: SessionStore) -> None:
+    client.cookies.set(SESSION_COOKIE, sessions.create('zak'))
+    response = client.get("/login")
+    assert response.status_code == 302
+    assert response.headers["location"] == "/"
+
+
+def test_admin_only_endpoint(sessions: SessionStore) -> None:
+    app = FastAPI(middleware=[Middleware(AuthMiddleware)])
+
+    @app.post("/admin/switch", dependencies=[Depends(require_admin)])
+    def switch() -> str:
+        return "switched"
+
+    app.state.token_users = TokenUsers([('zak', 'kaz'), ('admin', 'skunk')])
+    app.state.sessions = sessions
+    client = TestClient(app)
+
+    client.cookies.set(SESSION_COOKIE, sessions.create('zak'))
+    assert client.post("/admin/switch").status_code == 403
+
+    client.cookies.set(SESSION_COOKIE, sessions.create('admin'))
+    assert client.post("/admin/switch").json() == "switched"
+
+
+def test_only_admins_switch_memory_tracing(sessions: SessionStore) -> None:
+    app = FastAPI(middleware=[Middleware(AuthMiddleware)])
+    app.router.routes.extend(route for route in insync_app.routes if getattr(route, "path", None) == "/admin/memory/tracing")
+    app.state.token_users = TokenUsers([('zak', 'kaz'), ('admin', 'skunk')])
+    app.state.sessions = sessions
+    client = TestClient(app, follow_redirects=False)
+
+    client.cookies.set(SESSION_COOKIE, sessions.create('zak'))
+    try:
+        assert client.post("/admin/memory/tracing", data={"enabled": "true"}).status_code == 403
+        assert not tracemalloc.is_tracing()
+
+        client.cookies.set(SESSION_COOKIE, sessions.create('admin'))
+        assert client.post("/admin/memory/tracing", data={"enabled": "true"}).status_code == 303
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -1,8 +1,9 @@
 from typing import Annotated, Literal
 
 from fastapi import Depends, Form, Request, Response
-from fastapi.responses import HTMLResponse
 
+from insync.app.conditional import cache_headers, is_fresh, not_modified, project_etag
+from insync.app.fragment_cache import FragmentCache
 from insync.app.ws_list_updater import WebSocketListUpdater
 from insync.db import ListDB
 from insync.listitem import ListItem, ListItemProject, ListItemProjectType
@@ -17,10 +18,15 @@ from . import app, get_db, get_registry, get_ws_list_updater, templates
 def checklist_index(
     request: Request,
     registry: Annotated[ListRegistry, Depends(get_registry)],
-) -> HTMLResponse:
-    checklist_listview = registry.search(ListItemProject("", ListItemProjectType.checklist))
+) -> Response:
+    project = ListItemProject("", ListItemProjectType.checklist)
+    etag = project_etag(registry, project)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    checklist_listview = registry.search(project)
     checklist_listview = checklist_listview.active
-    return templates.TemplateResponse(request, "checklist_index.html", {'checklist_listview': checklist_listview})
+    return templates.TemplateStreamResponse(request, "checklist_index.html", {'checklist_listview': checklist_listview}, headers=cache_headers(etag))
 
 
 @app.post("/checklist/{project_name}/undoredo/{undo_or_redo}")
@@ -48,15 +54,31 @@ async def checklist_undo(
 
 
 @app.get("/checklist/{project_name}")
-def checklist(project_name: str, request: Request) -> HTMLResponse:
+def checklist(
+    project_name: str,
+    request: Request,
+    registry: Annotated[ListRegistry, Depends(get_registry)],
+) -> Response:
     project = ListItemProject(project_name, ListItemProjectType.checklist)
-    return templates.TemplateResponse(request, "checklist.html", {"project": project})
+    etag = project_etag(registry, project)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    return templates.TemplateStreamResponse(request, "checklist.html", {"project": project}, headers=cache_headers(etag))
 
 
 class ChecklistRenderer(Renderer):
+    # most items are unchanged between renders, so their html is reused
+    cache = FragmentCache()
+
     @staticmethod
     def render(listview: ListView, undoview: UndoView) -> str:
-        return templates.get_template("checklist_items.html").render(listview=listview.active, undoview=undoview)
+        checkitem = templates.get_template("checklist_item.html").module.checkitem  # type: ignore
+
+        def render_checkitem(item: ListItem) -> str:
+            return ChecklistRenderer.cache.get_or_render(item.uuid, item.version, "checkitem", lambda: checkitem(item))
+
+        return templates.get_template("checklist_items.html").render(listview=listview.active, undoview=undoview, render_checkitem=render_checkitem)
 
 
 @app.post("/checklist/{project_name}/new")
@@ -0,0 +1,38 @@
+// Ask for binary websocket frames, the server encodes (and deflates) each render once and shares the
+// same bytes with every subscriber. Frames start with one header byte: 'u' utf-8, 'z' zlib deflate.
+(function () {
+    if (!('DecompressionStream' in window)) return;  // stay on text frames
+
+    const decoder = new TextDecoder();
+
+    async function decode(data) {
+        if (typeof data === 'string') return data;
+        const bytes = new Uint8Array(data);
+        const body = bytes.subarray(1);
+        if (bytes[0] === 'z'.charCodeAt(0)) {
+            const stream = new Blob([body]).stream().pipeThrough(new DecompressionStream('deflate'));
+            return await new Response(stream).text();
+        }
+        return decoder.decode(body);
+    }
+
+    const createWebSocket = htmx.createWebSocket;
+    htmx.createWebSocket = function (url) {
+        const sep = url.includes('?') ? '&' : '?';
+        const socket = createWebSocket(url + sep + 'frames=binary');
+        socket.binaryType = 'arraybuffer';
+
+        const addEventListener = socket.addEventListener.bind(socket);
+        let received = Promise.resolve();
+        socket.addEventListener = function (type, listener, options) {
+            if (type !== 'message') return addEventListener(type, listener, options);
+            addEventListener(type, function (event) {
+                // decoding is async, chain so updates are still applied in the order they arrived
+                received = received
+                    .then(() => decode(event.data))
+                    .then((text) => listener(new MessageEvent('message', { data: text })));
+            }, options);
+        };
+        return socket;
+    };
+})();
@@ -0,0 +1,6 @@
+// Answer the server's heartbeat pings so this socket isn't evicted as idle, pings are never swapped into the page.
+document.addEventListener('htmx:wsBeforeMessage', function (event) {
+    if (event.detail.message !== 'ping') return;
+    event.preventDefault();
+    event.detail.socketWrapper.send('pong', event.target);
+});
@@ -0,0 +1,11 @@
+// Reconnect websockets with the last registry version this page has seen (see #ws-version),
+// so the server can skip the re-render when nothing changed while we were away.
+(function () {
+    const createWebSocket = htmx.createWebSocket;
+    htmx.createWebSocket = function (url) {
+        const stamp = document.getElementById('ws-version');
+        const since = stamp && stamp.dataset.version ? stamp.dataset.version : '';
+        const sep = url.includes('?') ? '&' : '?';
+        return createWebSocket(url + sep + 'since=' + encodeURIComponent(since));
+    };
+})();
@@ -0,0 +1,38 @@
+from fastapi import Request, Response
+
+from insync import HOT_RELOAD_ENABLED
+from insync.githash import githash
+from insync.listitem import ListItemProject
+from insync.listregistry import ListRegistry
+
+# pages may be kept by the browser, but must be revalidated with their ETag on every use
+CACHE_CONTROL = "private, no-cache"
+
+# with hot reload templates change without the githash changing, so never claim a page is unchanged
+CONDITIONAL_GET_ENABLED = not HOT_RELOAD_ENABLED
+
+
+def project_etag(registry: ListRegistry, project: ListItemProject) -> str:
+    """Strong ETag for a page that depends only on the code and the items of `project`."""
+    return f'"{githash()[0:8]}-{registry.epoch}-{registry.project_version(project)}"'
+
+
+def is_fresh(request: Request, etag: str, enabled: bool = CONDITIONAL_GET_ENABLED) -> bool:
+    """True if the client already holds the page with this ETag, per If-None-Match."""
+    if not enabled:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags or "*" in tags
+
+
+def cache_headers(etag: str, enabled: bool = CONDITIONAL_GET_ENABLED) -> dict[str, str]:
+    if not enabled:
+        return {}
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
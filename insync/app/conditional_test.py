@@ -0,0 +1,56 @@
+from unittest.mock import Mock
+
+import pytest
+
+from insync.app.conditional import CACHE_CONTROL, cache_headers, is_fresh, project_etag
+from insync.listitem import ListItem, ListItemProject, ListItemProjectType
+from insync.listregistry import CompletionCommand, CreateCommand, ListRegistry
+
+
+def request_with(if_none_match: str | None) -> Mock:
+    request = Mock()
+    request.headers = {} if if_none_match is None else {"if-none-match": if_none_match}
+    return request
+
+
+@pytest.mark.parametrize(
+    ('if_none_match', 'fresh'),
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ('*', True),
+        ('"xyz"', False),
+    ],
+)
+def test_is_fresh(if_none_match: str | None, fresh: bool) -> None:
+    assert is_fresh(request_with(if_none_match), '"abc"', enabled=True) is fresh
+
+
+def test_never_fresh_when_disabled() -> None:
+    assert not is_fresh(request_with('"abc"'), '"abc"', enabled=False)
+
+
+def test_cache_headers() -> None:
+    assert cache_headers('"abc"', enabled=True) == {"ETag": '"abc"', "Cache-Control": CACHE_CONTROL}
+    assert cache_headers('"abc"', enabled=False) == {}
+
+
+def test_project_etag_changes_only_when_project_changes() -> None:
+    reg = ListRegistry()
+    grocery = ListItemProject('grocery', ListItemProjectType.checklist)
+    travel = ListItemProject('travel', ListItemProjectType.checklist)
+    item = ListItem('milk', project=ListItemProject('grocery.dairy', ListItemProjectType.checklist))
+    reg.do(CreateCommand(item.uuid, item))
+    grocery_etag, travel_etag = project_etag(reg, grocery), project_etag(reg, travel)
+
+    reg.do(CompletionCommand(item.uuid, True))
+
+    assert project_etag(reg, grocery) != grocery_etag
+    assert project_etag(reg, travel) == travel_etag
+
+
+def test_project_etag_differs_between_registries() -> None:
+    project = ListItemProject('grocery', ListItemProjectType.checklist)
+    assert project_etag(ListRegistry(), project) != project_etag(ListRegistry(), project)
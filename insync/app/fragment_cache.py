@@ -0,0 +1,41 @@
+from collections import OrderedDict
+from collections.abc import Callable
+
+from uuid6 import UUID
+
+
+class FragmentCache:
+    """Bounded LRU of rendered html for single list items.
+
+    Entries are keyed by (uuid, fragment) and remember the item version they were rendered at. Every do/undo bumps
+    the version of the items it touches, so a stale entry misses and is replaced the next time it is asked for.
+    """
+
+    def __init__(self, max_entries: int = 20_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[UUID, str], tuple[int, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_render(self, uuid: UUID, version: int, fragment: str, render: Callable[[], str]) -> str:
+        key = (uuid, fragment)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        html = render()
+        self._entries[key] = (version, html)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return html
+
+    def clear(self) -> None:
+        """Needed when versions stop meaning what they did, e.g. the registry was replaced."""
+        self._entries.clear()
@@ -0,0 +1,59 @@
+from uuid6 import UUID
+
+from insync.app.fragment_cache import FragmentCache
+
+
+class Renders:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, html: str):
+        def _render() -> str:
+            self.count += 1
+            return html
+
+        return _render
+
+
+def test_same_version_is_rendered_once() -> None:
+    cache, renders = FragmentCache(), Renders()
+    assert cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a')) == 'a'
+    assert cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a')) == 'a'
+    assert renders.count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_new_version_rerenders_and_replaces() -> None:
+    cache, renders = FragmentCache(), Renders()
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    assert cache.get_or_render(UUID(int=1), 1, 'checkitem', renders('b')) == 'b'
+    assert renders.count == 2
+    assert len(cache) == 1
+
+
+def test_fragments_are_cached_separately() -> None:
+    cache, renders = FragmentCache(), Renders()
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    assert cache.get_or_render(UUID(int=1), 0, 'todotxt', renders('b')) == 'b'
+    assert len(cache) == 2
+
+
+def test_least_recently_used_is_evicted() -> None:
+    cache, renders = FragmentCache(max_entries=2), Renders()
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    cache.get_or_render(UUID(int=2), 0, 'checkitem', renders('b'))
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    cache.get_or_render(UUID(int=3), 0, 'checkitem', renders('c'))
+
+    assert len(cache) == 2
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    assert renders.count == 3
+    cache.get_or_render(UUID(int=2), 0, 'checkitem', renders('b'))
+    assert renders.count == 4
+
+
+def test_clear() -> None:
+    cache, renders = FragmentCache(), Renders()
+    cache.get_or_render(UUID(int=1), 0, 'checkitem', renders('a'))
+    cache.clear()
+    assert len(cache) == 0
@@ -4,10 +4,17 @@ from typing import TypeVar
 from jinja2 import Environment
 from starlette.datastructures import URL
 
-from insync import HOT_RELOAD_ENABLED, __githash__
+from insync import HOT_RELOAD_ENABLED
+from insync.githash import githash as _githash
 
 F = TypeVar('F', bound=Callable[..., object])
 
+
+def asset_version() -> str:
+    """Static urls carry this as ?v= so browsers can cache them until the next deploy."""
+    return _githash()[0:8]
+
+
 _jinjafilters: dict = {}
 
 
@@ -32,6 +39,6 @@ def apply_filter(items: Iterable[LI], filter_func: Callable[[LI], bool]) -> Iter
 @register_jinja_filter
 def githash(url: URL) -> URL:
     if not HOT_RELOAD_ENABLED:
-        return url.include_query_params(v=__githash__[0:8])
+        return url.include_query_params(v=asset_version())
     else:
         return url
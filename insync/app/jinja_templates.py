@@ -1,15 +1,34 @@
-from collections.abc import Mapping
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
 from typing import Any
 
 from fastapi import Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from jinja2 import Environment, PackageLoader, StrictUndefined
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, StrictUndefined
+from jinja2.bccache import Bucket
 from jinja2_fragments import render_block
 
-from insync import __githash__
+from insync import HOT_RELOAD_ENABLED, JINJA_BYTECODE_CACHE_DIR
 from insync.app.jinja_filters import add_jinja_filters_to_env
 
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def coalesce_chunks(chunks: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Join many tiny chunks (jinja yields one per template node) into fewer ones of roughly `chunk_size`."""
+    buffer: list[str] = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
 
 class Jinja2BlockTemplates(Jinja2Templates):
     def TemplateBlockResponse(
@@ -33,11 +52,70 @@ class Jinja2BlockTemplates(Jinja2Templates):
             headers=headers,
         )
 
+    def TemplateStreamResponse(
+        self,
+        request: Request,
+        name: str,
+        context: dict[str, Any],
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ) -> StreamingResponse:
+        """Like TemplateResponse, but the page is sent while it renders instead of being built into one string first."""
+        template = self.get_template(name)
+        chunks = template.generate(context | {"request": request})
+        return StreamingResponse(
+            coalesce_chunks(chunks),
+            status_code=status_code,
+            headers=headers,
+            media_type="text/html",
+        )
+
+
+class LazyFileSystemBytecodeCache(FileSystemBytecodeCache):
+    """Creates its directory with the first template it writes, rather than when the environment is set up at import."""
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+_templates: list[Jinja2BlockTemplates] = []
+
 
-def templates_for_package(package: str) -> Jinja2BlockTemplates:
-    """Get Jinja2 templates for a package."""
+def templates_for_package(
+    package: str,
+    production: bool = not HOT_RELOAD_ENABLED,
+    bytecode_cache_dir: str | Path = JINJA_BYTECODE_CACHE_DIR,
+) -> Jinja2BlockTemplates:
+    """Get Jinja2 templates for a package.
+
+    In production templates are never re-checked on disk and their compiled bytecode is cached to disk,
+    so a restart doesn't have to compile them again.
+    """
     loader = PackageLoader(package, "")
-    env = Environment(loader=loader, autoescape=False, undefined=StrictUndefined)
-    env.globals["githash"] = __githash__
+    if production:
+        env = Environment(
+            loader=loader,
+            autoescape=False,
+            undefined=StrictUndefined,
+            auto_reload=False,
+            bytecode_cache=LazyFileSystemBytecodeCache(str(bytecode_cache_dir)),
+        )
+    else:
+        env = Environment(loader=loader, autoescape=False, undefined=StrictUndefined)
     add_jinja_filters_to_env(env)
-    return Jinja2BlockTemplates(env=env)
+    templates = Jinja2BlockTemplates(env=env)
+    _templates.append(templates)
+    return templates
+
+
+def precompile_templates(templates: Jinja2Templates) -> int:
+    """Compile (or load from the bytecode cache) every html template up front, returns how many."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+def precompile_all_templates() -> int:
+    return sum(precompile_templates(templates) for templates in _templates)
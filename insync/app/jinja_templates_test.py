@@ -0,0 +1,129 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+
+from insync.app.jinja_templates import Jinja2BlockTemplates, coalesce_chunks, precompile_all_templates, precompile_templates, templates_for_package
+from insync.listitem import ListItem, ListItemProject, ListItemProjectType
+from insync.listregistry import ListRegistry
+
+
+def count_compiles(templates: Jinja2BlockTemplates) -> list[str]:
+    compiled = []
+    compile_ = templates.env.compile
+
+    def _compile(source: str, name: str | None = None, *args, **kwargs):
+        compiled.append(name)
+        return compile_(source, name, *args, **kwargs)
+
+    templates.env.compile = _compile  # type: ignore
+    return compiled
+
+
+def count_loads(templates: Jinja2BlockTemplates) -> list[str]:
+    """Names the loader is asked for, i.e. every template read from disk."""
+    loaded = []
+    get_source = templates.env.loader.get_source  # type: ignore
+
+    def _get_source(environment: Any, name: str) -> Any:
+        loaded.append(name)
+        return get_source(environment, name)
+
+    templates.env.loader.get_source = _get_source  # type: ignore
+    return loaded
+
+
+def checklist_context(templates: Jinja2BlockTemplates, reg: ListRegistry, project: ListItemProject) -> dict[str, Any]:
+    return {
+        'listview': reg.search(project).active,
+        'undoview': reg.undoview(),
+        'render_checkitem': templates.get_template("checklist_item.html").module.checkitem,  # type: ignore
+    }
+
+
+def render_checklist(templates: Jinja2BlockTemplates) -> None:
+    reg = ListRegistry()
+    project = ListItemProject('grocery', ListItemProjectType.checklist)
+    for i in range(100):
+        reg.add(ListItem(f'item {i}', project=ListItemProject(f'grocery.section{i % 5}', ListItemProjectType.checklist)))
+
+    templates.get_template("checklist_items.html").render(checklist_context(templates, reg, project))
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path) -> Path:
+    return tmp_path / 'jinja_cache'
+
+
+def test_precompile_compiles_every_html_template(cache_dir: Path) -> None:
+    templates = templates_for_package("insync.app", production=True, bytecode_cache_dir=cache_dir)
+    compiled = count_compiles(templates)
+
+    n = precompile_templates(templates)
+
+    assert n == len(compiled)
+    assert "checklist_items.html" in compiled
+    assert len(list(cache_dir.iterdir())) == n
+
+
+def test_restart_loads_bytecode_instead_of_compiling(cache_dir: Path) -> None:
+    precompile_templates(templates_for_package("insync.app", production=True, bytecode_cache_dir=cache_dir))
+
+    # a fresh environment is what a restarted process sees
+    restarted = templates_for_package("insync.app", production=True, bytecode_cache_dir=cache_dir)
+    compiled = count_compiles(restarted)
+    render_checklist(restarted)
+
+    assert compiled == []
+
+
+def test_nothing_is_loaded_after_precompiling(cache_dir: Path) -> None:
+    templates = templates_for_package("insync.app", production=True, bytecode_cache_dir=cache_dir)
+    precompile_all_templates()
+    loaded = count_loads(templates)
+    compiled = count_compiles(templates)
+
+    render_checklist(templates)
+
+    assert loaded == []
+    assert compiled == []
+
+
+def test_production_templates_are_not_checked_for_changes(cache_dir: Path) -> None:
+    templates = templates_for_package("insync.app", production=True, bytecode_cache_dir=cache_dir)
+    template = templates.get_template("checklist_items.html")
+
+    assert templates.env.auto_reload is False
+    assert templates.get_template("checklist_items.html") is template
+
+
+def test_development_templates_reload() -> None:
+    templates = templates_for_package("insync.app", production=False)
+    assert templates.env.auto_reload is True
+    assert templates.env.bytecode_cache is None
+
+
+def test_coalesce_chunks_joins_small_chunks() -> None:
+    chunks = list(coalesce_chunks(['ab', 'cd', 'e', 'fgh', 'i'], chunk_size=4))
+    assert chunks == ['abcd', 'efgh', 'i']
+
+
+def test_coalesce_chunks_of_nothing() -> None:
+    assert list(coalesce_chunks([])) == []
+
+
+async def test_stream_response_matches_full_render(anyio_backend: tuple[str, dict[str, Any]]) -> None:
+    templates = templates_for_package("insync.app", production=False)
+    reg = ListRegistry()
+    project = ListItemProject('grocery', ListItemProjectType.checklist)
+    for i in range(500):
+        reg.add(ListItem(f'item {i}', project=project))
+    context = checklist_context(templates, reg, project)
+
+    response = templates.TemplateStreamResponse(Mock(), "checklist_items.html", context)
+    chunks = [chunk async for chunk in response.body_iterator]
+
+    assert len(chunks) > 1
+    assert ''.join(chunks) == templates.get_template("checklist_items.html").render(context)
+    assert response.media_type == "text/html"
@@ -1,11 +1,13 @@
 from logging import getLogger
 from typing import Annotated
 
-from fastapi import Form, Request
+from fastapi import Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 
-from . import app, templates
-from .auth_middleware import hash_token
+from insync.app.sessions import SessionStore
+
+from . import app, get_sessions, get_token_users, templates
+from .auth_middleware import SESSION_COOKIE, TOKEN_COOKIE, TokenUsers, hash_token, set_session_cookie
 
 logger = getLogger(__name__)
 
@@ -16,24 +18,28 @@ def get_login(request: Request) -> HTMLResponse:
 
 
 @app.post("/login")
-def post_login(token: Annotated[str, Form()]) -> RedirectResponse:
-    token_hashed = hash_token(token)
+def post_login(
+    token: Annotated[str, Form()],
+    token_users: Annotated[TokenUsers, Depends(get_token_users)],
+    sessions: Annotated[SessionStore, Depends(get_sessions)],
+) -> RedirectResponse:
     response = RedirectResponse("/login", status_code=302)
 
-    response.set_cookie(
-        key="insyncauthn",
-        value=token_hashed,
-        max_age=400 * 24 * 60 * 60,  # 400 days
-        path="/",
-        secure=True,
-        httponly=True,
-        samesite="none",  # Safe as long as CORS is not enabled
-    )
+    user = token_users.user_for(hash_token(token))
+    if user is None:
+        logger.warning("Failed login attempt")
+        return response
+
+    set_session_cookie(response, sessions.create(user))
     return response
 
 
 @app.get("/logout")
-def logout() -> RedirectResponse:
+def logout(request: Request, sessions: Annotated[SessionStore, Depends(get_sessions)]) -> RedirectResponse:
+    session_id = request.cookies.get(SESSION_COOKIE)
+    if session_id is not None:
+        sessions.revoke(session_id)
     response = RedirectResponse("/login", status_code=302)
-    response.delete_cookie(key="insyncauthn")
+    response.delete_cookie(key=SESSION_COOKIE)
+    response.delete_cookie(key=TOKEN_COOKIE)
     return response
@@ -0,0 +1,45 @@
+import gc
+from collections.abc import Callable
+
+from fastapi import Response
+
+from insync.metrics import REGISTRY, Counter, Gauge
+
+from . import app
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _from_state(read: Callable[..., float], *names: str) -> Callable[[], float | None]:
+    """Read a value off app.state objects at scrape time, None (no sample) before the lifespan has set them up."""
+
+    def value() -> float | None:
+        objects = [getattr(app.state, name, None) for name in names]
+        if any(obj is None for obj in objects):
+            return None
+        return read(*objects)
+
+    return value
+
+
+def _payload_stat(name: str) -> Callable[[], float | None]:
+    return _from_state(lambda updater: getattr(updater.payload_stats, name), "ws_list_updater")
+
+
+Gauge("insync_registry_items", "Items in the in-memory registry", function=_from_state(len, "registry"))
+Gauge("insync_undo_depth", "Commands on the undo stack", function=_from_state(lambda registry: registry.undo_depth, "registry"))
+Gauge("insync_ws_connections", "Open update websockets", function=_from_state(lambda connections: connections.counters.live, "ws_connections"))
+Counter("insync_ws_evicted", "Update websockets evicted for not answering pings", function=_from_state(lambda connections: connections.counters.evicted, "ws_connections"))
+Counter("insync_ws_limited", "Update websockets refused by the connection limits", function=_from_state(lambda connections: connections.counters.limited, "ws_connections"))
+Counter("insync_ws_frame_raw_bytes", "UTF-8 size of every websocket frame encoded for binary subscribers", function=_payload_stat("raw_bytes"))
+Counter("insync_ws_frame_encoded_bytes", "Wire size of every websocket frame encoded for binary subscribers", function=_payload_stat("encoded_bytes"))
+Counter("insync_ws_frame_bytes_saved", "Bytes not sent by compressing frames, over the raw UTF-8 to every binary subscriber", function=_payload_stat("bytes_saved"))
+Gauge("insync_ws_frame_compression_ratio", "Raw over encoded bytes of every websocket frame so far", function=_payload_stat("compression_ratio"))
+Gauge("insync_startup_seconds", "Seconds from the start of the lifespan until ready to serve", function=_from_state(float, "startup_seconds"))
+Gauge("insync_gc_frozen_objects", "Objects moved out of the cyclic collector's reach by INSYNC_GC_FREEZE", function=gc.get_freeze_count)
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus text format, behind the same login as every other page."""
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,42 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from insync.metrics import Histogram
+
+REQUEST_SECONDS = Histogram("insync_http_request_seconds", "HTTP request duration until the response body is sent", ["method", "route", "status"])
+
+
+def route_label(scope: Scope) -> str:
+    """The matched route's path template, so ids in urls don't make a label per item."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # mounts (static files) only leave their prefix behind
+    return scope.get("root_path") or "unmatched"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request, outermost so redirects and auth rejections are counted too."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.labels(scope["method"], route_label(scope), status).observe(time.perf_counter() - start)
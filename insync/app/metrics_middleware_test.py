@@ -0,0 +1,27 @@
+from fastapi import FastAPI
+from starlette.middleware import Middleware
+from starlette.testclient import TestClient
+
+from insync.app.metrics_middleware import REQUEST_SECONDS, MetricsMiddleware
+
+
+def _count(method: str, route: str, status: int) -> int:
+    return REQUEST_SECONDS.labels(method, route, status).count
+
+
+def test_requests_are_labelled_by_route_template() -> None:
+    app = FastAPI(middleware=[Middleware(MetricsMiddleware)])
+
+    @app.get("/metricstest/{item_id}")
+    def item(item_id: str) -> str:
+        return item_id
+
+    client = TestClient(app)
+    before = _count("GET", "/metricstest/{item_id}", 200)
+    client.get("/metricstest/1")
+    client.get("/metricstest/2")
+    assert _count("GET", "/metricstest/{item_id}", 200) == before + 2
+
+    before = _count("GET", "unmatched", 404)
+    client.get("/nowhere")
+    assert _count("GET", "unmatched", 404) == before + 1
@@ -0,0 +1,18 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from insync.profiling import CAPTURES
+
+
+class ProfilingMiddleware:
+    """Samples requests armed on /admin, innermost so only logged in requests are profiled."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not CAPTURES.pending:
+            await self.app(scope, receive, send)
+            return
+
+        with CAPTURES.request(f"{scope['method']} {scope['path']}", scope["path"]):
+            await self.app(scope, receive, send)
@@ -0,0 +1,109 @@
+import datetime as dt
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+
+SESSION_MAX_AGE = dt.timedelta(days=400)
+
+
+def _session_key(session_id: str) -> str:
+    # only a hash is persisted, so a copy of the database can't be used to log in
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+class SessionStore:
+    """Opaque session ids mapped to users, persisted in SQLite with an in-memory LRU in front.
+
+    Sessions found and session ids not found are cached apart, so guessing session ids can't evict real sessions,
+    and repeating a bogus one doesn't query the database every time. Safe to share between threads.
+    """
+
+    def __init__(self, db_path: str | os.PathLike, cache_size: int = 1024, max_age: dt.timedelta = SESSION_MAX_AGE):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # the connection and both caches, used from the event loop as well as threadpool requests
+        self._lock = threading.Lock()
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self._cache: OrderedDict[str, tuple[str, dt.datetime]] = OrderedDict()
+        self._missing: OrderedDict[str, None] = OrderedDict()
+
+    def ensure_tables_created(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session (
+                    session_key TEXT PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    expires TEXT NOT NULL
+                    )
+                """,
+            )
+            self._conn.commit()
+
+    def create(self, user: str) -> str:
+        """Start a session for `user`, returns the session id to hand to the client."""
+        session_id = secrets.token_urlsafe(32)
+        expires = dt.datetime.now(dt.timezone.utc) + self.max_age
+        key = _session_key(session_id)
+        with self._lock:
+            self._conn.execute("INSERT INTO session (session_key, user, expires) VALUES (?, ?, ?)", (key, user, expires.isoformat()))
+            self._conn.commit()
+            self._missing.pop(key, None)
+        return session_id
+
+    def cached(self, session_id: str) -> bool:
+        """Whether user_for can answer from memory, without touching the database."""
+        key = _session_key(session_id)
+        with self._lock:
+            if key in self._missing:
+                return True
+            entry = self._cache.get(key)
+            # an expired session is revoked, which writes
+            return entry is not None and entry[1] > dt.datetime.now(dt.timezone.utc)
+
+    def user_for(self, session_id: str) -> str | None:
+        key = _session_key(session_id)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                if key in self._missing:
+                    return None
+                row = self._conn.execute("SELECT user, expires FROM session WHERE session_key = ?", (key,)).fetchone()
+                if row is None:
+                    self._remember_missing(key)
+                    return None
+                entry = (row[0], dt.datetime.fromisoformat(row[1]))
+
+            user, expires = entry
+            if expires <= dt.datetime.now(dt.timezone.utc):
+                self._revoke(key)
+                return None
+
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return user
+
+    def _remember_missing(self, key: str) -> None:
+        self._missing[key] = None
+        self._missing.move_to_end(key)
+        if len(self._missing) > self.cache_size:
+            self._missing.popitem(last=False)
+
+    def revoke(self, session_id: str) -> None:
+        with self._lock:
+            self._revoke(_session_key(session_id))
+
+    def _revoke(self, key: str) -> None:
+        self._cache.pop(key, None)
+        self._conn.execute("DELETE FROM session WHERE session_key = ?", (key,))
+        self._conn.commit()
+        self._remember_missing(key)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
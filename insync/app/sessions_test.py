@@ -0,0 +1,114 @@
+import datetime as dt
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from insync.app.sessions import SessionStore
+
+
+@pytest.fixture
+def sessions() -> Iterable[SessionStore]:
+    store = SessionStore(':memory:', cache_size=2)
+    store.ensure_tables_created()
+    yield store
+    store.close()
+
+
+def test_prexisting_tables_doesnt_raise(sessions: SessionStore) -> None:
+    sessions.ensure_tables_created()
+
+
+def test_create_and_lookup(sessions: SessionStore) -> None:
+    session_id = sessions.create('zak')
+    assert sessions.user_for(session_id) == 'zak'
+    assert sessions.user_for(session_id) == 'zak'  # cached
+
+
+def test_unknown_session(sessions: SessionStore) -> None:
+    assert sessions.user_for('nope') is None
+
+
+def test_unknown_session_is_cached(sessions: SessionStore) -> None:
+    assert not sessions.cached('nope')
+    sessions.user_for('nope')
+    assert sessions.cached('nope')
+    assert sessions.user_for('nope') is None
+
+
+def test_found_session_is_cached(sessions: SessionStore) -> None:
+    session_id = sessions.create('zak')
+    assert not sessions.cached(session_id)
+    sessions.user_for(session_id)
+    assert sessions.cached(session_id)
+
+
+def test_session_ids_are_unique(sessions: SessionStore) -> None:
+    assert sessions.create('zak') != sessions.create('zak')
+
+
+def test_revoke(sessions: SessionStore) -> None:
+    session_id = sessions.create('zak')
+    sessions.user_for(session_id)
+    sessions.revoke(session_id)
+    assert sessions.user_for(session_id) is None
+
+
+def test_lru_is_bounded_and_falls_back_to_db(sessions: SessionStore) -> None:
+    ids = [sessions.create(f'user{i}') for i in range(5)]
+    for session_id in ids:
+        sessions.user_for(session_id)
+    assert sessions.user_for(ids[0]) == 'user0'
+
+
+def test_shared_between_threads(sessions: SessionStore) -> None:
+    errors = []
+
+    def login_and_out() -> None:
+        try:
+            for _ in range(50):
+                session_id = sessions.create('zak')
+                assert sessions.user_for(session_id) == 'zak'
+                sessions.user_for('bogus')
+                sessions.revoke(session_id)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=login_and_out) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_expired_session() -> None:
+    store = SessionStore(':memory:', max_age=dt.timedelta(seconds=-1))
+    store.ensure_tables_created()
+    session_id = store.create('zak')
+    assert store.user_for(session_id) is None
+
+
+def test_persists_across_instances(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path / 'sessions.db')
+    store.ensure_tables_created()
+    session_id = store.create('zak')
+    store.close()
+
+    store = SessionStore(tmp_path / 'sessions.db')
+    assert store.user_for(session_id) == 'zak'
+    store.close()
+
+
+def test_only_hash_of_session_id_is_stored(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path / 'sessions.db')
+    store.ensure_tables_created()
+    session_id = store.create('zak')
+    store.close()
+
+    with sqlite3.connect(tmp_path / 'sessions.db') as conn:
+        stored = [row[0] for row in conn.execute("SELECT session_key FROM session")]
+    assert len(stored) == 1
+    assert session_id not in stored
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import threading
+from logging import getLogger
+
+import anyio
+
+from insync.db import ListDB
+from insync.listregistry import ListRegistry
+
+logger = getLogger(__name__)
+
+
+class Snapshotter:
+    """Keeps the registry snapshot of a ListDB current, so the next start can skip loading the database.
+
+    The snapshot is saved every `interval` seconds if the registry or the database changed since the last one, and
+    once more on shutdown. One saved while a patch commits is tagged with the change before it, so at worst it is
+    found stale and the database is loaded instead.
+    """
+
+    def __init__(self, db: ListDB, registry: ListRegistry, path: str | os.PathLike, interval: float = 300.0):
+        self.db = db
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._saved: tuple[int, int | None] | None = None
+        # the save on shutdown may start while a periodic one is still running in its thread
+        self._lock = threading.Lock()
+        self.saves = 0
+
+    def _state(self) -> tuple[int, int | None]:
+        return self.registry.version, self.db.change_counter()
+
+    def mark_current(self) -> None:
+        """The snapshot at `path` is what the registry was just loaded from."""
+        self._saved = self._state()
+
+    def due(self) -> bool:
+        return self._state() != self._saved
+
+    def save(self) -> int:
+        """Returns the size of the snapshot."""
+        with self._lock:
+            state = self._state()
+            size = self.db.save_snapshot(self.registry, self.path)
+            self._saved = state
+            self.saves += 1
+            return size
+
+    async def run(self) -> None:
+        """Lifespan task saving the snapshot whenever it's out of date."""
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.due():
+                continue
+            try:
+                size = await anyio.to_thread.run_sync(self.save)
+            except Exception:
+                logger.exception("Saving the registry snapshot failed, will retry")
+                continue
+            logger.info(f"Saved {len(self.registry)} items to the {size / 1e6:.1f}MB registry snapshot")
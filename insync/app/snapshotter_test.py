@@ -0,0 +1,46 @@
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from insync.app.snapshotter import Snapshotter
+from insync.db import ListDB
+from insync.listitem import ListItem
+from insync.listregistry import CreateCommand, ListRegistry
+
+
+@pytest.fixture()
+def db(tmp_path: Path) -> Iterable[ListDB]:
+    _db = ListDB(tmp_path / 'insync.db')
+    _db.ensure_tables_created()
+    yield _db
+    _db.close()
+
+
+def test_saved_again_only_once_registry_or_db_change(tmp_path: Path, db: ListDB) -> None:
+    reg = ListRegistry()
+    snapshotter = Snapshotter(db, reg, tmp_path / 'insync.db.snapshot')
+    assert snapshotter.due()
+
+    snapshotter.save()
+    assert not snapshotter.due()
+
+    item = ListItem('milk')
+    reg.do(CreateCommand(item.uuid, item))
+    assert snapshotter.due()
+    snapshotter.save()
+
+    # e.g. a row changed from /sqladmin
+    db.patch(reg)
+    assert snapshotter.due()
+
+
+def test_loaded_snapshot_is_current(tmp_path: Path, db: ListDB) -> None:
+    path = tmp_path / 'insync.db.snapshot'
+    Snapshotter(db, ListRegistry(), path).save()
+
+    reg = db.load_snapshot(path)
+    assert reg is not None
+    snapshotter = Snapshotter(db, reg, path)
+    snapshotter.mark_current()
+    assert not snapshotter.due()
@@ -1,11 +1,15 @@
 from typing import Annotated
 
 from fastapi import Depends, Form, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 
+from insync.app.checklist import ChecklistRenderer
+from insync.app.jinja_templates import coalesce_chunks
+from insync.app.sqlconsole import SqlConsole
 from insync.db import ListDB
+from insync.sqltrace import StatementTracer
 
-from . import app, get_db, templates
+from . import app, get_db, get_sql_tracer, get_sqlconsole, templates
 
 @app.post("/reload", response_class=HTMLResponse)
 def reload(request: Request) -> HTMLResponse:
@@ -17,41 +21,31 @@ def reload(request: Request) -> HTMLResponse:
             setattr(old_obj, field.name, getattr(new_obj, field.name))
     new_registry = app.state.db.load()
     _inplace_replace_dataclass(request.app.state.registry, new_registry)
+    request.app.state.ws_list_updater.reset_history()
+    # item versions restart with the new registry
+    ChecklistRenderer.cache.clear()
     return HTMLResponse(content="Reloaded")
 
 @app.get("/sqladmin", response_class=HTMLResponse)
-def get_sqladmin(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(request, "sqladmin.html", {})
-
-
-@app.post("/sqladmin", response_class=HTMLResponse)
+def get_sqladmin(request: Request, db: Annotated[ListDB, Depends(get_db)], tracer: Annotated[StatementTracer, Depends(get_sql_tracer)]) -> HTMLResponse:
+    return templates.TemplateResponse(
+        request,
+        "sqladmin.html",
+        {
+            "statement_stats": db.stats.snapshot(),
+            "traced_stats": tracer.snapshot(),
+            "slow_statements": tracer.slow_log(),
+            "slow_threshold": tracer.slow,
+        },
+    )
+
+
+@app.post("/sqladmin")
 def post_sqladmin(
-    db: Annotated[ListDB, Depends(get_db)],
+    console: Annotated[SqlConsole, Depends(get_sqlconsole)],
     sql: Annotated[str, Form()],
-) -> HTMLResponse:
-    cur = db._conn.cursor()  # noqa
-    try:
-        result = cur.execute(sql)
-        cur.connection.commit()
-    except Exception as e:
-        return HTMLResponse(content=f"<p>Error: {e}</p>")
-
-    if cur.description is None:
-        response = '<p>Query executed successfully.</p>'
-        records_affected = cur.rowcount
-        response += f"<p>{records_affected} records affected.</p>"
-        return HTMLResponse(content=response)
-
-    html = "<table>"
-    html += "<tr>"
-    for col in cur.description:
-        html += f"<th>{col[0]}</th>"
-    html += "</tr>"
-    # add rows
-    for row in result:
-        html += "<tr>"
-        for col in row:
-            html += f"<td>{col}</td>"
-        html += "</tr>"
-    html += "</table>"
-    return HTMLResponse(content=html)
+    offset: Annotated[int, Form()] = 0,
+    allow_writes: Annotated[bool, Form()] = False,
+    explain: Annotated[bool, Form()] = False,
+) -> StreamingResponse:
+    return StreamingResponse(coalesce_chunks(console.run(sql, offset, allow_writes, explain)), media_type="text/html")
@@ -0,0 +1,231 @@
+import json
+import re
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from html import escape
+from pathlib import Path
+
+# comments, quoted strings and identifiers as whole tokens so nothing inside them is mistaken for a keyword
+_TOKENS = re.compile(r"""--[^\n]*|/\*.*?(?:\*/|$)|'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|[()]|\w+""", re.DOTALL)
+_STATEMENT_KEYWORDS = {"SELECT", "VALUES", "INSERT", "REPLACE", "UPDATE", "DELETE"}
+_QUERY_KEYWORDS = {"SELECT", "VALUES"}
+
+# sqlite checks the progress handler every this many VM instructions
+PROGRESS_INTERVAL = 1000
+
+
+def statement_keyword(sql: str) -> str | None:
+    """The keyword saying what a statement does, for WITH the one after its common table expressions."""
+    depth = 0
+    first = None
+    for token in _TOKENS.findall(sql):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and (token[0].isalnum() or token[0] == "_"):
+            word = token.upper()
+            if first is None:
+                first = word
+                if word != "WITH":
+                    return word
+            elif word in _STATEMENT_KEYWORDS:
+                return word
+    return first
+
+
+def is_query(sql: str) -> bool:
+    """True for statements that can be wrapped in a subquery and paged."""
+    return statement_keyword(sql) in _QUERY_KEYWORDS
+
+
+@dataclass
+class RunStats:
+    """What one console run executed and what it cost."""
+
+    query: str = ""
+    params: tuple = ()
+    rows: int = 0
+    # progress handler calls, each one PROGRESS_INTERVAL VM instructions
+    progress_calls: int = 0
+    seconds: float = 0.0
+
+    @property
+    def vm_instructions(self) -> int:
+        return self.progress_calls * PROGRESS_INTERVAL
+
+
+def render_plan(plan: list[tuple]) -> str:
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as an indented tree."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in plan:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+class SqlConsole:
+    """Ad-hoc SQL against the list database for /sqladmin, kept from getting in the way of the app.
+
+    Every run gets its own connection, read-only unless writes are explicitly allowed, and is interrupted once it
+    exceeds `timeout` seconds. Queries are paged with LIMIT/OFFSET, keeping their own ORDER BY, and the results come
+    back as HTML chunks while the rows are still being read.
+
+    A `:memory:` database only exists on the app's own connection, pass it as `live`. Writes then run on it, and
+    reads on a copy of it.
+    """
+
+    def __init__(self, db_path: str | Path, timeout: float = 2.0, page_size: int = 200, live: sqlite3.Connection | None = None):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.page_size = page_size
+        self.live = live
+
+    @property
+    def in_memory(self) -> bool:
+        return str(self.db_path) == ":memory:"
+
+    def connect(self, writable: bool = False) -> sqlite3.Connection:
+        # results stream from starlette's threadpool, so the connection may hop threads between rows
+        if writable:
+            return sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        if self.in_memory:
+            if self.live is None:
+                raise sqlite3.OperationalError("an in-memory database can only be read through the app's connection")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self.live.backup(conn)
+        else:
+            conn = sqlite3.connect(f"{Path(self.db_path).absolute().as_uri()}?mode=ro", uri=True, timeout=self.timeout, check_same_thread=False)
+        # also refuses writes to anything ATTACHed
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def _connection(self, writable: bool) -> Iterator[sqlite3.Connection]:
+        if writable and self.in_memory:
+            if self.live is None:
+                raise sqlite3.OperationalError("an in-memory database can only be written through the app's connection")
+            # shared with the app, so only borrowed, never closed
+            try:
+                yield self.live
+            finally:
+                self.live.set_progress_handler(None, PROGRESS_INTERVAL)
+            return
+        conn = self.connect(writable)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def run(self, sql: str, offset: int = 0, allow_writes: bool = False, explain: bool = False) -> Iterator[str]:
+        """Execute `sql` and yield the result as HTML, a query's rows starting at `offset`.
+
+        With `explain` the result is followed by the query plan, wall time and work done.
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            with self._connection(writable=allow_writes) as conn:
+                yield from self._run(conn, sql, offset, allow_writes, explain, deadline)
+        except sqlite3.Error as e:
+            yield f"<p>Error: {escape(str(e))}</p>"
+
+    def _run(self, conn: sqlite3.Connection, sql: str, offset: int, allow_writes: bool, explain: bool, deadline: float) -> Iterator[str]:
+        stats = RunStats()
+
+        def progress() -> bool:
+            stats.progress_calls += 1
+            return time.monotonic() > deadline
+
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        in_table = False
+        try:
+            started = time.perf_counter()
+            for chunk in self._page(conn, sql, offset, stats) if is_query(sql) else self._statement(conn, sql, stats):
+                in_table = (in_table or chunk.startswith("<table>")) and not chunk.startswith("</table>")
+                yield chunk
+            conn.commit()
+            stats.seconds = time.perf_counter() - started
+            if explain:
+                yield self._explain(conn, stats)
+        except (sqlite3.Error, ValueError) as e:
+            conn.rollback()
+            # the error may cut a table short halfway through streaming it
+            yield ("</table>" if in_table else "") + f"<p>Error: {escape(self._describe_error(e, allow_writes))}</p>"
+
+    def _explain(self, conn: sqlite3.Connection, stats: RunStats) -> str:
+        try:
+            plan = render_plan(conn.execute(f"EXPLAIN QUERY PLAN {stats.query}", stats.params).fetchall())
+        except sqlite3.Error as e:
+            # EXPLAIN itself can't be explained, PRAGMA just comes back with an empty plan
+            plan = f"no plan: {e}"
+        return (
+            "<details open><summary>Plan and timing</summary>"
+            f"<p>{stats.seconds * 1000:.2f} ms wall time, {stats.rows} rows, about {stats.vm_instructions:,} VM instructions</p>"
+            f"<pre>{escape(plan or 'no plan')}</pre>"
+            "</details>"
+        )
+
+    def _describe_error(self, e: Exception, allow_writes: bool) -> str:
+        message = str(e)
+        if message == "interrupted":
+            return f"cancelled after {self.timeout:g}s"
+        if "readonly" in message and not allow_writes:
+            return f"{message}, tick 'Allow writes' to run statements that modify the database"
+        return message
+
+    def _page(self, conn: sqlite3.Connection, sql: str, offset: int, stats: RunStats) -> Iterator[str]:
+        # No ORDER BY is added, the query's own decides the order, and sqlite keeps a subquery's order when the outer
+        # query has none. Paging by a column instead would drop rows sharing a value across the page boundary.
+        # Newlines keep a trailing -- comment from swallowing the closing parenthesis
+        subquery = f"(\n{sql.strip().rstrip(';')}\n)"
+        stats.query, stats.params = f"SELECT * FROM {subquery} LIMIT ? OFFSET ?", (self.page_size + 1, max(offset, 0))
+        cur = conn.execute(stats.query, stats.params)
+
+        yield from self._header([d[0] for d in cur.description])
+        for n, row in enumerate(cur):
+            if n == self.page_size:
+                yield "</table>"
+                yield self._next_page_button(sql, offset + self.page_size)
+                return
+            yield self._row(row)
+            stats.rows += 1
+        yield "</table>"
+
+    def _statement(self, conn: sqlite3.Connection, sql: str, stats: RunStats) -> Iterator[str]:
+        stats.query = sql
+        changes = conn.total_changes
+        cur = conn.execute(sql)
+        if cur.description is None:
+            # rowcount is -1 for a WITH ... DELETE and the like
+            stats.rows = cur.rowcount if cur.rowcount >= 0 else conn.total_changes - changes
+            yield f"<p>Query executed successfully.</p><p>{stats.rows} records affected.</p>"
+            return
+        # PRAGMA, EXPLAIN and RETURNING can't be paged, show the first page only
+        yield from self._header([d[0] for d in cur.description])
+        for n, row in enumerate(cur):
+            if n == self.page_size:
+                yield f"</table><p>Showing the first {self.page_size} rows.</p>"
+                return
+            yield self._row(row)
+            stats.rows += 1
+        yield "</table>"
+
+    @staticmethod
+    def _header(columns: list[str]) -> Iterator[str]:
+        yield "<table><tr>"
+        for column in columns:
+            yield f"<th>{escape(column)}</th>"
+        yield "</tr>"
+
+    @staticmethod
+    def _row(row: tuple) -> str:
+        return "<tr>" + "".join(f"<td>{escape(str(col))}</td>" for col in row) + "</tr>"
+
+    @staticmethod
+    def _next_page_button(sql: str, offset: int) -> str:
+        vals = escape(json.dumps({"sql": sql, "offset": offset}))
+        return f'<button class="outline" hx-post="/sqladmin" hx-target="#results" hx-vals="{vals}">Next page</button>'
@@ -0,0 +1,147 @@
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from insync.app.sqlconsole import SqlConsole, is_query, render_plan
+
+
+@pytest.fixture
+def console(tmp_path: Path) -> SqlConsole:
+    db_path = tmp_path / 'list.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE list (uuid BLOB PRIMARY KEY, n INTEGER, description TEXT, parity INTEGER)")
+    conn.executemany("INSERT INTO list VALUES (?, ?, ?, ?)", [(bytes([i]) * 4, i, f"item {i}", i % 2) for i in range(25)])
+    conn.commit()
+    conn.close()
+    return SqlConsole(db_path, timeout=0.5, page_size=10)
+
+
+def _run(console: SqlConsole, sql: str, offset: int = 0, allow_writes: bool = False, explain: bool = False) -> str:
+    return ''.join(console.run(sql, offset, allow_writes, explain))
+
+
+def _cells(html: str) -> list[str]:
+    return re.findall(r"<td>(.*?)</td>", html)
+
+
+def _next_offset(html: str) -> int | None:
+    match = re.search(r'&quot;offset&quot;: (\d+)', html)
+    return None if match is None else int(match.group(1))
+
+
+def _all_pages(console: SqlConsole, sql: str) -> list[list[str]]:
+    pages = []
+    offset: int | None = 0
+    while offset is not None:
+        html = _run(console, sql, offset)
+        pages.append(_cells(html))
+        offset = _next_offset(html)
+    return pages
+
+
+def test_is_query() -> None:
+    assert is_query("select 1")
+    assert is_query("  -- comment\n/* block */ WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not is_query("PRAGMA table_info(list)")
+    assert not is_query("DELETE FROM list")
+    assert is_query("VALUES (1)")
+
+
+@pytest.mark.parametrize(
+    'sql',
+    [
+        "WITH old AS (SELECT n FROM list WHERE n < 5) DELETE FROM list WHERE n IN old",
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c LIMIT 3) INSERT INTO list (n) SELECT x FROM c",
+        "with x as (select 'select') update list set n = 0",
+    ],
+)
+def test_with_writes_are_not_queries(sql: str) -> None:
+    assert not is_query(sql)
+
+
+def test_render_plan_indents_children() -> None:
+    plan = [(2, 0, 0, 'CO-ROUTINE x'), (5, 2, 0, 'SCAN list'), (9, 0, 0, 'SCAN x')]
+    assert render_plan(plan) == 'CO-ROUTINE x\n  SCAN list\nSCAN x'
+
+
+def test_pages_cover_all_rows_once(console: SqlConsole) -> None:
+    pages = _all_pages(console, "SELECT n, description FROM list;")
+    assert [cell for page in pages for cell in page[::2]] == [str(i) for i in range(25)]
+    assert len(pages) == 3
+
+
+def test_pages_with_repeated_first_column_drop_nothing(console: SqlConsole) -> None:
+    pages = _all_pages(console, "SELECT parity, n FROM list ORDER BY parity, n")
+    assert sorted(int(cell) for page in pages for cell in page[1::2]) == list(range(25))
+
+
+def test_pages_keep_the_query_order(console: SqlConsole) -> None:
+    pages = _all_pages(console, "SELECT n FROM list ORDER BY n DESC -- newest first")
+    assert [cell for page in pages for cell in page] == [str(i) for i in reversed(range(25))]
+
+
+def test_with_write_runs_as_a_statement(console: SqlConsole) -> None:
+    html = _run(console, "WITH old AS (SELECT n FROM list WHERE n < 5) DELETE FROM list WHERE n IN old", allow_writes=True)
+    assert "5 records affected" in html
+
+
+def test_write_refused_without_opt_in(console: SqlConsole) -> None:
+    html = _run(console, "DELETE FROM list")
+    assert "Allow writes" in html
+    assert _cells(_run(console, "SELECT count(*) FROM list")) == ['25']
+
+
+def test_write_with_opt_in(console: SqlConsole) -> None:
+    html = _run(console, "DELETE FROM list WHERE n < 5", allow_writes=True)
+    assert "5 records affected" in html
+    assert _cells(_run(console, "SELECT count(*) FROM list")) == ['20']
+
+
+def test_runaway_query_is_interrupted(console: SqlConsole) -> None:
+    html = _run(console, "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT max(x) FROM c")
+    assert "cancelled after 0.5s" in html
+
+
+def test_unpageable_statement_shows_first_page(console: SqlConsole) -> None:
+    html = _run(console, "PRAGMA table_info(list)")
+    assert "<th>name</th>" in html
+    assert "description" in _cells(html)
+
+
+def test_values_are_escaped(console: SqlConsole) -> None:
+    html = _run(console, "SELECT '<script>' AS x")
+    assert _cells(html) == ['&lt;script&gt;']
+
+
+def test_explain_shows_plan_and_timing(console: SqlConsole) -> None:
+    html = _run(console, "SELECT * FROM list WHERE n > 20", explain=True)
+    assert "Plan and timing" in html
+    assert "4 rows" in html
+    assert "SCAN" in html
+
+
+def test_explain_later_page(console: SqlConsole) -> None:
+    html = _run(console, "SELECT uuid FROM list WHERE uuid > x'03030303'", offset=10, explain=True)
+    assert len(_cells(html)) == 10
+    assert "SEARCH" in html
+
+
+def test_in_memory_database_through_the_live_connection() -> None:
+    live = sqlite3.connect(':memory:', check_same_thread=False)
+    live.execute("CREATE TABLE list (n INTEGER)")
+    live.executemany("INSERT INTO list VALUES (?)", [(i,) for i in range(3)])
+    live.commit()
+    console = SqlConsole(':memory:', live=live)
+
+    assert _cells(_run(console, "SELECT n FROM list")) == ['0', '1', '2']
+    assert "Allow writes" in _run(console, "DELETE FROM list")
+    assert "1 records affected" in _run(console, "DELETE FROM list WHERE n = 0", allow_writes=True)
+    assert live.execute("SELECT count(*) FROM list").fetchone() == (2,)
+    live.close()
+
+
+def test_explain_without_plan(console: SqlConsole) -> None:
+    html = _run(console, "PRAGMA table_info(list)", explain=True)
+    assert "no plan" in html
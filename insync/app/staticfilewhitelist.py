@@ -1,14 +1,126 @@
+import gzip
+import hashlib
+import mimetypes
 import os
+from dataclasses import dataclass, field
+from pathlib import Path
 
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Scope
+
+from insync.app.conditional import is_fresh
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def _is_refused(quality: str) -> bool:
+    """True for an explicit `q=0`, which means the coding is not acceptable."""
+    quality = quality.strip().removeprefix("q=")
+    try:
+        return bool(quality) and float(quality) == 0
+    except ValueError:
+        return False
+
+
+@dataclass
+class StaticAsset:
+    """A whitelisted file held in memory, with any precompressed variants smaller than the original."""
+
+    body: bytes
+    media_type: str
+    etag: str
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def from_bytes(cls, name: str, body: bytes) -> 'StaticAsset':
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = cls(body, media_type, hashlib.sha1(body).hexdigest()[:16])
+        variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+        # pngs and the like are already compressed, only keep variants that actually win
+        asset.encoded = {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+        return asset
+
+    def negotiate(self, accept_encoding: str) -> str | None:
+        """Pick the best precompressed variant the client accepts, None for identity."""
+        accepted = set()
+        for part in accept_encoding.split(","):
+            coding, _, quality = part.partition(";")
+            if _is_refused(quality):
+                continue
+            accepted.add(coding.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encoded and (encoding in accepted or '*' in accepted):
+                return encoding
+        return None
 
 
 class StaticFilesWithWhitelist(StaticFiles):
-    def __init__(self, directory: str, included_extensions: list[str]):
-        self.included_extensions = included_extensions
+    """StaticFiles restricted to whitelisted extensions.
+
+    Once `index()` has run the whitelisted files are served from memory with precompressed variants,
+    and requests carrying the current `?v=` githash are marked immutable. Without an index (hot reload)
+    files are served from disk as they change.
+    """
+
+    def __init__(self, directory: str, included_extensions: list[str], version: str | None = None):
+        self.included_extensions = tuple(f'.{ext}' for ext in included_extensions)
+        self.version = version
+        self.assets: dict[str, StaticAsset] | None = None
         super().__init__(directory=directory)
 
+    def index(self) -> int:
+        """Load every whitelisted file into memory and precompress it, returns how many."""
+        assert self.directory is not None
+        root = Path(self.directory)
+        assets = {}
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and path.name.endswith(self.included_extensions):
+                name = str(path.relative_to(root))
+                assets[os.path.normpath(name)] = StaticAsset.from_bytes(name, path.read_bytes())
+        self.assets = assets
+        return len(assets)
+
     def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
-        if not any(path.endswith(ext) for ext in self.included_extensions):
-            raise FileNotFoundError(404, f"File extension must be one of {','.join(self.included_extensions)}, got {path}")
+        if not path.endswith(self.included_extensions):
+            # treated as missing so it is a 404 rather than an error
+            return "", None
         return super().lookup_path(path)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if self.assets is None:
+            return await super().get_response(path, scope)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        asset = self.assets.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404)
+
+        request_headers = Headers(scope=scope)
+        encoding = asset.negotiate(request_headers.get("accept-encoding", ""))
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        versioned = self.version is not None and QueryParams(scope["query_string"]).get("v") == self.version
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        if is_fresh(Request(scope), etag, enabled=True):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is None:
+            return Response(asset.body, media_type=asset.media_type, headers=headers)
+        return Response(asset.encoded[encoding], media_type=asset.media_type, headers=headers | {"Content-Encoding": encoding})
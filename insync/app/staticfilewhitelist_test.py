@@ -0,0 +1,95 @@
+import gzip
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from insync.app.staticfilewhitelist import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAsset, StaticFilesWithWhitelist
+
+CSS = b"body { color: red; }\n" * 100
+
+
+@pytest.fixture
+def static_files(tmp_path: Path) -> StaticFilesWithWhitelist:
+    (tmp_path / "common").mkdir()
+    (tmp_path / "common" / "layout.css").write_bytes(CSS)
+    (tmp_path / "common" / "tiny.js").write_bytes(b"x")
+    (tmp_path / "secret.py").write_bytes(b"password = 'hunter2'")
+    return StaticFilesWithWhitelist(str(tmp_path), ['css', 'js'], version='abcd1234')
+
+
+@pytest.fixture
+def client(static_files: StaticFilesWithWhitelist) -> TestClient:
+    static_files.index()
+    return TestClient(Starlette(routes=[Mount("/static", static_files)]))
+
+
+def test_index_only_includes_whitelisted_files(static_files: StaticFilesWithWhitelist) -> None:
+    assert static_files.index() == 2
+    assert static_files.assets is not None
+    assert set(static_files.assets) == {'common/layout.css', 'common/tiny.js'}
+
+
+def test_compressed_variant_only_kept_when_smaller() -> None:
+    assert 'gzip' in StaticAsset.from_bytes('a.css', CSS).encoded
+    assert StaticAsset.from_bytes('a.js', b"x").encoded == {}
+
+
+@pytest.mark.parametrize(
+    ('accept_encoding', 'encoding'),
+    [
+        ('', None),
+        ('gzip', 'gzip'),
+        ('deflate, gzip;q=0.5', 'gzip'),
+        ('gzip;q=0', None),
+        ('*', 'gzip'),
+        ('identity', None),
+    ],
+)
+def test_negotiate(accept_encoding: str, encoding: str | None) -> None:
+    asset = StaticAsset.from_bytes('a.css', CSS)
+    asset.encoded.pop('br', None)
+    assert asset.negotiate(accept_encoding) == encoding
+
+
+def test_serves_gzip_when_accepted(client: TestClient) -> None:
+    response = client.get("/static/common/layout.css", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.content == CSS  # transparently decoded by the client
+    assert int(response.headers["content-length"]) == len(gzip.compress(CSS, compresslevel=9, mtime=0))
+
+
+def test_serves_identity_when_not_accepted(client: TestClient) -> None:
+    response = client.get("/static/common/layout.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+
+
+def test_immutable_only_for_current_version(client: TestClient) -> None:
+    assert client.get("/static/common/layout.css?v=abcd1234").headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert client.get("/static/common/layout.css?v=00000000").headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert client.get("/static/common/layout.css").headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_not_modified(client: TestClient) -> None:
+    etag = client.get("/static/common/layout.css").headers["etag"]
+    response = client.get("/static/common/layout.css", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_not_whitelisted_is_404(client: TestClient) -> None:
+    assert client.get("/static/secret.py").status_code == 404
+    assert client.get("/static/common/missing.css").status_code == 404
+    assert client.get("/static/../secret.py").status_code == 404
+
+
+def test_unindexed_serves_from_disk(static_files: StaticFilesWithWhitelist) -> None:
+    client = TestClient(Starlette(routes=[Mount("/static", static_files)]))
+    assert client.get("/static/common/layout.css").content == CSS
+    assert client.get("/static/secret.py").status_code == 404
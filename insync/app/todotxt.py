@@ -1,14 +1,24 @@
-from typing import Literal
+from typing import Annotated, Literal
 
-from fastapi import Request
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, Request, Response
+from fastapi.responses import StreamingResponse
 
+from insync.app.conditional import cache_headers, is_fresh, not_modified, project_etag
+from insync.app.jinja_templates import coalesce_chunks
 from insync.listitem import ListItemProject, ListItemProjectType
-from insync.listregistry import UndoView
+from insync.listregistry import ListRegistry, UndoView
 from insync.listview import ListView
 from insync.renderer import Renderer
 
-from . import app, templates
+from . import app, get_registry, templates
+
+
+def _project_from_path(project_type: Literal['*'] | ListItemProjectType, project_name: Literal['*'] | str) -> ListItemProject:
+    if project_type == '*':
+        project_type = ListItemProjectType.null
+    if project_name == '*':
+        project_name = ''
+    return ListItemProject(project_name, project_type)
 
 
 @app.get("/todotxt/{project_type}/{project_name}")
@@ -16,13 +26,36 @@ def todotxt(
     project_type: Literal['*'] | ListItemProjectType,
     project_name: Literal['*'] | str,
     request: Request,
-) -> HTMLResponse:
-    if project_type == '*':
-        project_type = ListItemProjectType.null
-    if project_name == '*':
-        project_name = ''
-    project = ListItemProject(project_name, project_type)
-    return templates.TemplateResponse(request, "todotxt.html", {'project': project})
+    registry: Annotated[ListRegistry, Depends(get_registry)],
+) -> Response:
+    project = _project_from_path(project_type, project_name)
+    etag = project_etag(registry, project)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    return templates.TemplateStreamResponse(request, "todotxt.html", {'project': project}, headers=cache_headers(etag))
+
+
+@app.get("/todotxt/{project_type}/{project_name}/export")
+def todotxt_export(
+    project_type: Literal['*'] | ListItemProjectType,
+    project_name: Literal['*'] | str,
+    request: Request,
+    registry: Annotated[ListRegistry, Depends(get_registry)],
+) -> Response:
+    """Plain todo.txt of the active items, streamed a line at a time."""
+    project = _project_from_path(project_type, project_name)
+    etag = project_etag(registry, project)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    lines = (f'{item}\n' for item in registry.search(project).active)
+    filename = f'{project.name or "all"}.todo.txt'
+    return StreamingResponse(
+        coalesce_chunks(lines),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'} | cache_headers(etag),
+    )
 
 
 class TodoTxtRenderer(Renderer):
@@ -1,24 +1,16 @@
 from typing import Annotated, Literal
 
-from fastapi import Depends, WebSocket, WebSocketDisconnect
+from fastapi import Depends, WebSocket
 from fastapi.params import Query
 
 from insync.app.checklist import ChecklistRenderer
 from insync.app.todotxt import TodoTxtRenderer
 from insync.listitem import ListItemProject, ListItemProjectType
 
-from . import app, get_ws_list_updater
+from . import app, get_ws_connections, get_ws_list_updater
+from .ws_connections import ConnectionManager
 from .ws_list_updater import WebSocketListUpdater
 
-
-async def _ws_keep_alive(ws_list_updater: WebSocketListUpdater, websocket: WebSocket) -> None:
-    try:
-        async for _htmx_json in websocket.iter_text():
-            raise RuntimeError("Message received, but this websocket is mean only to transmit updates.")
-    except WebSocketDisconnect:
-        ws_list_updater.disconnect(websocket)
-
-
 renderers = {
     "checklist": ChecklistRenderer(),
     "todotxt": TodoTxtRenderer(),
@@ -32,6 +24,9 @@ async def ws(
     renderer_name: Annotated[str, Query()],
     websocket: WebSocket,
     ws_list_updater: Annotated[WebSocketListUpdater, Depends(get_ws_list_updater)],
+    ws_connections: Annotated[ConnectionManager, Depends(get_ws_connections)],
+    since: Annotated[str | None, Query()] = None,
+    frames: Annotated[Literal['text', 'binary'], Query()] = 'text',
 ) -> None:
     if project_type == "*":
         project_type = ListItemProjectType.null
@@ -44,6 +39,17 @@ async def ws(
     except KeyError as e:
         raise NotImplementedError(f"Renderer for {renderer_name} not implemented") from e
 
-    channel = await ws_list_updater.subscribe(websocket, project, renderer)
-    await ws_list_updater.send_update(websocket, channel)
-    await _ws_keep_alive(ws_list_updater, websocket)
+    if not ws_connections.admit(websocket, websocket.scope.get("user")):
+        await websocket.close(code=1013)  # try again later
+        return
+
+    try:
+        # clients that send `since` (even empty) understand version stamps and can be caught up on reconnect
+        channel = await ws_list_updater.subscribe(websocket, project, renderer, resumable=since is not None, binary=frames == 'binary')
+        if since:
+            await ws_list_updater.resume(websocket, channel, since)
+        else:
+            await ws_list_updater.send_update(websocket, channel)
+        await ws_connections.keep_alive(websocket)
+    finally:
+        ws_connections.release(websocket)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass
+from logging import getLogger
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from insync.app.ws_list_updater import WebSocketListUpdater
+
+logger = getLogger(__name__)
+
+PING = 'ping'
+PONG = 'pong'
+
+
+@dataclass
+class ConnectionLimits:
+    max_per_user: int = 20
+    max_total: int = 500
+    heartbeat_interval: float = 25.0  # seconds without a message before we ping
+    idle_timeout: float = 60.0  # seconds without a pong before the websocket is evicted
+
+
+@dataclass
+class ConnectionCounters:
+    live: int = 0
+    evicted: int = 0
+    limited: int = 0
+
+
+class ConnectionManager:
+    """Admission, liveness and eviction for the update websockets.
+
+    Half-open sockets (e.g. a phone that went to sleep) never raise on receive, so instead we ping them when
+    they are quiet and evict them if they stop answering. Evicted clients just reconnect and resume.
+    """
+
+    def __init__(self, ws_list_updater: WebSocketListUpdater, limits: ConnectionLimits | None = None):
+        self.ws_list_updater = ws_list_updater
+        self.limits = limits or ConnectionLimits()
+        self.counters = ConnectionCounters()
+
+        self._users: dict[WebSocket, str | None] = {}
+        self._per_user: Counter[str | None] = Counter()
+        self._last_seen: dict[WebSocket, float] = {}
+
+    def admit(self, websocket: WebSocket, user: str | None) -> bool:
+        if len(self._users) >= self.limits.max_total or self._per_user[user] >= self.limits.max_per_user:
+            logger.warning(f"Websocket connection limit reached for {user=}, {self.counters=}")
+            self.counters.limited += 1
+            return False
+
+        self._users[websocket] = user
+        self._per_user[user] += 1
+        self._last_seen[websocket] = time.monotonic()
+        self.counters.live = len(self._users)
+        return True
+
+    def release(self, websocket: WebSocket) -> None:
+        """No-op if the websocket was already released."""
+        if websocket not in self._users:
+            return
+        user = self._users.pop(websocket)
+        self._per_user[user] -= 1
+        if self._per_user[user] == 0:
+            del self._per_user[user]
+        del self._last_seen[websocket]
+        self.counters.live = len(self._users)
+        self.ws_list_updater.disconnect(websocket)
+
+    def connections_for(self, user: str | None) -> int:
+        return self._per_user[user]
+
+    async def keep_alive(self, websocket: WebSocket) -> None:
+        """Serve the receive side of an admitted websocket until it disconnects or is evicted."""
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(websocket.receive_text(), timeout=self.limits.heartbeat_interval)
+                except TimeoutError:
+                    if time.monotonic() - self._last_seen[websocket] > self.limits.idle_timeout:
+                        await self._evict(websocket)
+                        return
+                    await websocket.send_text(PING)
+                    continue
+
+                if message != PONG:
+                    raise RuntimeError("Message received, but this websocket is mean only to transmit updates.")
+                self._last_seen[websocket] = time.monotonic()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.release(websocket)
+
+    async def _evict(self, websocket: WebSocket) -> None:
+        logger.info(f"Evicting idle websocket for user={self._users.get(websocket)}")
+        self.counters.evicted += 1
+        self.release(websocket)
+        try:
+            await websocket.close(code=1001)
+        except RuntimeError:
+            # already closed underneath us
+            pass
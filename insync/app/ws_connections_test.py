@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from insync.app.ws_connections import PING, PONG, ConnectionLimits, ConnectionManager
+from insync.app.ws_list_updater import WebSocketListUpdater
+from insync.listregistry import ListRegistry
+
+
+class MockWebSocket(Mock):
+    def __init__(self, replies: list[str] | None = None):
+        super().__init__()
+        self.sent: list[str] = []
+        self.closed_code: int | None = None
+        self._replies = asyncio.Queue()
+        for reply in replies or []:
+            self._replies.put_nowait(reply)
+
+    async def receive_text(self) -> str:
+        reply = await self._replies.get()
+        if reply == 'disconnect':
+            raise WebSocketDisconnect()
+        return reply
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(message)
+        if message == PING and self.answers_pings:
+            self._replies.put_nowait(PONG)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_code = code
+
+    answers_pings = False
+
+
+@pytest.fixture
+def updater() -> WebSocketListUpdater:
+    return WebSocketListUpdater(ListRegistry())
+
+
+@pytest.fixture
+def manager(updater: WebSocketListUpdater) -> ConnectionManager:
+    return ConnectionManager(updater, ConnectionLimits(max_per_user=2, max_total=3, heartbeat_interval=0.01, idle_timeout=0.05))
+
+
+class TestAdmission:
+    def test_admit_counts_live_connections(self, manager: ConnectionManager) -> None:
+        assert manager.admit(MockWebSocket(), 'zak')
+        assert manager.admit(MockWebSocket(), 'admin')
+        assert manager.counters.live == 2
+        assert manager.connections_for('zak') == 1
+
+    def test_per_user_cap(self, manager: ConnectionManager) -> None:
+        assert manager.admit(MockWebSocket(), 'zak')
+        assert manager.admit(MockWebSocket(), 'zak')
+        assert not manager.admit(MockWebSocket(), 'zak')
+        assert manager.admit(MockWebSocket(), 'admin')
+        assert manager.counters.limited == 1
+
+    def test_global_cap(self, manager: ConnectionManager) -> None:
+        for user in ['a', 'b', 'c']:
+            assert manager.admit(MockWebSocket(), user)
+        assert not manager.admit(MockWebSocket(), 'd')
+        assert manager.counters.limited == 1
+
+    def test_release_frees_a_slot(self, manager: ConnectionManager) -> None:
+        ws = MockWebSocket()
+        manager.admit(ws, 'zak')
+        manager.admit(MockWebSocket(), 'zak')
+        manager.release(ws)
+        manager.release(ws)
+
+        assert manager.counters.live == 1
+        assert manager.admit(MockWebSocket(), 'zak')
+
+
+class TestKeepAlive:
+    async def test_quiet_websocket_is_pinged_and_kept_when_it_answers(self, manager: ConnectionManager, anyio_backend: tuple[str, dict[str, Any]]) -> None:
+        ws = MockWebSocket()
+        ws.answers_pings = True
+        manager.admit(ws, 'zak')
+
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(manager.keep_alive(ws), timeout=0.2)
+
+        assert PING in ws.sent
+        assert ws.closed_code is None
+        assert manager.counters.evicted == 0
+
+    async def test_unresponsive_websocket_is_evicted(self, manager: ConnectionManager, anyio_backend: tuple[str, dict[str, Any]]) -> None:
+        ws = MockWebSocket()
+        manager.admit(ws, 'zak')
+
+        await asyncio.wait_for(manager.keep_alive(ws), timeout=1)
+
+        assert ws.closed_code == 1001
+        assert manager.counters.evicted == 1
+        assert manager.counters.live == 0
+
+    async def test_disconnect_releases(self, manager: ConnectionManager, anyio_backend: tuple[str, dict[str, Any]]) -> None:
+        ws = MockWebSocket(replies=[PONG, 'disconnect'])
+        manager.admit(ws, 'zak')
+
+        await manager.keep_alive(ws)
+
+        assert manager.counters.live == 0
+        assert manager.counters.evicted == 0
+
+    async def test_unexpected_message_raises(self, manager: ConnectionManager, anyio_backend: tuple[str, dict[str, Any]]) -> None:
+        ws = MockWebSocket(replies=['{"htmx": "json"}'])
+        manager.admit(ws, 'zak')
+
+        with pytest.raises(RuntimeError):
+            await manager.keep_alive(ws)
+        assert manager.counters.live == 0
@@ -1,12 +1,27 @@
-from collections import defaultdict
+import secrets
+import time
+import zlib
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import NamedTuple
 
 from fastapi import WebSocket
 from fastapi.websockets import WebSocketState
 
 from insync.listitem import ListItemProject
 from insync.listregistry import ListRegistry
+from insync.metrics import Histogram
+from insync.profiling import CAPTURES
 from insync.renderer import Renderer
 
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+RENDER_SECONDS = Histogram("insync_render_seconds", "Time to render a channel", ["renderer"])
+# characters rather than bytes, encoding each render just to measure it would cost as much as the render
+RENDER_CHARS = Histogram("insync_render_chars", "Length of rendered channel html", ["renderer"], buckets=SIZE_BUCKETS)
+BROADCAST_SECONDS = Histogram("insync_broadcast_seconds", "broadcast_update duration, rendering and sending to every subscriber")
+BROADCAST_FANOUT = Histogram("insync_broadcast_fanout", "Websockets sent an update per broadcast_update", buckets=FANOUT_BUCKETS)
+
 
 class ProjectChannel:
     def __init__(self, project: ListItemProject, renderer: Renderer):
@@ -25,12 +40,114 @@ class ProjectChannel:
         return broadcast in self.project
 
 
+# Binary frames carry a one byte header so the client knows how to decode the rest
+FRAME_UTF8 = b'u'
+FRAME_DEFLATE = b'z'
+
+
+@dataclass
+class PayloadStats:
+    """Running totals for how much encoding work and wire bytes shared payloads saved."""
+
+    payloads: int = 0
+    frames_encoded: int = 0
+    frames_sent: int = 0  # binary frames only, text is sent as is
+    raw_bytes: int = 0  # utf-8 size of every encoded frame
+    encoded_bytes: int = 0  # size of every encoded frame as it goes on the wire
+    bytes_saved: int = 0  # over sending the raw utf-8 to every binary subscriber
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes / self.encoded_bytes if self.encoded_bytes else 1.0
+
+
+class Payload:
+    """A rendered update, encoded (and compressed) at most once no matter how many websockets receive it."""
+
+    def __init__(self, text: str, stats: PayloadStats, compress: bool = False, compress_min_bytes: int = 256):
+        self.text = text
+        self._stats = stats
+        self._compress = compress
+        self._compress_min_bytes = compress_min_bytes
+        self._frame: bytes | None = None
+        self._raw_size = 0
+        stats.payloads += 1
+
+    @property
+    def frame(self) -> bytes:
+        if self._frame is None:
+            raw = self.text.encode()
+            frame = FRAME_UTF8 + raw
+            if self._compress and len(raw) >= self._compress_min_bytes:
+                deflated = FRAME_DEFLATE + zlib.compress(raw, 6)
+                if len(deflated) < len(frame):
+                    frame = deflated
+            self._frame = frame
+            self._raw_size = len(raw)
+            self._stats.frames_encoded += 1
+            self._stats.raw_bytes += len(raw)
+            self._stats.encoded_bytes += len(frame) - 1
+        return self._frame
+
+    def sent(self) -> None:
+        assert self._frame is not None, "Only frames that have been encoded can be sent"
+        self._stats.frames_sent += 1
+        self._stats.bytes_saved += self._raw_size - (len(self._frame) - 1)
+
+
+class Change(NamedTuple):
+    version: int
+    project: ListItemProject
+
+
 class WebSocketListUpdater:
-    def __init__(self, registry: ListRegistry):
+    def __init__(self, registry: ListRegistry, history_size: int = 256, compress_frames: bool = False):
         self.registry = registry
+        self.compress_frames = compress_frames
+        self.payload_stats = PayloadStats()
 
         self.subscriptions: dict[ProjectChannel, list[WebSocket]] = defaultdict(list)
         self._channels: set[ProjectChannel] = set()
+        # kept alongside subscriptions so reading it never walks every channel
+        self.subscriber_count = 0
+
+        # websockets that opted into version stamps by sending `since` on subscribe
+        self._resumable: set[WebSocket] = set()
+        # websockets that asked for binary frames, these share one encoded frame per render
+        self._binary: set[WebSocket] = set()
+        self._history: deque[Change] = deque(maxlen=history_size)
+        self.reset_history()
+
+    def reset_history(self) -> None:
+        """Forget all recorded changes, e.g. after the registry is replaced wholesale.
+
+        A new epoch guarantees versions handed out before the reset are never trusted again.
+        """
+        self._epoch = secrets.token_hex(4)
+        self._history.clear()
+        # every change after this version is in the history
+        self._history_floor = self.registry.version
+
+    @property
+    def version_token(self) -> str:
+        return f"{self._epoch}.{self.registry.version}"
+
+    def changes_since(self, version_token: str) -> list[Change] | None:
+        """Changes recorded after the given version token, or None if the history no longer covers it."""
+        epoch, _, version = version_token.partition('.')
+        if epoch != self._epoch or not version.isdigit():
+            return None
+
+        since = int(version)
+        if since < self._history_floor or since > self.registry.version:
+            return None
+
+        return [change for change in self._history if change.version > since]
+
+    def _record_change(self, project: ListItemProject) -> None:
+        if len(self._history) == self._history.maxlen:
+            self._history_floor = self._history[0].version
+        self._history.append(Change(self.registry.version, project))
 
     def register_projectchannel(self, project: ListItemProject, renderer: Renderer) -> ProjectChannel:
         """No-op if already registered, handled by the nature of sets."""
@@ -38,45 +155,111 @@ class WebSocketListUpdater:
         self._channels.add(channel)
         return channel
 
+    @property
+    def channel_count(self) -> int:
+        return len(self._channels)
+
     def render_channel(self, channel: ProjectChannel) -> str:
-        return channel.renderer.render(self.registry.search(channel.project), self.registry.undoview())
+        renderer = type(channel.renderer).__name__
+        start = time.perf_counter()
+        if CAPTURES.pending:
+            with CAPTURES.render(f"{renderer} {channel.project}", channel.project.name):
+                html = channel.renderer.render(self.registry.search(channel.project), self.registry.undoview())
+        else:
+            html = channel.renderer.render(self.registry.search(channel.project), self.registry.undoview())
+        RENDER_SECONDS.labels(renderer).observe(time.perf_counter() - start)
+        RENDER_CHARS.labels(renderer).observe(len(html))
+        return html
 
-    async def subscribe(self, websocket: WebSocket, project: ListItemProject, renderer: Renderer) -> ProjectChannel:
+    async def subscribe(self, websocket: WebSocket, project: ListItemProject, renderer: Renderer, resumable: bool = False, binary: bool = False) -> ProjectChannel:
         await websocket.accept()
         channel = self.register_projectchannel(project, renderer)
         self.subscriptions[channel].append(websocket)
+        self.subscriber_count += 1
+        if resumable:
+            self._resumable.add(websocket)
+        if binary:
+            self._binary.add(websocket)
         return channel
 
     def disconnect(self, websocket: WebSocket) -> None:
         for _channel, ws_list in self.subscriptions.items():
             if websocket in ws_list:
                 ws_list.remove(websocket)
+                self.subscriber_count -= 1
+        self._resumable.discard(websocket)
+        self._binary.discard(websocket)
 
     def _garbage_collect_closed_connections(self) -> None:
         """Remove all disconnected websockets from the subscriptions."""
         for project, ws_list in self.subscriptions.items():
-            self.subscriptions[project] = [ws for ws in ws_list if ws.client_state != WebSocketState.DISCONNECTED]
+            open_ws = [ws for ws in ws_list if ws.client_state != WebSocketState.DISCONNECTED]
+            self.subscriber_count -= len(ws_list) - len(open_ws)
+            self.subscriptions[project] = open_ws
+        self._resumable = {ws for ws in self._resumable if ws.client_state != WebSocketState.DISCONNECTED}
+        self._binary = {ws for ws in self._binary if ws.client_state != WebSocketState.DISCONNECTED}
 
     async def send_update(self, ws: WebSocket, channel: ProjectChannel) -> None:
         """Send an update to a single websocket. This is useful for initial updates."""
         update = self.render_channel(channel)
         await self._send_message(ws, update)
 
+    async def resume(self, ws: WebSocket, channel: ProjectChannel, version_token: str) -> None:
+        """Catch a reconnecting websocket up from the last version it saw.
+
+        Only channels touched by a change since that version are re-rendered, otherwise the client just gets
+        the new version stamp. Falls back to a full render if the history no longer reaches back that far.
+        """
+        changes = self.changes_since(version_token)
+        if changes is None or any(channel.broadcast_filter(change.project) for change in changes):
+            await self.send_update(ws, channel)
+        else:
+            await self._send_message(ws, '')
+
     async def broadcast_update(self, project: ListItemProject) -> None:
         """Broadcast an update to all websockets subscribed to a given subscription."""
+        start = time.perf_counter()
+        self._record_change(project)
         self._garbage_collect_closed_connections()
 
+        fanout = 0
         for channel in self._channels:
             if not channel.broadcast_filter(project):
                 continue
 
+            # taken before rendering, sending to earlier subscribers awaits and lets the registry move on meanwhile.
+            # A stamp newer than the render would have a resuming client skip the change it is missing
+            stamp = self.version_stamp()
             update = self.render_channel(channel)
 
+            # one payload per variant, each shared by every subscriber of the channel
+            payloads: dict[bool, Payload] = {}
             for ws in self.subscriptions[channel]:
-                await self._send_message(ws, update)
+                resumable = ws in self._resumable
+                if resumable not in payloads:
+                    payloads[resumable] = self._payload(update, stamp if resumable else None)
+                await self._send_payload(ws, payloads[resumable])
+                fanout += 1
+        BROADCAST_SECONDS.observe(time.perf_counter() - start)
+        BROADCAST_FANOUT.observe(fanout)
+
+    def version_stamp(self) -> str:
+        return f'<span id="ws-version" data-version="{self.version_token}" hx-swap-oob="true" hidden></span>'
+
+    def _payload(self, message: str, stamp: str | None) -> Payload:
+        if stamp is not None:
+            message += stamp
+        return Payload(message, self.payload_stats, compress=self.compress_frames)
 
     async def _send_message(self, ws: WebSocket, message: str) -> None:
+        await self._send_payload(ws, self._payload(message, self.version_stamp() if ws in self._resumable else None))
+
+    async def _send_payload(self, ws: WebSocket, payload: Payload) -> None:
         try:
-            await ws.send_text(message)
+            if ws in self._binary:
+                await ws.send_bytes(payload.frame)
+                payload.sent()
+            else:
+                await ws.send_text(payload.text)
         except RuntimeError:
             print("Failed to send message, this should not happen regularly as connections are garbage collected before broadcasts.")
@@ -1,12 +1,14 @@
+import zlib
 from typing import Any
 from unittest.mock import Mock
 
 import pytest
 from fastapi.websockets import WebSocketState
+from uuid6 import UUID
 
-from insync.app.ws_list_updater import WebSocketListUpdater
+from insync.app.ws_list_updater import Change, WebSocketListUpdater
 from insync.listitem import ListItem, ListItemProject, ListItemProjectType, NullListItemProject
-from insync.listregistry import ListRegistry, UndoView
+from insync.listregistry import CreateCommand, ListRegistry, NullCommand, UndoView
 from insync.listview import ListView
 from insync.renderer import Renderer
 
@@ -280,3 +282,211 @@ class TestBroadcasting:
         assert result != result2
         assert result == '+^grocery.produce:testGP,testGP2'
         assert result2 == '+^grocery.produce:testGP;testGP2'
+
+    async def test_subscriber_count_follows_disconnects_and_garbage_collection(
+        self,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        ws: MockWebSocket,
+        ws2: MockWebSocket,
+    ) -> None:
+        project = ListItemProject('grocery', ListItemProjectType.checklist)
+        await updater.subscribe(ws, project, renderer)
+        await updater.subscribe(ws2, ListItemProject('grocery.produce', ListItemProjectType.checklist), renderer)
+        assert updater.subscriber_count == 2
+        assert updater.channel_count == 2
+
+        updater.disconnect(ws)
+        assert updater.subscriber_count == 1
+
+        ws2.client_state = WebSocketState.DISCONNECTED
+        await updater.broadcast_update(project)
+        assert updater.subscriber_count == 0
+
+
+class TestResume:
+    MockWebSocket = TestBroadcasting.MockWebSocket
+
+    @pytest.fixture
+    def ws(self, anyio_backend: tuple[str, dict[str, Any]]) -> MockWebSocket:
+        return self.MockWebSocket()
+
+    @pytest.fixture
+    def grocery(self) -> ListItemProject:
+        return ListItemProject('grocery', ListItemProjectType.checklist)
+
+    def test_changes_since_current_version_is_empty(self, updater: WebSocketListUpdater) -> None:
+        assert updater.changes_since(updater.version_token) == []
+
+    async def test_changes_since_returns_recorded_changes(
+        self,
+        reg: ListRegistry,
+        updater: WebSocketListUpdater,
+        grocery: ListItemProject,
+        anyio_backend: tuple[str, dict[str, Any]],
+    ) -> None:
+        token = updater.version_token
+        reg.do(CreateCommand((item := ListItem('testG', project=grocery)).uuid, item))
+        await updater.broadcast_update(grocery)
+
+        assert updater.changes_since(token) == [Change(1, grocery)]
+
+    @pytest.mark.parametrize('token', ['', 'garbage', 'nope.0', 'nope.x'])
+    def test_unknown_token_is_not_covered(self, updater: WebSocketListUpdater, token: str) -> None:
+        assert updater.changes_since(token) is None
+
+    def test_token_from_before_reset_is_not_covered(self, updater: WebSocketListUpdater) -> None:
+        token = updater.version_token
+        updater.reset_history()
+        assert updater.changes_since(token) is None
+
+    async def test_evicted_history_is_not_covered(self, reg: ListRegistry, grocery: ListItemProject, anyio_backend: tuple[str, dict[str, Any]]) -> None:
+        updater = WebSocketListUpdater(reg, history_size=2)
+        token = updater.version_token
+        for _ in range(3):
+            reg.do(NullCommand(UUID(int=0)))
+            await updater.broadcast_update(grocery)
+
+        assert updater.changes_since(token) is None
+
+    async def test_resume_without_changes_sends_only_version_stamp(
+        self,
+        reg: ListRegistry,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        ws: MockWebSocket,
+        grocery: ListItemProject,
+    ) -> None:
+        reg.add(ListItem('testG', project=grocery))
+        token = updater.version_token
+        channel = await updater.subscribe(ws, grocery, renderer, resumable=True)
+
+        await updater.resume(ws, channel, token)
+
+        assert len(renderer.calls) == 0
+        assert ws.spy_sent_text() == updater.version_stamp()
+
+    async def test_resume_renders_when_channel_changed(
+        self,
+        reg: ListRegistry,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        ws: MockWebSocket,
+        grocery: ListItemProject,
+    ) -> None:
+        token = updater.version_token
+        reg.do(CreateCommand((item := ListItem('testG', project=grocery)).uuid, item))
+        await updater.broadcast_update(grocery)
+        channel = await updater.subscribe(ws, grocery, renderer, resumable=True)
+
+        await updater.resume(ws, channel, token)
+
+        assert len(renderer.calls) == 1
+        assert ws.spy_sent_text() == '+^grocery:testG' + updater.version_stamp()
+
+    async def test_resume_skips_render_when_only_other_channels_changed(
+        self,
+        reg: ListRegistry,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        ws: MockWebSocket,
+        grocery: ListItemProject,
+    ) -> None:
+        travel = ListItemProject('travel', ListItemProjectType.checklist)
+        token = updater.version_token
+        reg.do(CreateCommand((item := ListItem('testT', project=travel)).uuid, item))
+        await updater.broadcast_update(travel)
+        channel = await updater.subscribe(ws, grocery, renderer, resumable=True)
+
+        await updater.resume(ws, channel, token)
+
+        assert len(renderer.calls) == 0
+
+    async def test_broadcast_stamps_the_version_that_was_rendered(
+        self,
+        reg: ListRegistry,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        ws: MockWebSocket,
+        grocery: ListItemProject,
+    ) -> None:
+        class ChangingWebSocket(self.MockWebSocket):
+            async def send_text(self, message: str) -> None:
+                await super().send_text(message)
+                # another request changes the registry while this send is awaited
+                reg.do(NullCommand(UUID(int=0)))
+
+        rendered_token = updater.version_token
+        await updater.subscribe(ChangingWebSocket(), grocery, renderer)
+        await updater.subscribe(ws, grocery, renderer, resumable=True)
+
+        await updater.broadcast_update(grocery)
+
+        assert updater.version_token != rendered_token
+        assert rendered_token in ws.spy_sent_text()
+
+
+class TestBinaryFrames:
+    class MockBinaryWebSocket(TestBroadcasting.MockWebSocket):
+        async def send_bytes(self, data: bytes) -> None:
+            assert self.accepted, "Cannot send bytes before accepting the connection"
+            assert self.sent is None, "Mock can only can handle a single sent message"
+            self.sent = data
+
+    @pytest.fixture
+    def grocery(self, reg: ListRegistry) -> ListItemProject:
+        project = ListItemProject('grocery', ListItemProjectType.checklist)
+        reg.add(ListItem('testG' * 100, project=project))
+        return project
+
+    async def test_subscribers_share_one_encoded_frame(
+        self,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        grocery: ListItemProject,
+        anyio_backend: tuple[str, dict[str, Any]],
+    ) -> None:
+        sockets = [self.MockBinaryWebSocket() for _ in range(3)]
+        for ws in sockets:
+            await updater.subscribe(ws, grocery, renderer, binary=True)
+
+        await updater.broadcast_update(grocery)
+
+        assert sockets[0].sent == b'u+^grocery:' + b'testG' * 100
+        assert all(ws.sent is sockets[0].sent for ws in sockets)
+        assert updater.payload_stats.frames_encoded == 1
+        assert updater.payload_stats.frames_sent == 3
+
+    async def test_compressed_frame_inflates_to_render(
+        self,
+        reg: ListRegistry,
+        renderer: MockRenderer,
+        grocery: ListItemProject,
+        anyio_backend: tuple[str, dict[str, Any]],
+    ) -> None:
+        updater = WebSocketListUpdater(reg, compress_frames=True)
+        ws = self.MockBinaryWebSocket()
+        await updater.subscribe(ws, grocery, renderer, binary=True)
+
+        await updater.broadcast_update(grocery)
+
+        assert ws.sent[:1] == b'z'
+        assert zlib.decompress(ws.sent[1:]).decode() == '+^grocery:' + 'testG' * 100
+        assert updater.payload_stats.compression_ratio > 1
+        assert updater.payload_stats.bytes_saved > 0
+
+    async def test_text_and_binary_subscribers_get_the_same_render(
+        self,
+        updater: WebSocketListUpdater,
+        renderer: MockRenderer,
+        grocery: ListItemProject,
+        anyio_backend: tuple[str, dict[str, Any]],
+    ) -> None:
+        text_ws, binary_ws = TestBroadcasting.MockWebSocket(), self.MockBinaryWebSocket()
+        await updater.subscribe(text_ws, grocery, renderer)
+        await updater.subscribe(binary_ws, grocery, renderer, binary=True)
+
+        await updater.broadcast_update(grocery)
+
+        assert len(renderer.calls) == 1
+        assert binary_ws.sent == b'u' + text_ws.spy_sent_text().encode()
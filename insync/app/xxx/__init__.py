@@ -1,3 +1,3 @@
-from .xxx import router
+from .xxx import EnginePool, PoolExhaustedError, create_engine_pool, pool_exhausted, rebalance_periodically, router, save_item_texts
 
-__all__ = ["router"]
+__all__ = ["EnginePool", "PoolExhaustedError", "create_engine_pool", "pool_exhausted", "rebalance_periodically", "router", "save_item_texts"]
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from logging import getLogger
+
+import anyio
+
+logger = getLogger(__name__)
+
+
+class EditBuffer:
+    """Newest text per item from rapid edits, written in one batch once editing pauses.
+
+    A batch is flushed when no edit has arrived for `idle_delay` seconds, or at the latest `max_delay` seconds after
+    the oldest unsaved edit, so a crash loses at most that much typing.
+    """
+
+    def __init__(self, save: Callable[[dict[int, str]], None], idle_delay: float = 0.5, max_delay: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self._save = save
+        self._clock = clock
+        self.idle_delay = idle_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        # held from taking a batch until it is saved, so a flush returns only once everything put before it is written
+        self._flush_lock = threading.Lock()
+        self._pending: dict[int, str] = {}
+        self._first_edit = 0.0
+        self._last_edit = 0.0
+        self.edits = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, item_id: int, txt: str) -> None:
+        now = self._clock()
+        with self._lock:
+            if len(self._pending) == 0:
+                self._first_edit = now
+            self._last_edit = now
+            self._pending[item_id] = txt
+            self.edits += 1
+
+    def due(self) -> bool:
+        now = self._clock()
+        with self._lock:
+            if len(self._pending) == 0:
+                return False
+            return now - self._last_edit >= self.idle_delay or now - self._first_edit >= self.max_delay
+
+    def flush(self) -> int:
+        """Save everything pending in one batch, returns how many items were written.
+
+        Waits for a flush already in progress, e.g. the autosave, which may have taken the batch but not saved it yet.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if len(batch) == 0:
+                return 0
+            try:
+                self._save(batch)
+            except BaseException:
+                with self._lock:
+                    # keep the batch for the next flush, unless a newer edit has arrived since
+                    self._pending = batch | self._pending
+                raise
+            self.flushes += 1
+            return len(batch)
+
+    async def run(self) -> None:
+        """Lifespan task flushing whenever a batch is due."""
+        while True:
+            await asyncio.sleep(self.idle_delay / 2)
+            if not self.due():
+                continue
+            try:
+                await anyio.to_thread.run_sync(self.flush)
+            except Exception:
+                logger.exception("Saving buffered xxx edits failed, will retry")
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from typing import Any
+
+import pytest
+
+from insync.app.xxx.autosave import EditBuffer
+
+
+class Saved:
+    def __init__(self):
+        self.batches: list[dict[int, str]] = []
+        self.error: Exception | None = None
+
+    def __call__(self, batch: dict[int, str]) -> None:
+        if self.error is not None:
+            raise self.error
+        self.batches.append(batch)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_keeps_only_newest_text() -> None:
+    saved = Saved()
+    buffer = EditBuffer(saved)
+    buffer.put(1, 'h')
+    buffer.put(1, 'he')
+    buffer.put(2, 'x')
+    buffer.put(1, 'hello')
+    assert len(buffer) == 2
+    assert buffer.flush() == 2
+    assert saved.batches == [{1: 'hello', 2: 'x'}]
+    assert buffer.edits == 4
+    assert buffer.flushes == 1
+
+
+def test_flush_empty_is_noop() -> None:
+    saved = Saved()
+    assert EditBuffer(saved).flush() == 0
+    assert saved.batches == []
+
+
+def test_due_when_idle() -> None:
+    clock = Clock()
+    buffer = EditBuffer(Saved(), idle_delay=0.5, max_delay=2.0, clock=clock)
+    assert not buffer.due()
+    buffer.put(1, 'a')
+    clock.now += 0.1
+    assert not buffer.due()
+    clock.now += 0.4
+    assert buffer.due()
+
+
+def test_due_after_max_delay_even_while_typing() -> None:
+    clock = Clock()
+    buffer = EditBuffer(Saved(), idle_delay=0.5, max_delay=2.0, clock=clock)
+    for _ in range(7):
+        buffer.put(1, 'typing')
+        clock.now += 0.25
+        assert not buffer.due()
+    clock.now += 0.25
+    buffer.put(1, 'still typing')
+    assert buffer.due()
+
+
+def test_failed_flush_keeps_edits_but_not_over_newer_ones() -> None:
+    saved = Saved()
+    buffer = EditBuffer(saved)
+    buffer.put(1, 'old')
+    buffer.put(2, 'kept')
+    saved.error = RuntimeError("disk full")
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    buffer.put(1, 'newer')
+
+    saved.error = None
+    buffer.flush()
+    assert saved.batches == [{1: 'newer', 2: 'kept'}]
+
+
+def test_flush_waits_for_a_flush_in_progress() -> None:
+    taken, release = threading.Event(), threading.Event()
+    saved = Saved()
+
+    def slow_save(batch: dict[int, str]) -> None:
+        taken.set()
+        release.wait()
+        saved(batch)
+
+    buffer = EditBuffer(slow_save)
+    buffer.put(1, 'typed')
+    autosave = threading.Thread(target=buffer.flush)
+    autosave.start()
+    taken.wait()
+
+    # e.g. a page load, which must not read before the autosave's batch is written
+    page = threading.Thread(target=buffer.flush)
+    page.start()
+    page.join(0.05)
+    assert page.is_alive()
+
+    release.set()
+    autosave.join()
+    page.join()
+    assert saved.batches == [{1: 'typed'}]
+
+
+async def test_run_flushes_when_idle(anyio_backend: tuple[str, dict[str, Any]]) -> None:
+    saved = Saved()
+    buffer = EditBuffer(saved, idle_delay=0.02, max_delay=1)
+    task = asyncio.create_task(buffer.run())
+    buffer.put(1, 'a')
+    await asyncio.sleep(0.1)
+    task.cancel()
+    assert saved.batches == [{1: 'a'}]
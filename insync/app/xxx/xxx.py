@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import queue
+import sqlite3
 from collections.abc import Generator
 from contextlib import contextmanager
 from logging import getLogger
 from pathlib import Path
 from typing import Annotated, NamedTuple
 
+import anyio
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse
 from micro_namedtuple_sqlite_persister.persister import Engine, IdNoneError
-from micro_namedtuple_sqlite_persister.query import select
 
 from insync.app.jinja_templates import templates_for_package
+from insync.app.xxx.autosave import EditBuffer
+from insync.sortkey import CROWDED_GAP, END_GAP, NoRoomError, crowded, key_between, neighbours, respace
+from insync.sqltrace import StatementTracer
 
 templates = templates_for_package("insync.app.xxx")
 router = APIRouter(prefix="/xxx")
@@ -41,40 +47,111 @@ class ListItem(NamedTuple):
     id: int | None
     txt: str
     listsection: ListSection
+    sort_key: int  # order within listsection, see insync.sortkey
+
+
+class PoolExhaustedError(Exception):
+    """No engine came free within the pool's timeout."""
+
+
+class EnginePool:
+    """Engines (and their sqlite connections) opened once per process and lent out one request at a time."""
+
+    def __init__(self, db_path: str, size: int, tracer: StatementTracer | None = None, timeout: float = 5.0):
+        self._idle: queue.LifoQueue[Engine] = queue.LifoQueue()
+        self.timeout = timeout
+        for i in range(size):
+            engine = Engine(db_path)
+            if tracer is not None:
+                # the engine only uses its connection through execute and friends, so a traced stand-in works for it too
+                engine.connection = tracer.trace(engine.connection, "xxx")  # type: ignore[assignment]
+            if i == 0:
+                # the schema is shared by every connection, so one engine setting it up is enough
+                engine.ensure_table_created(ListType)
+                engine.ensure_table_created(List)
+                engine.ensure_table_created(ListSection)
+                _add_sort_key_column(engine.connection)
+                engine.ensure_table_created(ListItem)
+                # the list page joins down these foreign keys, and items are read and placed in sort_key order
+                engine.connection.execute(f"CREATE INDEX IF NOT EXISTS {ListSection.__name__}_list ON {ListSection.__name__} (list)")
+                engine.connection.execute(f"DROP INDEX IF EXISTS {ListItem.__name__}_listsection")
+                engine.connection.execute(f"CREATE INDEX IF NOT EXISTS {ListItem.__name__}_listsection_sort_key ON {ListItem.__name__} (listsection, sort_key)")
+                engine.connection.commit()
+            self._idle.put(engine)
+        self.size = size
+
+    @contextmanager
+    def borrow(self) -> Generator[Engine, None, None]:
+        """An engine for the duration of one transaction, committed on success and rolled back on error.
+
+        Raises PoolExhaustedError if every engine stays lent out for `timeout` seconds.
+        """
+        try:
+            engine = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhaustedError(f"All {self.size} xxx engines busy for {self.timeout:g}s") from None
+        try:
+            yield engine
+        except:
+            engine.connection.rollback()
+            raise
+        else:
+            engine.connection.commit()
+        finally:
+            self._idle.put(engine)
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self._idle.get().connection.close()
+
+
+def _add_sort_key_column(connection: sqlite3.Connection) -> None:
+    """Items saved before sort_key existed keep the order they had, which was by id."""
+    columns = [row[1] for row in connection.execute(f"PRAGMA table_info({ListItem.__name__})")]
+    if len(columns) > 0 and 'sort_key' not in columns:
+        connection.execute(f"ALTER TABLE {ListItem.__name__} ADD COLUMN sort_key INTEGER")
+        connection.execute(f"UPDATE {ListItem.__name__} SET sort_key = id * ?", (END_GAP,))
+
+
+def pool_exhausted(request: Request, exc: Exception) -> HTMLResponse:
+    """Exception handler, the pool being busy is temporary so ask the client to come back rather than hang."""
+    return HTMLResponse(status_code=503, content=str(exc), headers={"Retry-After": "1"})
+
+
+def get_engine(request: Request) -> Generator[Engine, None, None]:
+    with request.app.state.xxx_engines.borrow() as engine:
+        yield engine
 
 
-def get_engine() -> Generator[Engine, None, None]:
-    """Completely new engine and connection for each request"""
-    engine = Engine("xxx.db")
+EngineDepends = Annotated[Engine, Depends(get_engine)]
 
-    engine.ensure_table_created(ListType)
-    engine.ensure_table_created(List)
-    engine.ensure_table_created(ListSection)
-    engine.ensure_table_created(ListItem)
 
-    # engine.connection.set_trace_callback(print)  # TODO: this should be removed in production
-    try:
-        yield engine
-    except:
-        engine.connection.rollback()
-        raise
-    else:
-        engine.connection.commit()
-    finally:
-        engine.connection.close()
+def save_item_texts(pool: EnginePool, texts: dict[int, str]) -> None:
+    """Write a batch of buffered edits in one transaction."""
+    with pool.borrow() as engine:
+        engine.connection.executemany(f"UPDATE {ListItem.__name__} SET txt = ? WHERE id = ?", [(txt, item_id) for item_id, txt in texts.items()])
 
 
-engine_context = contextmanager(get_engine)
+def get_edit_buffer(request: Request) -> EditBuffer:
+    return request.app.state.xxx_edits
 
-EngineDepends = Annotated[Engine, Depends(get_engine)]
+
+EditBufferDepends = Annotated[EditBuffer, Depends(get_edit_buffer)]
 
 
-def init_db() -> None:
-    if Path("xxx.db").exists():
-        logger.info("xxx.db already exists, skipping init_db")
-        return
+def create_engine_pool(db_path: str, size: int, tracer: StatementTracer | None = None, timeout: float = 5.0) -> EnginePool:
+    """Open the pool for the app lifespan, seeding the database if it doesn't exist yet."""
+    seed = not Path(db_path).exists()
+    pool = EnginePool(db_path, size, tracer, timeout)
+    if seed:
+        init_db(pool)
+    else:
+        logger.info(f"{db_path} already exists, skipping init_db")
+    return pool
 
-    with engine_context() as engine:
+
+def init_db(pool: EnginePool) -> None:
+    with pool.borrow() as engine:
         shopping = engine.save(ListType(None, "shopping"))
         # recursively save
         groceries = engine.save(List(None, "Grocery", shopping))
@@ -99,8 +176,10 @@ def init_db() -> None:
         for section, items in section_items.items():
             # insert without recursion, (shallow,e.g. groceries and shopping type are already saved)
             section = engine.insert_shallow(ListSection(None, section, groceries))
+            sort_key = None
             for item in items:
-                engine.insert_shallow(ListItem(None, item, section))
+                sort_key = key_between(sort_key, None)
+                engine.insert_shallow(ListItem(None, item, section, sort_key))
 
         # empty list
         engine.insert_shallow(List(None, "Empty", shopping))
@@ -108,46 +187,123 @@ def init_db() -> None:
         engine.insert_shallow(ListSection(None, "Empty", groceries))
 
 
-init_db()  # TODO: move this to a startup lifecycle
+# one round trip for the whole page, sections without items come back with NULL item columns
+LIST_PAGE_SQL = f"""
+    SELECT
+        {List.__name__}.id,
+        {List.__name__}.name,
+        {ListType.__name__}.id,
+        {ListType.__name__}.codename,
+        {ListSection.__name__}.id,
+        {ListSection.__name__}.title,
+        {ListItem.__name__}.id,
+        {ListItem.__name__}.txt,
+        {ListItem.__name__}.sort_key
+    FROM {List.__name__}
+    JOIN {ListType.__name__} ON {ListType.__name__}.id = {List.__name__}.listtype
+    LEFT JOIN {ListSection.__name__} ON {ListSection.__name__}.list = {List.__name__}.id
+    LEFT JOIN {ListItem.__name__} ON {ListItem.__name__}.listsection = {ListSection.__name__}.id
+    WHERE {List.__name__}.name = ?
+    ORDER BY {ListSection.__name__}.id, {ListItem.__name__}.sort_key
+"""
+
+
+def load_list_page(engine: Engine, list_name: str) -> tuple[List, dict[ListSection, list[ListItem]]] | None:
+    """The list and its sections (empty ones included) with their items, or None if there is no such list.
+
+    Every section and item shares its parent tuples instead of each row building its own chain.
+    """
+    rows = engine.connection.execute(LIST_PAGE_SQL, (list_name,)).fetchall()
+    if len(rows) == 0:
+        return None
+
+    list_id, name, listtype_id, codename = rows[0][:4]
+    mylist = List(list_id, name, ListType(listtype_id, codename))
+
+    sections: dict[int, tuple[ListSection, list[ListItem]]] = {}
+    for *_, section_id, title, item_id, txt, sort_key in rows:
+        if section_id is None:
+            continue  # list without any sections
+        entry = sections.get(section_id)
+        if entry is None:
+            entry = sections[section_id] = (ListSection(section_id, title, mylist), [])
+        section, items = entry
+        if item_id is not None:
+            items.append(ListItem(item_id, txt, section, sort_key))
+
+    return mylist, dict(sections.values())
 
 
-@select(ListItem)
-def listitems_by_listname(list_name: str) -> str:
-    return f"WHERE {ListItem.listsection.list.name} = {list_name}"
+@router.get("/list/{list_name}")
+def xxxlist(request: Request, edits: EditBufferDepends, list_name: str) -> HTMLResponse:
+    # the page must show what was typed, even if it hasn't been written yet or an autosave is still writing it.
+    # The flush borrows its own engine, so this one is only borrowed after it, never holding two at once
+    edits.flush()
+    with request.app.state.xxx_engines.borrow() as engine:
+        page = load_list_page(engine, list_name)
+    if page is None:
+        return HTMLResponse(status_code=404, content=f"List {list_name} not found")
 
+    mylist, section_items = page
+    return templates.TemplateResponse(request, f'{mylist.listtype.codename}_list.html', {"mylist": mylist, "section_items": section_items})
 
-@select(List)
-def list_by_name(list_name: str) -> str:
-    return f"WHERE {List.name} = {list_name}"
 
+@router.put("/list/item/{item_id}")
+def update_item(edits: EditBufferDepends, engine: EngineDepends, item_id: int, txt: Annotated[str, Form()]) -> HTMLResponse:
+    # an unknown id would only be dropped silently when the buffer is flushed
+    if not _exists(engine.connection, ListItem, item_id):
+        return HTMLResponse(status_code=404, content=f"Item with id {item_id} not found")
+    # fires on every pause in typing, buffered so a burst of edits is one write once the typing stops
+    edits.put(item_id, txt)
 
-@router.get("/list/{list_name}")
-def xxxlist(request: Request, engine: EngineDepends, list_name: str) -> HTMLResponse:
-    mylist = engine.query(*list_by_name(list_name)).fetchone()
-    if mylist is None:
-        return HTMLResponse(status_code=404, content=f"List {list_name} not found")
+    # the textarea is already showing txt, the page swaps nothing
+    return HTMLResponse(status_code=202)
 
-    listitems = engine.query(*listitems_by_listname(list_name)).fetchall()
-    if len(listitems) == 0:
-        return HTMLResponse(status_code=404, content=f"No items found for list {list_name}")
 
-    section_items = {}
-    for item in listitems:
-        section_items.setdefault(item.listsection, []).append(item)
+def _section_keys(connection: sqlite3.Connection, listsection_id: int) -> list[tuple[int, int]]:
+    return connection.execute(f"SELECT id, sort_key FROM {ListItem.__name__} WHERE listsection = ? ORDER BY sort_key", (listsection_id,)).fetchall()
 
-    return templates.TemplateResponse(request, f'{mylist.listtype.codename}_list.html', {"mylist": mylist, "section_items": section_items})
 
+def _respace(connection: sqlite3.Connection, rows: list[tuple[int, int]], index: int) -> list[tuple[int, int]]:
+    """Rewrite the window of keys respace picks around `index`, returns the section's rows with the new keys."""
+    start, new_keys = respace([key for _, key in rows], index)
+    window = [(item_id, key) for (item_id, _), key in zip(rows[start : start + len(new_keys)], new_keys, strict=True)]
+    connection.executemany(f"UPDATE {ListItem.__name__} SET sort_key = ? WHERE id = ?", [(key, item_id) for item_id, key in window])
+    return rows[:start] + window + rows[start + len(new_keys) :]
 
-@router.put("/list/item/{item_id}")
-def update_item(request: Request, engine: EngineDepends, item_id: int, txt: Annotated[str, Form()]) -> HTMLResponse:
-    item = engine.get(ListItem, item_id)
-    if item is None:
-        return HTMLResponse(status_code=404, content=f"Item with id {item_id} not found")
 
-    item = item._replace(txt=txt)
-    engine.save(item)
+def sort_key_after(connection: sqlite3.Connection, listsection_id: int, after_key: int | None) -> int:
+    """Sort key for a position right after `after_key` in the section (None for the top).
+
+    Normally two indexed lookups and nothing written, only when that spot has run out of room are a few
+    neighbouring keys rewritten to make some. Raises NoRoomError if the whole section has none left.
+    """
+    if after_key is None:
+        before_key = connection.execute(f"SELECT min(sort_key) FROM {ListItem.__name__} WHERE listsection = ?", (listsection_id,)).fetchone()[0]
+    else:
+        sql = f"SELECT min(sort_key) FROM {ListItem.__name__} WHERE listsection = ? AND sort_key > ?"
+        before_key = connection.execute(sql, (listsection_id, after_key)).fetchone()[0]
+
+    key = key_between(after_key, before_key)
+    if key is not None:
+        return key
+
+    rows = _section_keys(connection, listsection_id)
+    index = len(rows) if before_key is None else [key for _, key in rows].index(before_key)
+    keys = [key for _, key in _respace(connection, rows, index)]
+    key = key_between(*neighbours(keys, index))
+    if key is None:
+        raise NoRoomError(f"Section {listsection_id} has no sort keys left")
+    return key
 
-    return templates.TemplateBlockResponse(request, f'{item.listsection.list.listtype.codename}_list.html', 'listitem', {"item": item})
+
+def _item_sort_key(connection: sqlite3.Connection, item_id: int, listsection_id: int) -> int | None:
+    row = connection.execute(f"SELECT sort_key FROM {ListItem.__name__} WHERE id = ? AND listsection = ?", (item_id, listsection_id)).fetchone()
+    return None if row is None else row[0]
+
+
+def _exists(connection: sqlite3.Connection, table: type[tuple], row_id: int) -> bool:
+    return connection.execute(f"SELECT 1 FROM {table.__name__} WHERE id = ?", (row_id,)).fetchone() is not None
 
 
 @router.post('/list/item')
@@ -156,12 +312,92 @@ def create_item_after(request: Request, engine: EngineDepends, after_item_id: An
         after_item = engine.get(ListItem, after_item_id)
     except IdNoneError:
         return HTMLResponse(status_code=400, content=f"Section with id {after_item_id} invalid")
+    if after_item is None:
+        return HTMLResponse(status_code=404, content=f"Item with id {after_item_id} not found")
 
-    item = engine.save(ListItem(None, '', after_item.listsection))
+    try:
+        sort_key = sort_key_after(engine.connection, after_item.listsection.id, after_item.sort_key)
+    except NoRoomError as e:
+        return HTMLResponse(status_code=409, content=str(e))
+    item = engine.insert_shallow(ListItem(None, '', after_item.listsection, sort_key))
 
     return templates.TemplateBlockResponse(request, f'{after_item.listsection.list.listtype.codename}_list.html', 'listitem', {"item": item})
 
 
+@router.put("/list/item/{item_id}/position")
+def move_item(
+    engine: EngineDepends,
+    item_id: int,
+    listsection_id: Annotated[int, Form()],
+    after_item_id: Annotated[int | None, Form()] = None,
+) -> HTMLResponse:
+    """Move an item to just after another item of a section, or to the top of it."""
+    # checked before anything is written, a response is committed like any other
+    if not _exists(engine.connection, ListItem, item_id):
+        return HTMLResponse(status_code=404, content=f"Item with id {item_id} not found")
+    if not _exists(engine.connection, ListSection, listsection_id):
+        return HTMLResponse(status_code=404, content=f"Section with id {listsection_id} not found")
+
+    after_key = None
+    if after_item_id is not None:
+        after_key = _item_sort_key(engine.connection, after_item_id, listsection_id)
+        if after_key is None:
+            return HTMLResponse(status_code=400, content=f"Item with id {after_item_id} is not in section {listsection_id}")
+
+    try:
+        sort_key = sort_key_after(engine.connection, listsection_id, after_key)
+    except NoRoomError as e:
+        return HTMLResponse(status_code=409, content=str(e))
+    sql = f"UPDATE {ListItem.__name__} SET listsection = ?, sort_key = ? WHERE id = ?"
+    engine.connection.execute(sql, (listsection_id, sort_key, item_id))
+
+    return HTMLResponse(status_code=200)
+
+
+def rebalance_crowded(connection: sqlite3.Connection, max_sections: int = 8) -> int:
+    """Spread out spots where neighbouring keys are closer than CROWDED_GAP, returns how many keys were rewritten.
+
+    Meant to run in the background so moves rarely find their spot out of room, a few sections per call.
+    """
+    sql = f"""
+        SELECT DISTINCT listsection FROM (
+            SELECT listsection, sort_key - LAG(sort_key) OVER (PARTITION BY listsection ORDER BY sort_key) AS gap
+            FROM {ListItem.__name__}
+        )
+        WHERE gap < ?
+        LIMIT ?
+    """
+    rewritten = 0
+    for (listsection_id,) in connection.execute(sql, (CROWDED_GAP, max_sections)).fetchall():
+        rows = _section_keys(connection, listsection_id)
+        while crowded_at := crowded([key for _, key in rows]):
+            before = rows
+            rows = _respace(connection, rows, crowded_at[0])
+            changed = sum(old != new for old, new in zip(before, rows, strict=True))
+            if changed == 0:
+                break  # the whole section is as spread out as it can be
+            rewritten += changed
+    return rewritten
+
+
+async def rebalance_periodically(pool: EnginePool, interval: float) -> None:
+    """Lifespan task running rebalance_crowded every `interval` seconds."""
+
+    def rebalance() -> int:
+        with pool.borrow() as engine:
+            return rebalance_crowded(engine.connection)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            rewritten = await anyio.to_thread.run_sync(rebalance)
+        except Exception:
+            logger.exception("Rebalancing xxx sort keys failed")
+            continue
+        if rewritten > 0:
+            logger.info(f"Rebalanced {rewritten} xxx sort keys")
+
+
 @router.delete("/list/item/{item_id}")
 def delete_item(request: Request, engine: EngineDepends, item_id: int) -> HTMLResponse:
     item = engine.get(ListItem, item_id)
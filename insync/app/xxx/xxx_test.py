@@ -0,0 +1,262 @@
+import sqlite3
+from collections.abc import Iterable
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from insync.app.xxx import EnginePool, PoolExhaustedError, create_engine_pool, pool_exhausted, router, save_item_texts
+from insync.app.xxx.autosave import EditBuffer
+from insync.app.xxx.xxx import List, ListItem, ListSection, ListType, _add_sort_key_column, load_list_page, rebalance_crowded, sort_key_after
+from insync.sortkey import CROWDED_GAP, END_GAP, crowded
+
+
+@pytest.fixture
+def db_path(tmp_path: Path) -> str:
+    return str(tmp_path / 'xxx.db')
+
+
+@pytest.fixture
+def pool(db_path: str) -> Iterable[EnginePool]:
+    _pool = create_engine_pool(db_path, 2, timeout=0.05)
+    yield _pool
+    _pool.close()
+
+
+@pytest.fixture
+def client(pool: EnginePool) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.add_exception_handler(PoolExhaustedError, pool_exhausted)
+    app.state.xxx_engines = pool
+    app.state.xxx_edits = EditBuffer(partial(save_item_texts, pool))
+    return TestClient(app)
+
+
+def count(pool: EnginePool, table: str) -> int:
+    with pool.borrow() as engine:
+        return engine.connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def item_txt(pool: EnginePool, item_id: int) -> str | None:
+    with pool.borrow() as engine:
+        row = engine.connection.execute(f"SELECT txt FROM {ListItem.__name__} WHERE id = ?", (item_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def first_section(pool: EnginePool) -> ListSection:
+    with pool.borrow() as engine:
+        section_id = engine.connection.execute(f"SELECT min(id) FROM {ListSection.__name__}").fetchone()[0]
+        return engine.get(ListSection, section_id)
+
+
+class TestEnginePool:
+    def test_new_database_is_seeded_once(self, db_path: str, pool: EnginePool) -> None:
+        items = count(pool, ListItem.__name__)
+        assert items > 0
+
+        reopened = create_engine_pool(db_path, 1)
+        assert count(reopened, ListItem.__name__) == items
+        reopened.close()
+
+    def test_borrow_commits_on_success(self, pool: EnginePool) -> None:
+        section = first_section(pool)
+        with pool.borrow() as engine:
+            item = engine.insert_shallow(ListItem(None, 'committed', section, 0))
+
+        # whichever engine is lent next sees it
+        with pool.borrow() as a, pool.borrow() as b:
+            for engine in (a, b):
+                assert engine.connection.execute(f"SELECT txt FROM {ListItem.__name__} WHERE id = ?", (item.id,)).fetchone() == ('committed',)
+
+    def test_borrow_rolls_back_on_error_and_returns_the_engine(self, pool: EnginePool) -> None:
+        section = first_section(pool)
+        before = count(pool, ListItem.__name__)
+
+        with pytest.raises(RuntimeError), pool.borrow() as engine:
+            engine.insert_shallow(ListItem(None, 'rolled back', section, 0))
+            raise RuntimeError
+
+        assert count(pool, ListItem.__name__) == before
+        with pool.borrow(), pool.borrow():
+            pass
+
+    def test_exhausted_pool_times_out(self, pool: EnginePool) -> None:
+        with pool.borrow(), pool.borrow(), pytest.raises(PoolExhaustedError), pool.borrow():
+            pass
+
+
+def test_exhausted_pool_is_503(client: TestClient, pool: EnginePool) -> None:
+    with ExitStack() as stack:
+        for _ in range(pool.size):
+            stack.enter_context(pool.borrow())
+        response = client.delete("/xxx/list/item/1")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.delete("/xxx/list/item/1").status_code == 200
+
+
+def test_delete_unknown_item_is_404(client: TestClient) -> None:
+    assert client.delete("/xxx/list/item/999999").status_code == 404
+
+
+def test_update_item_is_saved_with_the_next_flush(client: TestClient, pool: EnginePool) -> None:
+    response = client.put("/xxx/list/item/1", data={"txt": "edited"})
+    assert response.status_code == 202
+    assert item_txt(pool, 1) != "edited"
+
+    client.app.state.xxx_edits.flush()  # type: ignore[attr-defined]
+    assert item_txt(pool, 1) == "edited"
+
+
+def test_update_unknown_item_is_404(client: TestClient) -> None:
+    assert client.put("/xxx/list/item/999999", data={"txt": "edited"}).status_code == 404
+    assert len(client.app.state.xxx_edits) == 0  # type: ignore[attr-defined]
+
+
+class TestLoadListPage:
+    def test_sections_with_their_items_in_sort_key_order(self, pool: EnginePool) -> None:
+        with pool.borrow() as engine:
+            mylist = engine.save(List(None, "Hardware", ListType(None, "shopping")))
+            paint = engine.insert_shallow(ListSection(None, "paint", mylist))
+            empty = engine.insert_shallow(ListSection(None, "empty", mylist))
+            tools = engine.insert_shallow(ListSection(None, "tools", mylist))
+            # inserted out of order
+            for txt, section, sort_key in [("roller", paint, 20), ("hammer", tools, 5), ("primer", paint, 10), ("saw", tools, 7), ("tape", paint, 30)]:
+                engine.insert_shallow(ListItem(None, txt, section, sort_key))
+
+            page = load_list_page(engine, "Hardware")
+
+        assert page is not None
+        loaded, section_items = page
+        assert loaded == mylist
+        assert list(section_items) == [paint, empty, tools]
+        assert [[item.txt for item in items] for items in section_items.values()] == [["primer", "roller", "tape"], [], ["hammer", "saw"]]
+        assert [[item.sort_key for item in items] for items in section_items.values()] == [[10, 20, 30], [], [5, 7]]
+        # every item shares its section, and every section the list
+        for section, items in section_items.items():
+            assert section.list is loaded
+            assert all(item.listsection is section for item in items)
+
+    def test_list_without_sections(self, pool: EnginePool) -> None:
+        with pool.borrow() as engine:
+            page = load_list_page(engine, "Empty")
+        assert page is not None
+        assert page[0].name == "Empty"
+        assert page[1] == {}
+
+    def test_unknown_list(self, pool: EnginePool) -> None:
+        with pool.borrow() as engine:
+            assert load_list_page(engine, "nope") is None
+
+
+def new_section(pool: EnginePool, keys: list[int]) -> tuple[int, list[int]]:
+    """A section of the seeded list holding items with the given sort keys, returns its id and the item ids."""
+    with pool.borrow() as engine:
+        section = engine.insert_shallow(ListSection(None, "sorted", first_section(pool).list))
+        item_ids = [engine.insert_shallow(ListItem(None, f"item {key}", section, key)).id for key in keys]
+    return section.id, item_ids
+
+
+def section_order(pool: EnginePool, section_id: int) -> list[tuple[int, int]]:
+    with pool.borrow() as engine:
+        return engine.connection.execute(f"SELECT id, sort_key FROM {ListItem.__name__} WHERE listsection = ? ORDER BY sort_key", (section_id,)).fetchall()
+
+
+class TestSortKeyAfter:
+    def test_top_middle_and_end(self, pool: EnginePool) -> None:
+        section_id, _ = new_section(pool, [END_GAP, 2 * END_GAP])
+        with pool.borrow() as engine:
+            assert 0 < sort_key_after(engine.connection, section_id, None) < END_GAP
+            assert END_GAP < sort_key_after(engine.connection, section_id, END_GAP) < 2 * END_GAP
+            assert sort_key_after(engine.connection, section_id, 2 * END_GAP) == 3 * END_GAP
+
+    def test_empty_section(self, pool: EnginePool) -> None:
+        section_id, _ = new_section(pool, [])
+        with pool.borrow() as engine:
+            assert sort_key_after(engine.connection, section_id, None) == END_GAP
+
+    def test_no_room_rewrites_only_neighbours(self, pool: EnginePool) -> None:
+        keys = [i * END_GAP for i in range(1, 20)]
+        keys[10] = keys[9] + 1
+        section_id, item_ids = new_section(pool, keys)
+
+        with pool.borrow() as engine:
+            key = sort_key_after(engine.connection, section_id, keys[9])
+
+        order = section_order(pool, section_id)
+        assert [item_id for item_id, _ in order] == item_ids
+        new_keys = [k for _, k in order]
+        assert new_keys[9] < key < new_keys[10]
+        assert sum(old != new for old, new in zip(keys, new_keys, strict=True)) < len(keys) // 2
+
+
+class TestMoveItem:
+    def test_within_and_across_sections(self, client: TestClient, pool: EnginePool) -> None:
+        section_id, (a, b, c) = new_section(pool, [END_GAP, 2 * END_GAP, 3 * END_GAP])
+        other_id, (d,) = new_section(pool, [END_GAP])
+
+        assert client.put(f"/xxx/list/item/{c}/position", data={"listsection_id": section_id}).status_code == 200
+        assert [item_id for item_id, _ in section_order(pool, section_id)] == [c, a, b]
+
+        assert client.put(f"/xxx/list/item/{c}/position", data={"listsection_id": section_id, "after_item_id": a}).status_code == 200
+        assert [item_id for item_id, _ in section_order(pool, section_id)] == [a, c, b]
+
+        assert client.put(f"/xxx/list/item/{a}/position", data={"listsection_id": other_id, "after_item_id": d}).status_code == 200
+        assert [item_id for item_id, _ in section_order(pool, section_id)] == [c, b]
+        assert [item_id for item_id, _ in section_order(pool, other_id)] == [d, a]
+
+    def test_after_item_of_another_section_is_400(self, client: TestClient, pool: EnginePool) -> None:
+        section_id, (a,) = new_section(pool, [END_GAP])
+        _, (d,) = new_section(pool, [END_GAP])
+        assert client.put(f"/xxx/list/item/{a}/position", data={"listsection_id": section_id, "after_item_id": d}).status_code == 400
+
+    def test_unknown_item_or_section_is_404_and_writes_nothing(self, client: TestClient, pool: EnginePool) -> None:
+        keys = [END_GAP, END_GAP + 1]
+        section_id, (a, _) = new_section(pool, keys)
+        before = section_order(pool, section_id)
+
+        # the spot after `a` has no room, so getting that far would respace the section
+        assert client.put("/xxx/list/item/999999/position", data={"listsection_id": section_id, "after_item_id": a}).status_code == 404
+        assert client.put(f"/xxx/list/item/{a}/position", data={"listsection_id": 999999}).status_code == 404
+        assert section_order(pool, section_id) == before
+
+
+class TestRebalanceCrowded:
+    def test_spreads_out_crowded_sections(self, pool: EnginePool) -> None:
+        keys = [END_GAP + i for i in range(10)] + [20 * END_GAP]
+        section_id, item_ids = new_section(pool, keys)
+
+        with pool.borrow() as engine:
+            assert rebalance_crowded(engine.connection) > 0
+
+        order = section_order(pool, section_id)
+        assert [item_id for item_id, _ in order] == item_ids
+        assert crowded([key for _, key in order]) == []
+
+        with pool.borrow() as engine:
+            assert rebalance_crowded(engine.connection) == 0
+
+    def test_leaves_roomy_sections_alone(self, pool: EnginePool) -> None:
+        section_id, _ = new_section(pool, [CROWDED_GAP, 2 * CROWDED_GAP])
+        before = section_order(pool, section_id)
+        with pool.borrow() as engine:
+            rebalance_crowded(engine.connection)
+        assert section_order(pool, section_id) == before
+
+
+def test_sort_key_column_is_added_in_id_order(db_path: str) -> None:
+    with sqlite3.connect(db_path) as conn:
+        # as the persister created it before sort_key existed
+        conn.execute(f"CREATE TABLE {ListItem.__name__} (id INTEGER PRIMARY KEY, txt, listsection)")
+        conn.executemany(f"INSERT INTO {ListItem.__name__} (id, txt, listsection) VALUES (?, ?, 1)", [(1, 'first'), (2, 'second')])
+        _add_sort_key_column(conn)
+        _add_sort_key_column(conn)  # already migrated, no-op
+        rows = conn.execute(f"SELECT id, sort_key FROM {ListItem.__name__} ORDER BY id").fetchall()
+    conn.close()
+
+    assert rows == [(1, END_GAP), (2, 2 * END_GAP)]
@@ -0,0 +1,49 @@
+import datetime as dt
+from collections.abc import Iterable
+from uuid import SafeUUID
+
+from uuid6 import UUID
+
+from insync.listitem import ListItemPriority
+
+PRIORITIES: dict[str | None, ListItemPriority | None] = {None: None} | {p.value: p for p in ListItemPriority}
+
+
+def uuids(ints: Iterable[int]) -> list[UUID]:
+    """UUIDs set up the way unpickling does, the two slots of `uuid.UUID` assigned directly.
+
+    UUID(int=...) validates every argument and takes three times as long. For 100k items that is 90ms more of a
+    500ms snapshot decode (`benchmarks.boot`), and `__setstate__` costs as much again by building a dict per UUID.
+    columns_test checks that a UUID still has only these two slots.
+    """
+    new = UUID.__new__
+    setattr_ = object.__setattr__
+    unknown = SafeUUID.unknown
+    column = []
+    for i in ints:
+        uuid = new(UUID)
+        setattr_(uuid, "int", i)
+        setattr_(uuid, "is_safe", unknown)
+        column.append(uuid)
+    return column
+
+
+def uuids_from_bytes_le(column: Iterable[bytes]) -> list[UUID]:
+    # the first three fields are little endian, the rest as is
+    return uuids(int.from_bytes(b[3::-1] + b[5:3:-1] + b[7:5:-1] + b[8:]) for b in column)
+
+
+def datetimes(column: Iterable[str | None], cache: dict[str | None, dt.datetime | None]) -> list[dt.datetime | None]:
+    """Timestamps parsed once per distinct text, e.g. a checklist reset completes many items at the same instant.
+
+    Pass the same `cache` for every column and batch of a load, it starts out as `{None: None}` for NULLs.
+    """
+    fromisoformat = dt.datetime.fromisoformat
+    decoded = []
+    for text in column:
+        value = cache.get(text)
+        if value is None and text is not None:
+            value = cache[text] = fromisoformat(text)
+            assert value.tzinfo is not None, "Datetime must have timezone info"
+        decoded.append(value)
+    return decoded
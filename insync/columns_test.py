@@ -0,0 +1,42 @@
+import datetime as dt
+import pickle
+import uuid
+
+import pytest
+from uuid6 import UUID, uuid7
+
+from insync.columns import datetimes, uuids, uuids_from_bytes_le
+
+
+def test_uuids_are_the_same_as_constructed_ones() -> None:
+    expected = [uuid7() for _ in range(3)]
+
+    for decoded in (uuids(u.int for u in expected), uuids_from_bytes_le(u.bytes_le for u in expected)):
+        assert decoded == expected
+        assert all(type(u) is UUID for u in decoded)
+        assert len({*decoded, *expected}) == 3
+
+
+def test_uuids_set_every_slot_unpickling_sets() -> None:
+    # uuids() bypasses the constructor, a new slot in uuid.UUID would be left unset
+    assert set(uuid.UUID.__slots__) == {'int', 'is_safe', '__weakref__'}
+    expected = uuid7()
+    decoded = uuids([expected.int])[0]
+    assert pickle.loads(pickle.dumps(expected)).__getstate__() == decoded.__getstate__()
+    assert decoded.is_safe is uuid.SafeUUID.unknown
+
+
+def test_datetimes_are_parsed_once_per_text() -> None:
+    now = dt.datetime.now(tz=dt.timezone.utc)
+    cache: dict[str | None, dt.datetime | None] = {None: None}
+
+    first = datetimes([now.isoformat(), None, now.isoformat()], cache)
+    second = datetimes([now.isoformat()], cache)
+
+    assert first == [now, None, now]
+    assert first[0] is first[2] is second[0]
+
+
+def test_datetimes_must_have_a_timezone() -> None:
+    with pytest.raises(AssertionError):
+        datetimes([dt.datetime.now().isoformat()], {None: None})
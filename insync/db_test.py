@@ -53,6 +53,32 @@ def test_can_retrieve_persisted_item_with_project(db: ListDB, item: ListItem) ->
     assert item == items2[0]
 
 
+def test_load_decodes_every_column(db: ListDB) -> None:
+    reg = ListRegistry()
+    grocery = ListItemProject('grocery', ListItemProjectType.checklist)
+    reg.add(ListItem('milk', project=grocery, recurring=True, priority=ListItemPriority("B")))
+    reg.add(ListItem('eggs', project=ListItemProject('grocery', ListItemProjectType.checklist)))
+    db.patch(reg)
+
+    milk, eggs = sorted(db.load(), key=lambda item: item.description, reverse=True)
+
+    assert milk.priority is ListItemPriority.B
+    assert milk.recurring is True
+    assert eggs.recurring is False
+    # interned
+    assert milk.project is eggs.project
+
+
+def test_load_in_batches(db: ListDB, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('insync.db.LOAD_BATCH_SIZE', 2)
+    reg = ListRegistry()
+    for i in range(5):
+        reg.add(ListItem(f'item {i}', project=ListItemProject(f'project {i % 3}', ListItemProjectType.todo)))
+    db.patch(reg)
+
+    assert db.load() == reg
+
+
 def test_trying_to_save_naive_datetime_raises(db: ListDB) -> None:
     reg = ListRegistry()
     item = ListItem('test', completion_datetime=dt.datetime.now())
@@ -1,10 +1,13 @@
+from functools import cache
 from logging import getLogger
 from pathlib import Path
 
 logger = getLogger(__name__)
 
 
+@cache
 def githash() -> str:
+    """Commit checked out in the working directory, read on first use rather than at import."""
     repo_path = Path()
     head_file = repo_path / '.git' / 'HEAD'
 
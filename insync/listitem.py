@@ -150,6 +150,8 @@ class ListItem:
     archival_datetime: dt.datetime | None = None
     project: ListItemProject = field(default_factory=NullListItemProject)
     recurring: bool = False
+    # registry version of the last do/undo that touched this item, lets renders of the item be cached
+    version: int = field(default=0, init=False, compare=False, repr=False)
 
     def __str__(self) -> str:
         # x (A) 2016-05-20 2016-04-30 measure space for +chapelShelving @chapel due:2016-05-30
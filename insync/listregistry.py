@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import datetime as dt
-from collections.abc import Iterator, Sequence
+import secrets
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, NamedTuple
 
 from uuid6 import UUID
 
@@ -11,9 +13,61 @@ from insync.listitem import ListItem, ListItemProject, ListItemProjectType
 from insync.listview import ListView
 
 
+class _CountedState(NamedTuple):
+    """What RegistryStats last counted an item as."""
+
+    project: ListItemProject
+    archived: bool
+    completed: bool
+    recurring: bool
+
+    @classmethod
+    def of(cls, item: ListItem) -> _CountedState:
+        return cls(item.project, item.archived, item.completed, item.recurring)
+
+
+@dataclass
+class RegistryStats:
+    """Counts kept up to date as items are added, removed and touched by commands, so reading them never scans."""
+
+    items: int = 0
+    archived: int = 0
+    completed: int = 0
+    recurring: int = 0
+    # projects with at least one item
+    project_items: dict[ListItemProject, int] = field(default_factory=dict)
+    projects_per_type: dict[ListItemProjectType, int] = field(default_factory=dict)
+
+    def count(self, state: _CountedState, sign: int) -> None:
+        """Count `sign` more items in `state`, negative to uncount them."""
+        self.items += sign
+        self.archived += sign * state.archived
+        self.completed += sign * state.completed
+        self.recurring += sign * state.recurring
+
+        project_type = state.project.project_type
+        before = self.project_items.get(state.project, 0)
+        n = before + sign
+        if n == 0:
+            del self.project_items[state.project]
+            self.projects_per_type[project_type] -= 1
+            if self.projects_per_type[project_type] == 0:
+                del self.projects_per_type[project_type]
+        else:
+            if before == 0:
+                self.projects_per_type[project_type] = self.projects_per_type.get(project_type, 0) + 1
+            self.project_items[state.project] = n
+
+
 @dataclass
 class ListRegistry:
     _items: dict[UUID, ListItem] = field(default_factory=dict)
+    _version: int = field(default=0, compare=False)
+    # versions are only meaningful within one registry, e.g. they restart from 0 after a reload from the db
+    _epoch: str = field(default_factory=lambda: secrets.token_hex(4), compare=False)
+    _project_versions: dict[ListItemProject, int] = field(default_factory=dict, compare=False)
+    _stats: RegistryStats = field(default_factory=RegistryStats, compare=False)
+    _counted: dict[UUID, _CountedState] = field(default_factory=dict, compare=False)
 
     def __str__(self) -> str:
         return '\n'.join(str(item) for item in self._items.values()) + '\n'
@@ -32,9 +86,58 @@ class ListRegistry:
 
     def add(self, item: ListItem) -> None:
         self._items[item.uuid] = item
+        self._recount(item)
+
+    def add_many(self, items: Iterable[ListItem]) -> None:
+        """Same as `add` for each item, but each distinct state is counted once, e.g. for loading a registry."""
+        if self._items:
+            for item in items:
+                self.add(item)
+            return
+        self._items.update((item.uuid, item) for item in items)
+        self._counted = dict(zip(self._items, map(_CountedState.of, self._items.values()), strict=True))
+        for state, n in Counter(self._counted.values()).items():
+            self._stats.count(state, n)
 
     def remove(self, uuid: UUID) -> None:
         self._items.pop(uuid)
+        self._stats.count(self._counted.pop(uuid), -1)
+
+    @property
+    def stats(self) -> RegistryStats:
+        return self._stats
+
+    def _recount(self, item: ListItem) -> None:
+        new = _CountedState.of(item)
+        old = self._counted.get(item.uuid)
+        if old == new:
+            return
+        if old is not None:
+            self._stats.count(old, -1)
+        self._stats.count(new, +1)
+        self._counted[item.uuid] = new
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped on every do/undo, lets observers know what they have already seen."""
+        return self._version
+
+    @property
+    def epoch(self) -> str:
+        return self._epoch
+
+    def project_version(self, project: ListItemProject) -> int:
+        """Registry version of the last do/undo that touched an item of the project or its subprojects."""
+        return max((v for p, v in self._project_versions.items() if p in project), default=0)
+
+    def _bump_version(self, touched: Iterable[ListItem]) -> None:
+        self._version += 1
+        for item in touched:
+            item.version = self._version
+            self._project_versions[item.project] = self._version
+            # an undone CreateCommand has already removed (and uncounted) its item
+            if item.uuid in self._items:
+                self._recount(item)
 
     ### ListView Creation ###
     def search(self, project: ListItemProject) -> ListView:
@@ -47,12 +150,16 @@ class ListRegistry:
 
     def do(self, command: Command) -> None:
         command.do(self)
+        self._bump_version([self._items[uuid] for uuid in command.touched()])
         self._undostack.append(command)
         self._redostack.clear()
 
     def undo(self) -> None:
         command = self._undostack.pop()
+        # look up before undoing, an undone CreateCommand takes its item with it
+        touched = [self._items[uuid] for uuid in command.touched()]
         command.undo(self)
+        self._bump_version(touched)
         self._redostack.append(command)
 
     def redo(self) -> None:
@@ -61,6 +168,14 @@ class ListRegistry:
     def undoview(self) -> UndoView:
         return UndoView(self._undostack, self._redostack)
 
+    @property
+    def undo_depth(self) -> int:
+        return len(self._undostack)
+
+    @property
+    def redo_depth(self) -> int:
+        return len(self._redostack)
+
 
 class UndoView:
     def __init__(self, undostack: Sequence[Command], redostack: Sequence[Command]):
@@ -75,6 +190,10 @@ class UndoView:
     def redocommand(self) -> Command | None:
         return self._redostack[-1] if self._redostack else None
 
+    def history(self, limit: int = 10) -> list[Command]:
+        """The most recent commands that can be undone, newest first."""
+        return self._undostack[: -limit - 1 : -1]
+
 
 @dataclass
 class Command:
@@ -93,6 +212,10 @@ class Command:
     def undo(self, reg: ListRegistry) -> None:
         raise NotImplementedError
 
+    def touched(self) -> Iterable[UUID]:
+        """Items the command mutates (or mutated, once done)."""
+        raise NotImplementedError
+
 
 @dataclass
 class NullCommand(Command):
@@ -110,6 +233,9 @@ class NullCommand(Command):
         assert self.done, "Attempting to undo a NullCommand that has not been done"
         self.done = False
 
+    def touched(self) -> Iterable[UUID]:
+        return ()
+
 
 @dataclass
 class CreateCommand(Command):
@@ -131,6 +257,9 @@ class CreateCommand(Command):
         reg.remove(self.uuid)
         self.done = False
 
+    def touched(self) -> Iterable[UUID]:
+        return (self.uuid,)
+
 
 @dataclass
 class CompletionCommand(Command):
@@ -156,6 +285,9 @@ class CompletionCommand(Command):
         item.completion_datetime = self.completion_datetime_orig
         self.done = False
 
+    def touched(self) -> Iterable[UUID]:
+        return (self.uuid,)
+
 
 @dataclass
 class ArchiveCommand(Command):
@@ -181,6 +313,9 @@ class ArchiveCommand(Command):
         item.archival_datetime = self.archival_datetime_orig
         self.done = False
 
+    def touched(self) -> Iterable[UUID]:
+        return (self.uuid,)
+
 
 @dataclass
 class RecurringCommand(Command):
@@ -206,6 +341,9 @@ class RecurringCommand(Command):
         item.recurring = self.recurring_orig
         self.done = False
 
+    def touched(self) -> Iterable[UUID]:
+        return (self.uuid,)
+
 
 @dataclass
 class ChecklistResetCommand(Command):
@@ -255,3 +393,6 @@ class ChecklistResetCommand(Command):
         for prs in self.recurred:
             reg.get_item(prs.uuid).completion_datetime = prs.completion_datetime
         self.done = False
+
+    def touched(self) -> Iterable[UUID]:
+        return [*self.archived, *(prs.uuid for prs in self.recurred)]
@@ -16,6 +16,7 @@ from insync.listregistry import (
     CreateCommand,
     ListRegistry,
     RecurringCommand,
+    RegistryStats,
     UndoView,
 )
 from insync.listview import ListView
@@ -370,3 +371,162 @@ def test_can_undo_mark_as_recurring(reg: ListRegistry, item: ListItem) -> None:
     reg.undo()
 
     assert not item.recurring
+
+
+def test_registry_version_bumps_on_do_and_undo(reg: ListRegistry, item: ListItem) -> None:
+    assert reg.version == 0
+    reg.do(CompletionCommand(item.uuid, True))
+    assert reg.version == 1
+    reg.undo()
+    assert reg.version == 2
+    reg.redo()
+    assert reg.version == 3
+
+
+def test_registry_version_is_not_compared() -> None:
+    assert ListRegistry(_version=3) == ListRegistry()
+
+
+class TestProjectVersion:
+    @pytest.fixture
+    def grocery(self) -> ListItemProject:
+        return ListItemProject('grocery', ListItemProjectType.checklist)
+
+    @pytest.fixture
+    def dairy(self) -> ListItemProject:
+        return ListItemProject('grocery.dairy', ListItemProjectType.checklist)
+
+    def test_untouched_project_is_version_0(self, grocery: ListItemProject) -> None:
+        assert ListRegistry().project_version(grocery) == 0
+
+    def test_project_versions_are_not_compared(self, grocery: ListItemProject) -> None:
+        assert ListRegistry(_project_versions={grocery: 2}) == ListRegistry()
+
+    def test_change_in_subproject_bumps_parent(self, grocery: ListItemProject, dairy: ListItemProject) -> None:
+        reg = ListRegistry()
+        item = ListItem('milk', project=dairy)
+        reg.do(CreateCommand(item.uuid, item))
+
+        assert reg.project_version(dairy) == 1
+        assert reg.project_version(grocery) == 1
+        assert reg.project_version(NullListItemProject()) == 1
+
+    def test_change_in_parent_leaves_subproject(self, grocery: ListItemProject, dairy: ListItemProject) -> None:
+        reg = ListRegistry()
+        item = ListItem('bags', project=grocery)
+        reg.do(CreateCommand(item.uuid, item))
+
+        assert reg.project_version(grocery) == 1
+        assert reg.project_version(dairy) == 0
+
+    def test_undo_of_create_bumps_project(self, grocery: ListItemProject) -> None:
+        reg = ListRegistry()
+        item = ListItem('bags', project=grocery)
+        reg.do(CreateCommand(item.uuid, item))
+        reg.undo()
+
+        assert reg.project_version(grocery) == 2
+
+    def test_reset_bumps_only_touched_projects(self, grocery: ListItemProject, dairy: ListItemProject) -> None:
+        reg = ListRegistry()
+        reg.add(ListItem('milk', project=dairy, completion_datetime=dt.datetime.now(tz=dt.timezone.utc)))
+        reg.add(ListItem('bags', project=grocery))
+
+        reg.do(ChecklistResetCommand(grocery))
+
+        assert reg.project_version(dairy) == 1
+        assert reg.project_version(ListItemProject('grocery.produce', ListItemProjectType.checklist)) == 0
+
+
+def test_do_and_undo_bump_version_of_touched_items(reg: ListRegistry, item: ListItem) -> None:
+    other = ListItem('other')
+    reg.add(other)
+
+    reg.do(CompletionCommand(item.uuid, True))
+    assert item.version == 1
+    reg.undo()
+    assert item.version == 2
+    assert other.version == 0
+
+
+class TestStats:
+    @staticmethod
+    def recount(reg: ListRegistry) -> RegistryStats:
+        stats = RegistryStats()
+        for item in reg:
+            stats.items += 1
+            stats.archived += item.archived
+            stats.completed += item.completed
+            stats.recurring += item.recurring
+            stats.project_items[item.project] = stats.project_items.get(item.project, 0) + 1
+        for project in stats.project_items:
+            stats.projects_per_type[project.project_type] = stats.projects_per_type.get(project.project_type, 0) + 1
+        return stats
+
+    @pytest.fixture
+    def reg(self) -> ListRegistry:
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        grocery = ListItemProject('grocery', ListItemProjectType.checklist)
+        dairy = ListItemProject('grocery.dairy', ListItemProjectType.checklist)
+        reg = ListRegistry()
+        reg.add(ListItem('bags', project=grocery, completion_datetime=now))
+        reg.add(ListItem('milk', project=dairy, completion_datetime=now, recurring=True))
+        reg.add(ListItem('eggs', project=dairy))
+        reg.add(ListItem('taxes', project=ListItemProject('home', ListItemProjectType.todo)))
+        return reg
+
+    def test_add_is_counted(self, reg: ListRegistry) -> None:
+        assert reg.stats == self.recount(reg)
+        assert reg.stats.items == 4
+        assert reg.stats.completed == 2
+        assert reg.stats.projects_per_type == {ListItemProjectType.checklist: 2, ListItemProjectType.todo: 1}
+
+    def test_add_many_counts_like_add(self, reg: ListRegistry) -> None:
+        bulk = ListRegistry()
+        bulk.add_many(reg)
+        assert bulk == reg
+        assert bulk.stats == reg.stats
+
+        # into a registry that already has items, readding one of them
+        extra = ListItem('bread', project=ListItemProject('grocery', ListItemProjectType.checklist))
+        bulk.add_many([extra, next(iter(reg))])
+        assert bulk.stats == self.recount(bulk)
+
+    def test_readding_an_item_counts_it_once(self, reg: ListRegistry) -> None:
+        item = next(iter(reg))
+        reg.add(item)
+        assert reg.stats == self.recount(reg)
+
+    def test_removing_last_item_of_a_project_drops_the_project(self, reg: ListRegistry) -> None:
+        taxes = next(item for item in reg if item.description == 'taxes')
+        reg.remove(taxes.uuid)
+        assert reg.stats == self.recount(reg)
+        assert ListItemProjectType.todo not in reg.stats.projects_per_type
+
+    def test_commands_and_their_undo_are_counted(self, reg: ListRegistry) -> None:
+        eggs = next(item for item in reg if item.description == 'eggs')
+        new = ListItem('flour', project=ListItemProject('baking', ListItemProjectType.checklist))
+        for command in [
+            CompletionCommand(eggs.uuid, True),
+            RecurringCommand(eggs.uuid, True),
+            ArchiveCommand(eggs.uuid, True),
+            CreateCommand(new.uuid, new),
+            ChecklistResetCommand(ListItemProject('grocery', ListItemProjectType.checklist)),
+        ]:
+            reg.do(command)
+            assert reg.stats == self.recount(reg)
+        while reg.undo_depth:
+            reg.undo()
+            assert reg.stats == self.recount(reg)
+        while reg.redo_depth:
+            reg.redo()
+            assert reg.stats == self.recount(reg)
+
+
+def test_history_is_newest_first_and_limited(reg: ListRegistry, item: ListItem) -> None:
+    commands = [CompletionCommand(item.uuid, True), CompletionCommand(item.uuid, False), RecurringCommand(item.uuid, True)]
+    for command in commands:
+        reg.do(command)
+
+    assert reg.undoview().history(2) == [commands[2], commands[1]]
+    assert reg.undoview().history() == commands[::-1]
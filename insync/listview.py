@@ -68,9 +68,10 @@ class ListView:
          - 'grocery.produce' includes items with projects 'grocery.produce' and 'grocery.produce.fruits'
          - 'grocery.dairy'
         """
-        subprojects = {item.project.truncate(len(self.project) + 1) for item in self}
-        if self.project in subprojects:
-            subprojects.remove(self.project)
+        # bucket in one pass, an item belongs to exactly the subproject its project truncates to
+        subprojects: dict[ListItemProject, list[ListItem]] = {}
+        for item in self:
+            subprojects.setdefault(item.project.truncate(len(self.project) + 1), []).append(item)
+        subprojects.pop(self.project, None)
         for subproject in sorted(subprojects, key=lambda subproject: subproject.name):
-            subproject_items = filter(lambda item: item.project in subproject, self)
-            yield ListView(subproject_items, subproject)
+            yield ListView(subprojects[subproject], subproject)
@@ -0,0 +1,139 @@
+import gc
+import time
+import tracemalloc
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from insync.metrics import Counter, Histogram
+
+GC_PAUSE_SECONDS = Histogram("insync_gc_pause_seconds", "Cyclic garbage collector pauses", ["generation"])
+GC_COLLECTED = Counter("insync_gc_collected", "Objects freed by the cyclic garbage collector", ["generation"])
+
+# a trace belongs to the first subsystem any frame of its traceback matches, so more specific ones come first, e.g.
+# a cached render is allocated by jinja but was asked for by the fragment cache
+SUBSYSTEMS: list[tuple[str, tuple[str, ...]]] = [
+    ("cached renders", ("/insync/app/fragment_cache.py",)),
+    ("registry loaded from db", ("/insync/db.py",)),
+    ("commands and their changes", ("/insync/listregistry.py",)),
+    ("items and projects", ("/insync/listitem.py", "/insync/listview.py")),
+    ("websockets", ("/insync/app/ws",)),
+    ("xxx", ("/insync/app/xxx/",)),
+    ("templates", ("/jinja2/", "/insync/app/jinja_templates.py")),
+    ("instrumentation", ("/insync/metrics.py", "/insync/profiling.py", "/insync/sqltrace.py", "/insync/statementstats.py")),
+    ("other insync", ("/insync/",)),
+]
+UNCLASSIFIED = "libraries and interpreter"
+
+
+@lru_cache(maxsize=4096)
+def _subsystem_of_file(filename: str) -> tuple[int, str]:
+    filename = filename.replace("\\", "/")
+    for rank, (name, patterns) in enumerate(SUBSYSTEMS):
+        if any(pattern in filename for pattern in patterns):
+            return rank, name
+    return len(SUBSYSTEMS), UNCLASSIFIED
+
+
+def subsystem_of(traceback: tracemalloc.Traceback) -> str:
+    return min((_subsystem_of_file(frame.filename) for frame in traceback), default=(len(SUBSYSTEMS), UNCLASSIFIED))[1]
+
+
+@dataclass
+class MemoryUse:
+    name: str
+    size: int = 0
+    blocks: int = 0
+
+
+@dataclass
+class MemoryReport:
+    traced: int
+    peak: int
+    seconds: float
+    subsystems: list[MemoryUse]
+    top_lines: list[MemoryUse]
+
+
+def memory_report(limit: int = 15) -> MemoryReport:
+    """Memory allocated since tracemalloc started, by subsystem and by the lines allocating the most."""
+    assert tracemalloc.is_tracing(), "tracemalloc must be started before anything can be reported"
+    start = time.perf_counter()
+    snapshot = tracemalloc.take_snapshot()
+
+    subsystems = {name: MemoryUse(name) for name, _ in SUBSYSTEMS}
+    subsystems[UNCLASSIFIED] = MemoryUse(UNCLASSIFIED)
+    lines: dict[tuple[str, int], MemoryUse] = {}
+    for stat in snapshot.statistics("traceback"):
+        subsystem = subsystems[subsystem_of(stat.traceback)]
+        subsystem.size += stat.size
+        subsystem.blocks += stat.count
+        # frames are oldest first
+        filename, lineno = (stat.traceback[-1].filename, stat.traceback[-1].lineno) if stat.traceback else ("<unknown>", 0)
+        line = lines.get((filename, lineno))
+        if line is None:
+            line = lines[filename, lineno] = MemoryUse(f"{filename}:{lineno}")
+        line.size += stat.size
+        line.blocks += stat.count
+
+    traced, peak = tracemalloc.get_traced_memory()
+    return MemoryReport(
+        traced=traced,
+        peak=peak,
+        seconds=time.perf_counter() - start,
+        subsystems=sorted(subsystems.values(), key=lambda use: use.size, reverse=True),
+        top_lines=sorted(lines.values(), key=lambda use: use.size, reverse=True)[:limit],
+    )
+
+
+class GcPauses:
+    """Times every cyclic collection into GC_PAUSE_SECONDS through `gc.callbacks`."""
+
+    def __init__(self):
+        self._start = 0.0
+
+    def __call__(self, phase: str, info: dict[str, Any]) -> None:
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+        generation = info["generation"]
+        GC_PAUSE_SECONDS.labels(generation).observe(time.perf_counter() - self._start)
+        GC_COLLECTED.labels(generation).inc(info["collected"])
+
+    def install(self) -> None:
+        gc.callbacks.append(self)
+
+    def uninstall(self) -> None:
+        if self in gc.callbacks:
+            gc.callbacks.remove(self)
+
+
+def freeze_heap(thresholds: Sequence[int] = ()) -> int:
+    """Move every object alive now, e.g. a freshly loaded registry, out of reach of the cyclic collector.
+
+    Frozen objects are still freed when nothing refers to them, only cycles among them are never collected. Returns
+    how many objects were frozen.
+    """
+    gc.collect()
+    gc.freeze()
+    if thresholds:
+        gc.set_threshold(*thresholds)
+    return gc.get_freeze_count()
+
+
+@contextmanager
+def collector_paused() -> Iterator[None]:
+    """No cyclic collections meanwhile, e.g. while loading a registry.
+
+    Everything a load allocates stays alive and has no cycles, yet every few hundred thousand allocations the oldest
+    generation would be scanned again, a quarter of the time of a 100k item load.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
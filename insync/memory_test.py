@@ -0,0 +1,70 @@
+import gc
+import tracemalloc
+from collections.abc import Iterator
+
+import pytest
+from uuid6 import uuid7
+
+from insync.app.fragment_cache import FragmentCache
+from insync.memory import GC_PAUSE_SECONDS, GcPauses, collector_paused, freeze_heap, memory_report
+
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    tracemalloc.start(25)
+    yield
+    tracemalloc.stop()
+
+
+def test_allocations_are_attributed_to_the_most_specific_subsystem(tracing: None) -> None:
+    cache = FragmentCache()
+    # allocated here, but on behalf of the cache
+    cache.get_or_render(uuid7(), 0, 'checkitem', lambda: 'x' * 1_000_000)
+
+    report = memory_report()
+
+    [cached] = [subsystem for subsystem in report.subsystems if subsystem.name == 'cached renders']
+    assert cached.size >= 1_000_000
+    assert report.subsystems[0] is cached
+    assert report.traced >= cached.size
+
+
+def test_report_needs_tracing() -> None:
+    with pytest.raises(AssertionError):
+        memory_report()
+
+
+def test_gc_pauses_are_observed_per_generation() -> None:
+    pauses = GcPauses()
+    before = GC_PAUSE_SECONDS.labels(2).count
+    pauses.install()
+    try:
+        gc.collect()
+    finally:
+        pauses.uninstall()
+
+    assert GC_PAUSE_SECONDS.labels(2).count > before
+
+
+def test_freeze_heap_sets_thresholds() -> None:
+    thresholds = gc.get_threshold()
+    try:
+        assert freeze_heap((50_000, 20, 20)) > 0
+        assert gc.get_threshold() == (50_000, 20, 20)
+    finally:
+        gc.unfreeze()
+        gc.set_threshold(*thresholds)
+
+
+def test_collector_paused_restores_previous_state() -> None:
+    with collector_paused():
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+    gc.disable()
+    try:
+        with collector_paused():
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
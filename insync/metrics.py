@@ -0,0 +1,192 @@
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from typing import Generic, TypeVar
+
+# seconds, from a fast in-memory render up to a slow full patch
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+Sample = tuple[str, Labels, float]
+Child = TypeVar('Child')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric(Generic[Child]):
+    """A named family of values, one per combination of label values.
+
+    `labels(...)` children are created on first use and kept, so hot paths should hold on to them when the label
+    values are fixed.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), registry: 'MetricsRegistry | None' = None):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], Child] = {}
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _new_child(self) -> Child:
+        raise NotImplementedError
+
+    def labels(self, *values: object) -> Child:
+        key = tuple(map(str, values))
+        child = self._children.get(key)
+        if child is None:
+            assert len(key) == len(self.labelnames), f"{self.name} takes labels {self.labelnames}, got {key}"
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _child_samples(self, child: Child, labels: Labels) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[Sample]:
+        for key, child in list(self._children.items()):
+            yield from self._child_samples(child, tuple(zip(self.labelnames, key, strict=True)))
+
+
+class _Value:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _ValueMetric(Metric[_Value]):
+    """A single number per label set, or one read from `function` at scrape time so nothing has to keep it updated."""
+
+    suffix = ''
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), registry: 'MetricsRegistry | None' = None, function: Callable[[], float | None] | None = None):
+        self.function = function
+        super().__init__(name, description, labelnames, registry)
+
+    def _new_child(self) -> _Value:
+        return _Value(self._lock)
+
+    def _child_samples(self, child: _Value, labels: Labels) -> Iterator[Sample]:
+        yield self.name + self.suffix, labels, child.value
+
+    def samples(self) -> Iterator[Sample]:
+        if self.function is None:
+            yield from super().samples()
+            return
+        value = self.function()
+        if value is not None:
+            yield self.name + self.suffix, (), value
+
+
+class Counter(_ValueMetric):
+    type = 'counter'
+    suffix = '_total'
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_ValueMetric):
+    type = 'gauge'
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ('_lock', 'buckets', 'count', 'counts', 'sum')
+
+    def __init__(self, lock: threading.Lock, buckets: tuple[float, ...]):
+        self._lock = lock
+        self.buckets = buckets
+        # per bucket, not cumulative, the last one is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+
+class Histogram(Metric[_HistogramValue]):
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), registry: 'MetricsRegistry | None' = None, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labelnames, registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self._lock, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _child_samples(self, child: _HistogramValue, labels: Labels) -> Iterator[Sample]:
+        with self._lock:
+            counts, count, total = list(child.counts), child.count, child.sum
+        cumulative = 0
+        for bound, n in zip((*self.buckets, math.inf), counts, strict=True):
+            cumulative += n
+            yield f'{self.name}_bucket', (*labels, ('le', _format_value(bound))), cumulative
+        yield f'{self.name}_sum', labels, total
+        yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        assert metric.name not in self._metrics, f"metric {metric.name} registered twice"
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {_escape(metric.description)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
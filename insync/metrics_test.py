@@ -0,0 +1,60 @@
+import pytest
+
+from insync.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_counter_with_labels(registry: MetricsRegistry) -> None:
+    requests = Counter('requests', 'Requests served', ['route'], registry=registry)
+    requests.labels('/a').inc()
+    requests.labels('/a').inc(2)
+    requests.labels('/b').inc()
+    assert registry.render().splitlines(keepends=True) == [
+        '# HELP requests Requests served\n',
+        '# TYPE requests counter\n',
+        'requests_total{route="/a"} 3\n',
+        'requests_total{route="/b"} 1\n',
+    ]
+
+
+def test_histogram_buckets_are_cumulative(registry: MetricsRegistry) -> None:
+    latency = Histogram('latency', 'Latency', buckets=[0.1, 1], registry=registry)
+    for value in (0.05, 0.1, 0.5, 5):
+        latency.observe(value)
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'latency_bucket{le="0.1"} 2',
+        'latency_bucket{le="1"} 3',
+        'latency_bucket{le="+Inf"} 4',
+        'latency_sum 5.65',
+        'latency_count 4',
+    ]
+
+
+def test_gauge_read_at_scrape_time(registry: MetricsRegistry) -> None:
+    value: list[float | None] = [None]
+    Gauge('items', 'Items', function=lambda: value[0], registry=registry)
+    assert registry.render().endswith('# TYPE items gauge\n')
+    value[0] = 7
+    assert registry.render().endswith('items 7\n')
+
+
+def test_label_values_are_escaped(registry: MetricsRegistry) -> None:
+    Counter('c', 'C', ['path'], registry=registry).labels('a"b\\c\nd').inc()
+    assert 'c_total{path="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_wrong_number_of_labels(registry: MetricsRegistry) -> None:
+    counter = Counter('c', 'C', ['route'], registry=registry)
+    with pytest.raises(AssertionError):
+        counter.labels('/a', 'GET')
+
+
+def test_duplicate_names_rejected(registry: MetricsRegistry) -> None:
+    Counter('c', 'C', registry=registry)
+    with pytest.raises(AssertionError):
+        Gauge('c', 'C', registry=registry)
@@ -0,0 +1,220 @@
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+
+# leaf frames of a thread with nothing to do, an idle event loop or a threadpool worker waiting for work
+IDLE = {('selectors.py', 'select'), ('threading.py', 'wait')}
+TOP_FUNCTIONS = 25
+
+Stack = tuple[str, ...]
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f'{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})'
+
+
+def _stack(frame: FrameType | None) -> Stack:
+    """Root first, the order flamegraph tools expect."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+def _is_idle(frame: FrameType) -> bool:
+    return (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in IDLE
+
+
+class Sampler:
+    """A statistical profiler, samples the stack of every other busy thread each `interval` seconds.
+
+    Sync endpoints run in the threadpool, so looking at every thread is what catches them. Concurrent requests are
+    sampled too, captures are best taken while little else is going on.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter[Stack] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start or resume sampling, samples add up over every start/stop."""
+        assert self._thread is None, "Sampler is already running"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name='insync-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        assert self._thread is not None, "Sampler is not running"
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, stop: threading.Event) -> None:
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():  # noqa: SLF001 the only way to see other threads' stacks
+                if ident != own and not _is_idle(frame):
+                    self.stacks[_stack(frame)] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one `frame;frame;frame count` line each, the input of flamegraph.pl and speedscope."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = TOP_FUNCTIONS) -> str:
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        busy = sum(self.stacks.values()) or 1
+        lines = [f'{self.samples} samples every {self.interval * 1000:g}ms, {busy} of them busy', f"{'own%':>6} {'total%':>6}  function"]
+        lines.extend(f'{own[label] / busy:6.1%} {total[label] / busy:6.1%}  {label}' for label, _ in total.most_common(limit))
+        return '\n'.join(lines)
+
+
+@dataclass
+class Armed:
+    """A capture waiting for `remaining` more matching runs, profiled together into one artifact."""
+
+    kind: str
+    target: str
+    count: int
+    profiler: Sampler | cProfile.Profile
+    remaining: int = 0
+    finished: int = 0
+    seconds: float = 0.0
+    names: Counter[str] = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.remaining = self.count
+
+
+@dataclass
+class Artifact:
+    id: int
+    kind: str
+    name: str
+    runs: int
+    seconds: float
+    summary: str
+    filename: str
+    data: bytes = field(repr=False)
+    created: float = field(default_factory=time.time)
+
+
+class ProfileCaptures:
+    """Profiles of the next few requests or websocket renders matching a target, armed from /admin.
+
+    Requests whose path starts with the target are sampled (`Sampler`), renders of a project whose name starts with
+    it run under cProfile. Nothing is profiled, and the hot paths only read `pending`, until something is armed.
+    """
+
+    def __init__(self, keep: int = 20, interval: float = 0.001):
+        self.interval = interval
+        self.armed: list[Armed] = []
+        self.artifacts: deque[Artifact] = deque(maxlen=keep)
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._sampling = False
+
+    def arm(self, kind: str, target: str, count: int) -> None:
+        assert kind in ('request', 'render'), f"Unknown capture kind {kind}"
+        profiler = Sampler(self.interval) if kind == 'request' else cProfile.Profile()
+        with self._lock:
+            self.armed.append(Armed(kind, target, count, profiler))
+            self.pending += count
+
+    def disarm(self) -> None:
+        with self._lock:
+            self.armed.clear()
+            self.pending = 0
+
+    def get(self, artifact_id: int) -> Artifact | None:
+        return next((artifact for artifact in self.artifacts if artifact.id == artifact_id), None)
+
+    def _claim(self, kind: str, key: str) -> Armed | None:
+        with self._lock:
+            for armed in self.armed:
+                if armed.kind == kind and armed.remaining and key.startswith(armed.target):
+                    armed.remaining -= 1
+                    self.pending -= 1
+                    return armed
+        return None
+
+    def _finish(self, armed: Armed, name: str, seconds: float) -> None:
+        armed.finished += 1
+        armed.seconds += seconds
+        armed.names[name] += 1
+        if armed.finished < armed.count:
+            return
+        with self._lock:
+            if armed in self.armed:
+                self.armed.remove(armed)
+
+        if isinstance(armed.profiler, Sampler):
+            summary, extension, data = armed.profiler.summary(), 'folded', armed.profiler.folded().encode()
+        else:
+            out = io.StringIO()
+            stats = pstats.Stats(armed.profiler, stream=out)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+            # the same bytes `Stats.dump_stats` writes, loadable with pstats or snakeviz
+            summary, extension, data = out.getvalue().strip(), 'prof', marshal.dumps(stats.stats)  # type: ignore[attr-defined]
+        artifact_id = next(self._ids)
+        name = ', '.join(f'{name} x{n}' if n > 1 else name for name, n in armed.names.most_common(3))
+        filename = f'insync-{armed.kind}-{artifact_id}.{extension}'
+        self.artifacts.appendleft(Artifact(artifact_id, armed.kind, name, armed.finished, armed.seconds, summary, filename, data))
+
+    @contextmanager
+    def request(self, name: str, path: str) -> Iterator[None]:
+        # one sampler at a time, it already sees every thread
+        armed = None if self._sampling else self._claim('request', path)
+        if armed is None:
+            yield
+            return
+        assert isinstance(armed.profiler, Sampler)
+        self._sampling = True
+        start = time.perf_counter()
+        armed.profiler.start()
+        try:
+            yield
+        finally:
+            armed.profiler.stop()
+            self._sampling = False
+            self._finish(armed, name, time.perf_counter() - start)
+
+    @contextmanager
+    def render(self, name: str, project_name: str) -> Iterator[None]:
+        armed = self._claim('render', project_name)
+        if armed is None:
+            yield
+            return
+        assert isinstance(armed.profiler, cProfile.Profile)
+        start = time.perf_counter()
+        armed.profiler.enable()
+        try:
+            yield
+        finally:
+            armed.profiler.disable()
+            self._finish(armed, name, time.perf_counter() - start)
+
+
+CAPTURES = ProfileCaptures()
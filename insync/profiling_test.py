@@ -0,0 +1,83 @@
+import marshal
+import time
+
+from insync.profiling import ProfileCaptures, Sampler
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_nothing_is_captured_until_armed() -> None:
+    captures = ProfileCaptures()
+    with captures.render('render grocery', 'grocery'):
+        busy(0.001)
+    assert captures.pending == 0
+    assert len(captures.artifacts) == 0
+
+
+def test_render_capture_consumes_its_count_for_matching_projects_only() -> None:
+    captures = ProfileCaptures()
+    captures.arm('render', 'grocery', 2)
+
+    for project in ['hardware', 'grocery.dairy', 'grocery', 'grocery']:
+        with captures.render(f'render {project}', project):
+            busy(0.001)
+
+    assert len(captures.artifacts) == 1
+    assert captures.artifacts[0].name == 'render grocery.dairy, render grocery'
+    assert captures.artifacts[0].runs == 2
+    assert captures.pending == 0
+    assert captures.armed == []
+
+
+def test_runs_add_up_into_one_artifact_once_all_are_captured() -> None:
+    captures = ProfileCaptures()
+    captures.arm('render', 'grocery', 3)
+
+    for _ in range(2):
+        with captures.render('render grocery', 'grocery'):
+            busy(0.001)
+    assert len(captures.artifacts) == 0
+
+    with captures.render('render grocery', 'grocery'):
+        busy(0.001)
+    assert captures.artifacts[0].name == 'render grocery x3'
+
+
+def test_render_capture_is_a_loadable_pstats_dump() -> None:
+    captures = ProfileCaptures()
+    captures.arm('render', '', 1)
+    with captures.render('render', ''):
+        busy(0.001)
+
+    artifact = captures.artifacts[0]
+    assert artifact.filename.endswith('.prof')
+    assert 'busy' in artifact.summary
+    assert any(function == 'busy' for _, _, function in marshal.loads(artifact.data))
+    assert captures.get(artifact.id) is artifact
+
+
+def test_sampler_sees_busy_threads() -> None:
+    sampler = Sampler(interval=0.001)
+    for _ in range(2):
+        sampler.start()
+        busy(0.025)
+        sampler.stop()
+
+    assert sampler.samples > 0
+    assert 'busy' in sampler.summary()
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in sampler.folded().splitlines())
+
+
+def test_request_capture_stores_folded_stacks() -> None:
+    captures = ProfileCaptures()
+    captures.arm('request', '/checklist/', 1)
+    with captures.request('GET /checklist/grocery', '/checklist/grocery'):
+        busy(0.02)
+
+    artifact = captures.artifacts[0]
+    assert artifact.filename.endswith('.folded')
+    assert b'busy' in artifact.data
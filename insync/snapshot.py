@@ -0,0 +1,103 @@
+import datetime as dt
+import marshal
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from insync import columns
+from insync.listitem import ListItem, ListItemProject, ListItemProjectType
+from insync.listregistry import ListRegistry
+from insync.memory import collector_paused
+
+MAGIC = b"insyncrs"
+# bump whenever the columns below change, older files are then treated as stale
+FORMAT = 1
+# magic, format, change counter of the database the registry was saved to, items
+HEADER = struct.Struct("<8sHIQ")
+
+
+class StaleSnapshotError(Exception):
+    """The snapshot is missing, from another format or doesn't match the database anymore."""
+
+
+def _isoformat(value: dt.datetime | None) -> str | None:
+    return None if value is None else value.isoformat()
+
+
+def encode(reg: ListRegistry, change_counter: int) -> bytes:
+    """The registry as one marshalled tuple of columns, each project stored once and referred to by index."""
+    # a copy, so a request adding an item meanwhile can't break the iteration
+    items = list(reg)
+    projects: dict[ListItemProject, int] = {}
+    table = (
+        b"".join(item.uuid.bytes for item in items),
+        [item.description for item in items],
+        [_isoformat(item.creation_datetime) for item in items],
+        [_isoformat(item.completion_datetime) for item in items],
+        [_isoformat(item.archival_datetime) for item in items],
+        [projects.setdefault(item.project, len(projects)) for item in items],
+        [(project.name, project.project_type.value) for project in projects],
+        [item.priority.value if item.priority else None for item in items],
+        [item.recurring for item in items],
+    )
+    return HEADER.pack(MAGIC, FORMAT, change_counter, len(items)) + marshal.dumps(table)
+
+
+def decode(data: bytes | memoryview, change_counter: int) -> ListRegistry:
+    magic, format_, saved_counter, count = HEADER.unpack_from(data)
+    if magic != MAGIC or format_ != FORMAT:
+        raise StaleSnapshotError(f"not a format {FORMAT} registry snapshot")
+    if saved_counter != change_counter:
+        raise StaleSnapshotError(f"saved at change {saved_counter}, the database is at change {change_counter}")
+
+    uuids, descriptions, created, completed, archived, project_indexes, projects, priorities, recurring = marshal.loads(data[HEADER.size :])
+    assert len(descriptions) == count, f"snapshot has {len(descriptions)} items, its header says {count}"
+    # one object per project, so registry lookups by project mostly compare by identity
+    interned = [ListItemProject(name, ListItemProjectType(project_type)) for name, project_type in projects]
+    timestamps: dict[str | None, dt.datetime | None] = {None: None}
+
+    reg = ListRegistry()
+    with collector_paused():
+        reg.add_many(
+            ListItem(
+                description=description,
+                uuid=uuid,
+                priority=columns.PRIORITIES[priority],
+                completion_datetime=completion,
+                creation_datetime=creation,
+                archival_datetime=archival,
+                project=interned[project],
+                recurring=recurs,
+            )
+            for uuid, description, creation, completion, archival, project, priority, recurs in zip(
+                columns.uuids(int.from_bytes(uuids[i : i + 16]) for i in range(0, len(uuids), 16)),
+                descriptions,
+                columns.datetimes(created, timestamps),
+                columns.datetimes(completed, timestamps),
+                columns.datetimes(archived, timestamps),
+                project_indexes,
+                priorities,
+                recurring,
+                strict=True,
+            )
+        )
+    return reg
+
+
+def write_snapshot(path: str | os.PathLike, reg: ListRegistry, change_counter: int) -> int:
+    """Replace the snapshot at `path` atomically, returns its size."""
+    data = encode(reg, change_counter)
+    tmp = Path(f"{path}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return len(data)
+
+
+def read_snapshot(path: str | os.PathLike, change_counter: int) -> ListRegistry:
+    try:
+        with Path(path).open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as data:
+            return decode(data, change_counter)
+    except (FileNotFoundError, ValueError, EOFError, struct.error) as e:
+        # missing, empty (mmap refuses those) or truncated
+        raise StaleSnapshotError(str(e)) from e
@@ -0,0 +1,84 @@
+import datetime as dt
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from insync.db import ListDB
+from insync.listitem import ListItem, ListItemPriority, ListItemProject, ListItemProjectType
+from insync.listregistry import ListRegistry
+from insync.snapshot import StaleSnapshotError, decode, encode, read_snapshot, write_snapshot
+
+
+@pytest.fixture()
+def db(tmp_path: Path) -> Iterable[ListDB]:
+    _db = ListDB(tmp_path / 'insync.db')
+    _db.ensure_tables_created()
+    yield _db
+    _db.close()
+
+
+@pytest.fixture()
+def reg() -> ListRegistry:
+    reg = ListRegistry()
+    grocery = ListItemProject('grocery', ListItemProjectType.checklist)
+    now = dt.datetime.now(tz=dt.timezone.utc)
+    reg.add(ListItem('milk', project=grocery, recurring=True, completion_datetime=now))
+    reg.add(ListItem('eggs', project=ListItemProject('grocery', ListItemProjectType.checklist)))
+    reg.add(ListItem('taxes', priority=ListItemPriority('A'), archival_datetime=now.astimezone(dt.timezone(dt.timedelta(hours=-5)))))
+    return reg
+
+
+def test_round_trip(reg: ListRegistry) -> None:
+    loaded = decode(encode(reg, 7), 7)
+
+    assert loaded == reg
+    assert loaded.stats == reg.stats
+    # offsets are kept, not just the instant
+    assert [str(item) for item in loaded] == [str(item) for item in reg]
+
+
+def test_projects_are_interned(reg: ListRegistry) -> None:
+    milk, eggs, _ = decode(encode(reg, 0), 0)
+    assert milk.project is eggs.project
+
+
+def test_snapshot_of_another_change_is_stale(reg: ListRegistry) -> None:
+    with pytest.raises(StaleSnapshotError, match='change 7'):
+        decode(encode(reg, 7), 8)
+
+
+@pytest.mark.parametrize('content', [b'', b'insyncrs', b'not a snapshot at all, much too long to be a header'])
+def test_missing_or_broken_snapshot_is_stale(tmp_path: Path, reg: ListRegistry, content: bytes) -> None:
+    path = tmp_path / 'insync.db.snapshot'
+    with pytest.raises(StaleSnapshotError):
+        read_snapshot(path, 0)
+
+    path.write_bytes(content)
+    with pytest.raises(StaleSnapshotError):
+        read_snapshot(path, 0)
+
+    write_snapshot(path, reg, 0)
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(StaleSnapshotError):
+        read_snapshot(path, 0)
+
+
+def test_change_counter_moves_with_every_write(db: ListDB, reg: ListRegistry) -> None:
+    before = db.change_counter()
+    db.patch(reg)
+    assert db.change_counter() != before
+    assert ListDB(':memory:').change_counter() is None
+
+
+def test_db_loads_current_snapshot_until_written_to(tmp_path: Path, db: ListDB, reg: ListRegistry) -> None:
+    path = tmp_path / 'insync.db.snapshot'
+    db.patch(reg)
+    db.save_snapshot(reg, path)
+
+    assert db.load_snapshot(path) == reg
+
+    reg.add(ListItem('bread'))
+    db.patch(reg)
+    assert db.load_snapshot(path) is None
+    assert db.load() == reg
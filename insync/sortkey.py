@@ -0,0 +1,70 @@
+from collections.abc import Sequence
+from itertools import pairwise
+
+# gaps between keys let a move rewrite only the moved item's key
+KEY_MIN = 0
+KEY_MAX = 2**62  # well inside sqlite's signed 64 bit INTEGER
+# appends and prepends step by this instead of halving the remaining space each time
+END_GAP = 2**32
+# a respaced window grows until it leaves this much room between keys
+SPREAD_GAP = 2**32
+# neighbours closer than this are worth spreading out in the background
+CROWDED_GAP = 2**20
+
+
+class NoRoomError(ValueError):
+    """Not enough unused keys between two neighbours."""
+
+
+def key_between(after: int | None, before: int | None) -> int | None:
+    """A key strictly between two neighbouring keys, None meaning that end of the list.
+
+    Returns None when the neighbours are adjacent and there is no room left.
+    """
+    lo = KEY_MIN if after is None else after
+    hi = KEY_MAX if before is None else before
+    if lo >= hi:
+        raise ValueError(f"neighbours out of order: {after} >= {before}")
+    if before is None and hi - lo > END_GAP:
+        return lo + END_GAP
+    if after is None and hi - lo > END_GAP:
+        return hi - END_GAP
+    if hi - lo < 2:
+        return None
+    return lo + (hi - lo) // 2
+
+
+def neighbours(keys: Sequence[int], index: int) -> tuple[int | None, int | None]:
+    """The keys either side of position `index` in sorted `keys`, None past either end."""
+    return (keys[index - 1] if index > 0 else None, keys[index] if index < len(keys) else None)
+
+
+def spread(count: int, lo: int, hi: int) -> list[int]:
+    """`count` keys evenly spaced strictly between lo and hi."""
+    step = (hi - lo) // (count + 1)
+    if step <= 0:
+        raise NoRoomError(f"no room for {count} keys between {lo} and {hi}")
+    return [lo + step * (i + 1) for i in range(count)]
+
+
+def respace(keys: Sequence[int], index: int) -> tuple[int, list[int]]:
+    """Make room before `keys[index]` (index == len(keys) for the end) by spreading out a window around it.
+
+    The window doubles until it has room, so the rows rewritten depend on how crowded that spot is rather than on
+    the length of the list. `keys` must be sorted, returns (start, new_keys) meaning keys[start:start + len(new_keys)]
+    are to be replaced.
+    """
+    start, stop = max(index - 1, 0), min(index + 1, len(keys))
+    while True:
+        lo = KEY_MIN if start == 0 else keys[start - 1]
+        hi = KEY_MAX if stop == len(keys) else keys[stop]
+        count = stop - start
+        if (hi - lo) // (count + 1) >= SPREAD_GAP or (start == 0 and stop == len(keys)):
+            return start, spread(count, lo, hi)
+        width = max(count, 1)
+        start, stop = max(start - width, 0), min(stop + width, len(keys))
+
+
+def crowded(keys: Sequence[int], min_gap: int = CROWDED_GAP) -> list[int]:
+    """Indexes i where keys[i] sits closer than `min_gap` to the key before it."""
+    return [i + 1 for i, (a, b) in enumerate(pairwise(keys)) if b - a < min_gap]
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from insync.sortkey import CROWDED_GAP, END_GAP, KEY_MAX, KEY_MIN, NoRoomError, crowded, key_between, neighbours, respace, spread
+
+
+def test_key_between_neighbours() -> None:
+    assert key_between(10, 20) == 15
+    assert key_between(10, 12) == 11
+
+
+def test_key_between_adjacent() -> None:
+    assert key_between(10, 11) is None
+
+
+def test_append_and_prepend_step_by_end_gap() -> None:
+    assert key_between(None, None) == KEY_MIN + END_GAP
+    assert key_between(100, None) == 100 + END_GAP
+    assert key_between(None, KEY_MAX - 100) == KEY_MAX - 100 - END_GAP
+
+
+def test_end_falls_back_to_midpoint_when_crowded() -> None:
+    assert key_between(KEY_MAX - 10, None) == KEY_MAX - 5
+    assert key_between(None, KEY_MIN + 10) == KEY_MIN + 5
+
+
+def test_many_appends_dont_run_out() -> None:
+    key = None
+    for _ in range(100_000):
+        key = key_between(key, None)
+        assert key is not None
+
+
+def test_out_of_order_neighbours() -> None:
+    with pytest.raises(ValueError, match='out of order'):
+        key_between(20, 10)
+
+
+def test_neighbours() -> None:
+    assert neighbours([10, 20], 0) == (None, 10)
+    assert neighbours([10, 20], 1) == (10, 20)
+    assert neighbours([10, 20], 2) == (20, None)
+
+
+def test_spread() -> None:
+    assert spread(3, 0, 40) == [10, 20, 30]
+
+
+def test_spread_without_room() -> None:
+    with pytest.raises(NoRoomError):
+        spread(3, 0, 3)
+
+
+def test_respace_makes_room() -> None:
+    keys = [END_GAP, END_GAP + 1, END_GAP + 2, 5 * END_GAP]
+    start, new_keys = respace(keys, 2)
+    respaced = keys[:start] + new_keys + keys[start + len(new_keys) :]
+    assert respaced == sorted(respaced)
+    assert key_between(respaced[1], respaced[2]) is not None
+
+
+def test_respace_only_touches_a_window() -> None:
+    keys = [i * END_GAP for i in range(1, 1000)]
+    keys[500] = keys[499] + 1
+    start, new_keys = respace(keys, 500)
+    assert len(new_keys) < 10
+    assert start <= 499 < start + len(new_keys)
+
+
+def test_respace_at_ends() -> None:
+    keys = [KEY_MAX - 2, KEY_MAX - 1]
+    _, new_keys = respace(keys, 2)
+    assert key_between(new_keys[-1], None) is not None
+    _, new_keys = respace([KEY_MIN + 1, KEY_MIN + 2], 0)
+    assert key_between(None, new_keys[0]) is not None
+
+
+def test_crowded() -> None:
+    assert crowded([0, CROWDED_GAP, CROWDED_GAP + 1, 3 * CROWDED_GAP]) == [2]
+
+
+def test_random_moves_keep_order_and_unique_keys() -> None:
+    rng = random.Random(0)
+    order = [END_GAP * (i + 1) for i in range(50)]
+    for _ in range(5_000):
+        order.pop(rng.randrange(len(order)))
+        index = rng.randrange(len(order) + 1)
+
+        key = key_between(*neighbours(order, index))
+        if key is None:
+            start, new_keys = respace(order, index)
+            order[start : start + len(new_keys)] = new_keys
+            key = key_between(*neighbours(order, index))
+        assert key is not None
+        order.insert(index, key)
+        assert order == sorted(order)
+        assert len(set(order)) == len(order)
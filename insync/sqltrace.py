@@ -0,0 +1,175 @@
+import datetime as dt
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from insync.statementstats import StatementStat, StatementStats
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|x'[0-9a-fA-F]*'")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """One line with literals replaced by ?, so the same statement built with different values is counted once."""
+    sql = _LITERALS.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return _VALUE_LISTS.sub("(?, ...)", sql)
+
+
+@dataclass
+class SlowStatement:
+    source: str
+    sql: str
+    parameters: str
+    seconds: float
+    rows: int
+    at: dt.datetime = field(default_factory=lambda: dt.datetime.now().astimezone())
+
+
+class StatementTracer:
+    """Call count, rows and seconds per normalized statement, plus the most recent statements slower than `slow`.
+
+    Statements returning rows are timed until their cursor is exhausted, closed or dropped, so the duration covers
+    fetching as well as the first step that `execute` runs.
+    """
+
+    def __init__(self, slow: float = 0.05, slow_log_size: int = 100):
+        self.slow = slow
+        self.stats = StatementStats()
+        self._slow_log: deque[SlowStatement] = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def trace(self, connection: sqlite3.Connection, source: str) -> "TracedConnection":
+        return TracedConnection(connection, self, source)
+
+    def record(self, source: str, sql: str, parameters: object, seconds: float, rows: int) -> None:
+        self.stats.record(f"{source}: {normalize_sql(sql)}", seconds, rows)
+        if seconds >= self.slow:
+            # bound values help reproduce it, but a whole executemany batch would not fit on the page
+            shown = repr(parameters) if isinstance(parameters, Sequence | dict) else f"<{type(parameters).__name__}>"
+            with self._lock:
+                self._slow_log.append(SlowStatement(source, sql.strip(), shown[:200], seconds, rows))
+
+    def snapshot(self) -> list[StatementStat]:
+        return self.stats.snapshot()
+
+    def slow_log(self) -> list[SlowStatement]:
+        """Newest first."""
+        with self._lock:
+            return list(reversed(self._slow_log))
+
+
+class TracedCursor:
+    """Wraps the cursor of a statement returning rows, adding fetch time and rows until the statement is done."""
+
+    def __init__(self, cursor: sqlite3.Cursor, tracer: StatementTracer, source: str, sql: str, parameters: object, seconds: float):
+        self._cursor = cursor
+        self._tracer = tracer
+        self._source = source
+        self._sql = sql
+        self._parameters = parameters
+        self._seconds = seconds
+        self._rows = 0
+        self._done = False
+
+    def _finish(self) -> None:
+        if not self._done:
+            self._done = True
+            self._tracer.record(self._source, self._sql, self._parameters, self._seconds, self._rows)
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list[Any]:
+        size = self._cursor.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self) -> "TracedCursor":
+        return self
+
+    def __next__(self) -> Any:
+        start = time.perf_counter()
+        try:
+            row = next(self._cursor)
+        except StopIteration:
+            self._seconds += time.perf_counter() - start
+            self._finish()
+            raise
+        self._seconds += time.perf_counter() - start
+        self._rows += 1
+        return row
+
+    def close(self) -> None:
+        self._cursor.close()
+        self._finish()
+
+    def __del__(self):
+        # a cursor read with a single fetchone is never exhausted
+        self._finish()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """A sqlite3 connection whose `execute` and `executemany` are traced, everything else is passed through.
+
+    Setting attributes passes through too, e.g. `row_factory` or `isolation_level` have to reach the connection.
+    """
+
+    __slots__ = ('_source', '_tracer', 'connection')
+
+    def __init__(self, connection: sqlite3.Connection, tracer: StatementTracer, source: str):
+        object.__setattr__(self, 'connection', connection)
+        object.__setattr__(self, '_tracer', tracer)
+        object.__setattr__(self, '_source', source)
+
+    def execute(self, sql: str, parameters: Sequence[Any] | dict[str, Any] = (), /) -> Any:
+        start = time.perf_counter()
+        cursor = self.connection.execute(sql, parameters)
+        seconds = time.perf_counter() - start
+        if cursor.description is None:
+            self._tracer.record(self._source, sql, parameters, seconds, max(cursor.rowcount, 0))
+            return cursor
+        return TracedCursor(cursor, self._tracer, self._source, sql, parameters, seconds)
+
+    def executemany(self, sql: str, parameters: Iterable[Sequence[Any] | dict[str, Any]], /) -> sqlite3.Cursor:
+        start = time.perf_counter()
+        cursor = self.connection.executemany(sql, parameters)
+        self._tracer.record(self._source, sql, parameters, time.perf_counter() - start, max(cursor.rowcount, 0))
+        return cursor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.connection, name, value)
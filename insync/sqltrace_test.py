@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from insync.sqltrace import StatementTracer, TracedConnection, normalize_sql
+from insync.statementstats import StatementStat
+
+
+@pytest.fixture
+def tracer() -> StatementTracer:
+    return StatementTracer(slow=1.0)
+
+
+@pytest.fixture
+def conn(tracer: StatementTracer) -> TracedConnection:
+    conn = tracer.trace(sqlite3.connect(':memory:'), 'test')
+    conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO t (name) VALUES (?)', [('a',), ('b',), ('c',)])
+    return conn
+
+
+def stat(tracer: StatementTracer, prefix: str) -> StatementStat:
+    [match] = [s for s in tracer.snapshot() if s.name.startswith(f'test: {prefix}')]
+    return match
+
+
+@pytest.mark.parametrize(
+    ('sql', 'normalized'),
+    [
+        ('SELECT *\n  FROM t\n  WHERE id = 3', 'SELECT * FROM t WHERE id = ?'),
+        ("UPDATE t SET name = 'it''s' WHERE id = 1.5", 'UPDATE t SET name = ? WHERE id = ?'),
+        ('SELECT * FROM t2 WHERE id IN (1, 2, 3)', 'SELECT * FROM t2 WHERE id IN (?, ...)'),
+        ("SELECT x'00ff'", 'SELECT ?'),
+    ],
+)
+def test_normalize_sql(sql: str, normalized: str) -> None:
+    assert normalize_sql(sql) == normalized
+
+
+def test_writes_are_recorded_with_rows_changed(tracer: StatementTracer, conn: TracedConnection) -> None:
+    conn.execute('UPDATE t SET name = ? WHERE id > 1', ('z',))
+
+    assert stat(tracer, 'INSERT').rows == 3
+    assert stat(tracer, 'UPDATE').rows == 2
+
+
+def test_reads_count_every_row_fetched(tracer: StatementTracer, conn: TracedConnection) -> None:
+    cursor = conn.execute('SELECT name FROM t')
+    assert [row for row in cursor] == [('a',), ('b',), ('c',)]
+    conn.execute('SELECT name FROM t').fetchall()
+    # not exhausted, recorded when the cursor is dropped
+    conn.execute('SELECT name FROM t').fetchmany(2)
+
+    select = stat(tracer, 'SELECT')
+    assert select.calls == 3
+    assert select.rows == 8
+
+
+def test_dropped_cursor_is_recorded(tracer: StatementTracer, conn: TracedConnection) -> None:
+    assert conn.execute('SELECT name FROM t WHERE id = 2').fetchone() == ('b',)
+
+    select = stat(tracer, 'SELECT')
+    assert select.calls == 1
+    assert select.rows == 1
+
+
+def test_statements_with_different_literals_share_a_stat(tracer: StatementTracer, conn: TracedConnection) -> None:
+    for i in range(3):
+        conn.execute(f'DELETE FROM t WHERE id = {i}')
+
+    assert stat(tracer, 'DELETE').calls == 3
+
+
+def test_only_slow_statements_are_logged_newest_first(conn: TracedConnection) -> None:
+    tracer = StatementTracer(slow=0.0, slow_log_size=2)
+    traced = tracer.trace(conn.connection, 'test')
+    traced.execute('UPDATE t SET name = ? WHERE id = ?', ('x', 1))
+    traced.execute('DELETE FROM t WHERE id = 1')
+    traced.execute('DELETE FROM t WHERE id = 2')
+
+    assert [slow.sql for slow in tracer.slow_log()] == ['DELETE FROM t WHERE id = 2', 'DELETE FROM t WHERE id = 1']
+    assert StatementTracer(slow=1.0).slow_log() == []
+
+
+def test_everything_else_passes_through(conn: TracedConnection) -> None:
+    conn.commit()
+    assert conn.total_changes == 3
+    assert conn.execute('SELECT count(*) FROM t').fetchone() == (3,)
+
+
+def test_attributes_are_set_on_the_connection(conn: TracedConnection) -> None:
+    conn.row_factory = sqlite3.Row
+    conn.isolation_level = None
+
+    assert conn.connection.row_factory is sqlite3.Row
+    assert conn.connection.isolation_level is None
+    assert conn.execute('SELECT name FROM t WHERE id = 1').fetchone()['name'] == 'a'
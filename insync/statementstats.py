@@ -0,0 +1,39 @@
+import threading
+from dataclasses import dataclass, replace
+
+
+@dataclass
+class StatementStat:
+    name: str
+    calls: int = 0
+    rows: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class StatementStats:
+    """Cumulative call count, rows and seconds per named statement, shown on /sqladmin."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, StatementStat] = {}
+
+    def record(self, name: str, seconds: float, rows: int = 0) -> None:
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = StatementStat(name)
+            stat.calls += 1
+            stat.rows += rows
+            stat.total += seconds
+            stat.worst = max(stat.worst, seconds)
+
+    def snapshot(self) -> list[StatementStat]:
+        """Copies of every stat, most total time first."""
+        with self._lock:
+            stats = [replace(stat) for stat in self._stats.values()]
+        return sorted(stats, key=lambda stat: stat.total, reverse=True)
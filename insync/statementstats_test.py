@@ -0,0 +1,19 @@
+from insync.statementstats import StatementStats
+
+
+def test_record_accumulates() -> None:
+    stats = StatementStats()
+    stats.record('load', 0.5, rows=10)
+    stats.record('load', 0.25, rows=10)
+    (load,) = stats.snapshot()
+    assert (load.name, load.calls, load.rows, load.total, load.worst, load.mean) == ('load', 2, 20, 0.75, 0.5, 0.375)
+
+
+def test_snapshot_orders_by_total_and_copies() -> None:
+    stats = StatementStats()
+    stats.record('patch', 0.25)
+    stats.record('load', 0.5)
+    snapshot = stats.snapshot()
+    assert [stat.name for stat in snapshot] == ['load', 'patch']
+    stats.record('load', 0.5)
+    assert snapshot[0].calls == 1